@@ -1,5 +1,7 @@
 from core.state import AgentState
 from tools.llm_client import get_llm
+from tools.context_compressor import compress_documents
+from tools.conversation_memory import render_history
 
 def ExecutorAgent(state: AgentState) -> AgentState:
     llm = get_llm()
@@ -14,16 +16,12 @@ def ExecutorAgent(state: AgentState) -> AgentState:
     source_info = state.get("source", "Unknown")
     
     # Get conversation context
-    history_context = ""
-    for item in state.get("conversation_history", [])[-3:]:
-        if item.get('role') == 'user':
-            history_context += f"Patient: {item.get('content', '')}\n"
-        elif item.get('role') == 'assistant':
-            history_context += f"Doctor: {item.get('content', '')}\n"
+    history_context = render_history(state, 3)
 
     # If we have documents from retrieval
     if state.get("documents") and len(state["documents"]) > 0:
-        content = "\n\n".join([doc.page_content[:1000] for doc in state["documents"][:3]])
+        # Keep only the sentences relevant to the question instead of whole chunks
+        content = compress_documents(question, state["documents"][:3])
         
         prompt = f"""You are an experienced medical doctor providing helpful consultation.
 
@@ -1,5 +1,6 @@
 from core.state import AgentState
 from tools.llm_client import get_llm
+from tools.conversation_memory import render_history
 
 def LLMAgent(state: AgentState) -> AgentState:
     llm = get_llm()
@@ -9,12 +10,7 @@ def LLMAgent(state: AgentState) -> AgentState:
         state["llm_attempted"] = True
         return state
     
-    history_context = ""
-    for item in state.get("conversation_history", [])[-5:]:
-        if item.get('role') == 'user':
-            history_context += f"Patient: {item.get('content', '')}\n"
-        elif item.get('role') == 'assistant':
-            history_context += f"Doctor: {item.get('content', '')}\n"
+    history_context = render_history(state, 5)
     
     # If a language was detected and attached to the conversation state, ask the LLM
     # to respond in that language.
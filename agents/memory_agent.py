@@ -1,8 +1,23 @@
 from core.state import AgentState
+from tools.conversation_memory import HISTORY_MAX, HISTORY_WINDOW, collect_fold, schedule_fold
 
 def MemoryAgent(state: AgentState) -> AgentState:
+    # Pick up a summary finished in the background since the last turn
+    job_id = state.get('summary_job')
+    if job_id:
+        summary = collect_fold(job_id)
+        if summary is not None:
+            state['conversation_summary'] = summary
+            state['summary_job'] = None
+
     history = state.get('conversation_history', [])
-    if len(history) > 20:
-        history = history[-20:]
+    if len(history) > HISTORY_MAX:
+        overflow = history[:-HISTORY_WINDOW]
+        history = history[-HISTORY_WINDOW:]
+        state['summary_job'] = schedule_fold(
+            state.get('conversation_summary', ''),
+            state.get('summary_job'),
+            overflow
+        )
     state['conversation_history'] = history
     return state
@@ -1,45 +1,69 @@
+import re
+
 from core.state import AgentState
+from tools.intent_router import INTENT_TOOLS, classify_intent
+
+MEDICAL_KEYWORDS = [
+    # Symptoms
+    "fever", "pain", "headache", "nausea", "vomiting", "diarrhea", "cough",
+    "acne", "pimple", "skin", "rash", "itch", "cold", "flu",
+    "shortness of breath", "chest pain", "abdominal pain", "back pain",
+    "joint pain", "muscle pain", "fatigue", "weakness", "dizziness",
+    "confusion", "memory loss", "seizure", "numbness", "tingling", "swelling",
+    "bleeding", "bruising", "weight loss", "weight gain",
+    "appetite loss", "sleep problems", "insomnia",
+
+    # Conditions
+    "cancer", "diabetes", "hypertension", "heart disease", "stroke", "asthma",
+    "copd", "pneumonia", "bronchitis", "covid", "coronavirus",
+    "infection", "virus", "bacteria", "fungal", "arthritis", "osteoporosis",
+    "thyroid", "kidney disease", "liver disease", "hepatitis", "depression",
+    "anxiety", "bipolar", "schizophrenia", "alzheimer", "parkinson", "epilepsy",
+
+    # Medical terms
+    "treatment", "therapy", "medication", "medicine", "prescription", "dosage",
+    "side effects", "diagnosis", "prognosis", "surgery", "operation",
+    "procedure", "test", "lab results", "blood test", "x-ray", "mri",
+    "ct scan", "ultrasound", "biopsy", "screening", "prevention", "vaccine",
+    "immunization", "rehabilitation", "recovery", "chronic", "acute",
+    "syndrome", "disorder", "symptom", "cure", "remedy", "doctor", "hospital",
+
+    # Body parts
+    "heart", "lung", "kidney", "liver", "brain", "stomach", "intestine",
+    "blood", "bone", "muscle", "nerve", "skin", "eye", "ear", "throat",
+    "neck", "spine", "joint", "head", "chest", "abdomen", "leg", "arm"
+]
+
+# Whole-word match (with simple plurals) so "ear" no longer matches "learn"
+# and "arm" no longer matches "pharmacy"
+_KEYWORD_PATTERN = re.compile(
+    r"\b(" + "|".join(re.escape(k) for k in sorted(set(MEDICAL_KEYWORDS), key=len, reverse=True)) + r")(?:s|es)?\b"
+)
+
+# Questions with this many distinct keyword hits skip the embedding router
+FAST_PATH_HITS = 2
+
+
+def find_medical_keywords(question):
+    return set(_KEYWORD_PATTERN.findall(question.lower()))
+
 
 def PlannerAgent(state: AgentState) -> AgentState:
-    question = state["question"].lower()
-    
-    medical_keywords = [
-        # Symptoms
-        "fever", "pain", "headache", "nausea", "vomiting", "diarrhea", "cough",
-        "acne", "pimple", "skin", "rash", "itch", "cold", "flu",
-        "shortness of breath", "chest pain", "abdominal pain", "back pain",
-        "joint pain", "muscle pain", "fatigue", "weakness", "dizziness",
-        "confusion", "memory loss", "seizure", "numbness", "tingling", "swelling",
-        "bleeding", "bruising", "weight loss", "weight gain",
-        "appetite loss", "sleep problems", "insomnia",
-        
-        # Conditions
-        "cancer", "diabetes", "hypertension", "heart disease", "stroke", "asthma",
-        "copd", "pneumonia", "bronchitis", "covid", "coronavirus",
-        "infection", "virus", "bacteria", "fungal", "arthritis", "osteoporosis",
-        "thyroid", "kidney disease", "liver disease", "hepatitis", "depression",
-        "anxiety", "bipolar", "schizophrenia", "alzheimer", "parkinson", "epilepsy",
-        
-        # Medical terms
-        "treatment", "therapy", "medication", "medicine", "prescription", "dosage",
-        "side effects", "diagnosis", "prognosis", "surgery", "operation",
-        "procedure", "test", "lab results", "blood test", "x-ray", "mri",
-        "ct scan", "ultrasound", "biopsy", "screening", "prevention", "vaccine",
-        "immunization", "rehabilitation", "recovery", "chronic", "acute",
-        "syndrome", "disorder", "symptom", "cure", "remedy", "doctor", "hospital",
-        
-        # Body parts
-        "heart", "lung", "kidney", "liver", "brain", "stomach", "intestine",
-        "blood", "bone", "muscle", "nerve", "skin", "eye", "ear", "throat",
-        "neck", "spine", "joint", "head", "chest", "abdomen", "leg", "arm"
-    ]
-    
-    contains_medical = any(word in question for word in medical_keywords)
-    
-    if contains_medical:
+    question = state["question"]
+    hits = find_medical_keywords(question)
+
+    if len(hits) >= FAST_PATH_HITS:
         state["current_tool"] = "retriever"
     else:
-        state["current_tool"] = "llm_agent"
-    
+        intent, similarity, margin = classify_intent(question)
+        if intent:
+            state["current_tool"] = INTENT_TOOLS[intent]
+            print(f"Planner: routed to {intent} (similarity={similarity:.3f}, margin={margin:.3f})")
+        elif hits:
+            # Router not confident; the keyword scan breaks the tie
+            state["current_tool"] = "retriever"
+        else:
+            state["current_tool"] = "llm_agent"
+
     state["retry_count"] = 0
     return state
@@ -1,46 +1,71 @@
+import os
+
 from core.state import AgentState
-from tools.vector_store import get_retriever
+from tools.hybrid_search import search_corpora
+from tools.ranking import score_summary
+
+# Chunks below this cosine relevance are not worth a RAG prompt
+RELEVANCE_THRESHOLD = float(os.getenv("RAG_RELEVANCE_THRESHOLD", "0.35"))
+RAG_TOP_K = int(os.getenv("RAG_TOP_K", "3"))
+RAG_USE_MMR = os.getenv("RAG_USE_MMR", "false").lower() in ("1", "true", "yes")
+RAG_FETCH_K = int(os.getenv("RAG_FETCH_K", "12"))
+RAG_MMR_LAMBDA = float(os.getenv("RAG_MMR_LAMBDA", "0.5"))
+# Chunks found only by the lexical leg must reach this BM25 score
+RAG_MIN_BM25_SCORE = float(os.getenv("RAG_MIN_BM25_SCORE", "4.0"))
 
 def RetrieverAgent(state: AgentState) -> AgentState:
     query = state["question"]
-    
-    # Get retriever
-    retriever = get_retriever()
-    
-    if not retriever:
-        print("RAG: No retriever available - vector database not initialized")
-        state["documents"] = []
-        state["rag_success"] = False
-        state["rag_attempted"] = True
-        return state
-    
+
     # Create context from conversation history
     context_parts = []
     for item in state.get("conversation_history", [])[-3:]:
         if item.get('role') == 'user':
             context_parts.append(f"Context: {item.get('content', '')}")
-    
+
     context = " | ".join(context_parts)
     combined_query = f"{query} {context}" if context else query
-    
-    # Retrieve documents
-    docs = retriever.invoke(combined_query)
-    
-    if docs and len(docs) > 0:
-        valid_docs = [doc for doc in docs if len(doc.page_content.strip()) > 50]
-        if valid_docs:
-            state["documents"] = valid_docs
-            state["rag_success"] = True
-            state["source"] = "Medical Literature Database"
-            print(f"RAG: Found {len(valid_docs)} relevant documents")
-        else:
-            state["documents"] = []
-            state["rag_success"] = False
-            print("RAG: No valid documents found")
+
+    # Retrieve scored documents (dense + BM25, fused) from every enabled corpus
+    scored = search_corpora(
+        combined_query,
+        k=RAG_TOP_K,
+        fetch_k=RAG_FETCH_K,
+        use_mmr=RAG_USE_MMR,
+        lambda_mult=RAG_MMR_LAMBDA
+    )
+
+    if scored is None:
+        print("RAG: No retriever available - vector database not initialized")
+        state["documents"] = []
+        state["rag_success"] = False
+        state["rag_attempted"] = True
+        return state
+
+    valid_docs = []
+    for doc, relevance, bm25_score in scored:
+        dense_hit = relevance is not None and relevance >= RELEVANCE_THRESHOLD
+        lexical_hit = bm25_score is not None and bm25_score >= RAG_MIN_BM25_SCORE
+        if (dense_hit or lexical_hit) and len(doc.page_content.strip()) > 50:
+            if relevance is not None:
+                doc.metadata["relevance"] = round(relevance, 4)
+            if bm25_score is not None:
+                doc.metadata["bm25_score"] = round(bm25_score, 4)
+            valid_docs.append(doc)
+
+    scores = score_summary([relevance for _, relevance, _ in scored if relevance is not None])
+    scores["kept"] = len(valid_docs)
+    scores["threshold"] = RELEVANCE_THRESHOLD
+    state["retrieval_scores"] = scores
+
+    if valid_docs:
+        state["documents"] = valid_docs
+        state["rag_success"] = True
+        state["source"] = "Medical Literature Database"
+        print(f"RAG: Found {len(valid_docs)} relevant documents (scores={scores})")
     else:
         state["documents"] = []
         state["rag_success"] = False
-        print("RAG: No documents retrieved")
+        print(f"RAG: No documents above relevance threshold (scores={scores})")
 
     state["rag_attempted"] = True
     return state
@@ -1,9 +1,9 @@
 from langchain_core.documents import Document
 from core.state import AgentState
-from tools.search_tools import get_tavily_search
+from tools.search_tools import get_tavily_cached_search
 
 def TavilyAgent(state: AgentState) -> AgentState:
-    tavily_search = get_tavily_search()
+    tavily_search = get_tavily_cached_search()
     
     if not tavily_search:
         state["documents"] = []
@@ -13,7 +13,7 @@ def TavilyAgent(state: AgentState) -> AgentState:
     
     # Add medical context to search
     search_query = f"{state['question']} medical health treatment symptoms"
-    results = tavily_search.invoke(search_query)
+    results = tavily_search.search(search_query)
     
     if results and len(results) > 0:
         valid_results = []
@@ -1,9 +1,9 @@
 from langchain_core.documents import Document
 from core.state import AgentState
-from tools.search_tools import get_wikipedia_wrapper
+from tools.search_tools import get_wikipedia_search
 
 def WikipediaAgent(state: AgentState) -> AgentState:
-    wiki = get_wikipedia_wrapper()
+    wiki = get_wikipedia_search()
     
     if not wiki:
         state["documents"] = []
@@ -11,13 +11,13 @@ def WikipediaAgent(state: AgentState) -> AgentState:
         state["wiki_attempted"] = True
         return state
     
-    # Search with medical context
+    # Search with medical context, and the plain question as a fallback; both run concurrently
     search_query = f"{state['question']} medical symptoms treatment"
-    content = wiki.run(search_query)
-    
-    if not content or len(content.strip()) < 100:
-        # Fallback to simpler search
-        content = wiki.run(state['question'])
+    content = None
+    for result in wiki.search_all([search_query, state['question']]):
+        if result and len(result.strip()) > 100:
+            content = result
+            break
     
     if content and len(content.strip()) > 100:
         state["documents"] = [Document(page_content=content)]
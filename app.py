@@ -1,19 +1,32 @@
-from flask import Flask, render_template, request, jsonify, session
+from flask import Flask, Response, render_template, request, jsonify, session, stream_with_context
+import atexit
+import hashlib
+import io
+import json
 import os
 import uuid
 import secrets
 from datetime import datetime, timezone
 from dotenv import load_dotenv
-from pymongo import MongoClient
 
 from core.langgraph_workflow import create_workflow
 from core.state import initialize_conversation_state, reset_query_state
-from tools.pdf_loader import process_pdf
-from tools.vector_store import get_or_create_vectorstore
+from tools.conversation_memory import discard_fold
+from tools.corpora import initialize_corpora
+from tools.doctor_import import detect_format, doctor_text, import_doctors, read_rows, summarize
+from tools.doctor_index import get_doctor_index, invalidate_doctor_index
+from tools.hybrid_search import warm_up_retrieval
+from tools.intent_router import get_intent_centroids
+from tools.message_queue import MessageWriter
+from tools.retention import RetentionWorker
+from tools.search_tools import search_stats
+from tools.session_cache import SESSION_BUFFER_SIZE, get_recent_messages_cache
+from tools.storage import open_storage
+from tools.symptom_vector import get_symptom_vectors
 
 from sentence_transformers import SentenceTransformer
 import numpy as np
-from tools.specialization_utils import normalize_profile
+from tools.specialization_utils import implied_specializations, normalize_profile, specialization_key
 from tools.lang_utils import detect_language
 
 # --------------------------------------
@@ -50,13 +63,15 @@ print("Model loaded successfully")
 app.secret_key = secrets.token_hex(32)
 
 # --------------------------------------
-# MongoDB setup
+# Storage setup (MongoDB or SQLite, see tools/storage.py)
 # --------------------------------------
-MONGO_URI = os.getenv("MONGO_URI")
-client = None
-db = None
-sessions_collection = None
-messages_collection = None
+storage = None
+# Write-behind queue for chat messages (None without a DB)
+message_writer = None
+# Background deletes and retention sweeps (None without a DB)
+retention = None
+SESSION_PAGE_SIZE = 50
+SESSION_PAGE_MAX = 200
 
 # --------------------------------------
 # Global workflow and conversation state
@@ -74,128 +89,37 @@ def get_embedding(text):
     return np.array(embedder.encode(text, normalize_embeddings=True))
 
 
-def find_related_doctors(user_message, limit=3):
-    print("Started")
-    """Find doctors semantically related to user symptoms using local embeddings"""
-    doctors = list(db["users"].find({"role": "doctor"}))
-    print(doctors)
+def find_related_doctors(user_message, limit=3, language=None, min_experience=None, specializations=None,
+                         query_embedding=None):
+    """Find doctors semantically related to user symptoms using local embeddings.
+
+    `language`, `min_experience` and `specializations` narrow the candidates
+    (via the doctor index bitmaps) before any similarity is computed. A
+    precomputed `query_embedding` (e.g. the session's symptom vector) is used
+    instead of encoding `user_message`, which then only drives keyword boosts.
+    """
+    index = get_doctor_index(storage, get_embedding)
+    if index is None or not len(index):
+        return []
+    rows = index.candidates(language, min_experience, specializations)
+    doctors = [index.doctors[i] for i in rows]
     if not doctors:
         return []
     # Get user embedding and ensure it's a numpy array
-    user_emb = get_embedding(user_message)
+    user_emb = query_embedding if query_embedding is not None else get_embedding(user_message)
     if not isinstance(user_emb, np.ndarray):
         user_emb = np.array(user_emb)
 
     # Preprocess message for simple keyword matching
     user_text_lc = (user_message or "").lower()
 
-    # Comprehensive Symptom -> specialization keywords mapping. This list is
-    # intentionally broad and should be tuned to your region and dataset.
-    SPECIALIZATION_KEYWORDS = {
-        "cardiologist": [
-            "chest pain", "shortness of breath", "palpitations", "heart attack", "angina", "tachycardia",
-            "high blood pressure", "hypertension", "palpitat"
-        ],
-        "pulmonologist": [
-            "cough", "shortness of breath", "wheeze", "wheezing", "bronchitis", "asthma", "tb", "tuberculosis",
-            "chronic obstructive", "copd", "pneumonia"
-        ],
-        "dermatologist": [
-            "rash", "itch", "itching", "redness", "eczema", "psoriasis", "skin", "acne", "blister", "hives"
-        ],
-        "ent": [
-            "ear", "hearing", "hearing loss", "ear pain", "tinnitus", "hoarseness", "sinus", "nasal", "throat",
-            "tonsillitis", "sinusitis"
-        ],
-        "neurologist": [
-            "headache", "seizure", "fits", "numbness", "weakness", "dizziness", "migraine", "stroke", "tremor"
-        ],
-        "pediatrician": [
-            "child", "kid", "baby", "fever in child", "pediatric", "infant", "newborn", "vaccination", "growth"
-        ],
-        "orthopedist": [
-            "joint pain", "back pain", "fracture", "sprain", "arthritis", "bone", "hip pain", "knee pain", "shoulder"
-        ],
-        "gastroenterologist": [
-            "abdominal pain", "diarrhea", "constipation", "vomiting", "nausea", "acid reflux", "heartburn", "ulcer"
-        ],
-        "endocrinologist": [
-            "diabetes", "thyroid", "weight gain", "weight loss", "hormone", "hypothyroid", "hyperthyroid"
-        ],
-        "psychiatrist": [
-            "depression", "anxiety", "insomnia", "mood", "psychosis", "therapy", "suicidal"
-        ],
-        "ophthalmologist": [
-            "eye", "vision", "blurry vision", "red eye", "cataract", "glaucoma", "ocular"
-        ],
-        "urologist": [
-            "urine", "urinary", "blood in urine", "dysuria", "kidney stone", "prostate", "frequency", "incontinence"
-        ],
-        "nephrologist": [
-            "kidney", "renal", "creatinine", "dialysis", "nephrotic", "proteinuria"
-        ],
-        "obgyn": [
-            "pregnancy", "period", "menstruation", "vaginal", "pelvic pain", "contraception", "gynecology", "obstetrics"
-        ],
-        "oncologist": [
-            "cancer", "chemotherapy", "tumor", "malignancy", "oncology", "mass"
-        ],
-        "infectious_disease": [
-            "fever", "infection", "sepsis", "antibiotic", "hiv", "tb", "covid", "viral"
-        ],
-        "rheumatologist": [
-            "joint pain", "autoimmune", "rheumatoid", "lupus", "scleroderma", "vasculitis"
-        ],
-        "allergist": [
-            "allergy", "allergic", "anaphylaxis", "hay fever", "rhinitis"
-        ],
-        "physiotherapist": [
-            "rehab", "physiotherapy", "mobility", "exercise therapy", "post-op rehab"
-        ],
-        "dentist": [
-            "toothache", "dental", "cavity", "gum", "oral", "tooth"
-        ],
-        "derm_cosmetic": [
-            "laser", "cosmetic", "fillers", "botox", "aesthetic"
-        ],
-    }
-
-    # Helper to return a list of canonical specializations for admin use
-    def get_specialization_list():
-        return sorted([(k.replace('_', ' ').title(), k) for k in SPECIALIZATION_KEYWORDS.keys()], key=lambda x: x[0])
-
-    # Canonicalization map for specialization names (common typos / variants)
-    CANONICAL_SPECIALIZATIONS = {
-        "pediadrist": "pediatrician",
-        "pediatrist": "pediatrician",
-        "pediatrician": "pediatrician",
-        "cardiologist": "cardiologist",
-        "cardiology": "cardiologist",
-        "ent": "ent",
-        "ear nose throat": "ent",
-        "neurology": "neurology",
-        "neuro": "neurology",
-        "dermatologist": "dermatologist",
-        "derm": "dermatologist",
-        "orthopedist": "orthopedist",
-        "orthopedic": "orthopedist",
-    }
-
-    # Detect which specializations are implied by the user's message
-    implied_specs = set()
-    for spec, keys in SPECIALIZATION_KEYWORDS.items():
-        for k in keys:
-            if k in user_text_lc:
-                # canonicalize implied spec if present
-                implied_specs.add(CANONICAL_SPECIALIZATIONS.get(spec, spec))
-                break
+    # Specializations implied by the user's message (taxonomy keys)
+    implied_specs = implied_specializations(user_message)
 
     # First pass: canonicalize specializations and build available spec set
     available_specs = set()
     for doc in doctors:
-        profile = doc.get("doctorProfile", {})
-        raw_spec = (profile.get("specialization", "") or "").strip().lower()
-        canon_spec = CANONICAL_SPECIALIZATIONS.get(raw_spec, raw_spec) if raw_spec else ''
+        canon_spec = specialization_key(doc.get("doctorProfile", {}).get("specialization", ""))
         if canon_spec:
             available_specs.add(canon_spec)
         doc['_canonical_specialization'] = canon_spec
@@ -210,78 +134,19 @@ def find_related_doctors(user_message, limit=3):
         if missing:
             print(f"[debug] implied specializations not available in DB: {missing} — continuing semantic matching")
 
-    # Second pass: compute similarities and scores
+    # Second pass: similarities for the filtered rows in one product, then boosts
     similarities = []
     score_map = {}
-    for doc in doctors:
+    for doc, similarity in zip(doctors, index.similarities(user_emb, rows)):
         profile = doc.get("doctorProfile", {})
         specialization = profile.get("specialization", "")
         qualifications = profile.get("qualifications", [])
-        years_exp = profile.get("yearsExperience", "")
-
-        parts = []
-        if specialization:
-            parts.append(specialization)
-        if qualifications:
-            parts.append(" ".join(qualifications))
-        if years_exp:
-            parts.append(f"{years_exp} years experience")
-        bio = profile.get("bio", "") or doc.get("bio", "")
-        if bio:
-            parts.append(bio)
-        clinic = profile.get("clinic", "")
-        if clinic:
-            parts.append(clinic)
-        languages = profile.get("languages", [])
-        if languages:
-            parts.append(" ".join(languages))
-
-        doc_text = " ".join(parts).strip()
-        if not doc_text:
-            doc_text = f"{doc.get('name','')} {specialization}"
-
-        doc_emb = doc.get("embedding")
-        if not doc_emb:
-            try:
-                # Normalize and persist canonical specialization (if changed)
-                profile = doc.get('doctorProfile', {}) or {}
-                normalized_profile = normalize_profile(profile)
-                if normalized_profile.get('specialization') and normalized_profile.get('specialization') != profile.get('specialization'):
-                    db["users"].update_one({"_id": doc["_id"]}, {"$set": {"doctorProfile.specialization": normalized_profile.get('specialization')}})
-
-                # Rebuild doc_text using normalized profile
-                doc_text = " ".join([p for p in [
-                    normalized_profile.get('specialization',''),
-                    " ".join(normalized_profile.get('qualifications', [])) if normalized_profile.get('qualifications') else '',
-                    f"{normalized_profile.get('yearsExperience','')} years experience" if normalized_profile.get('yearsExperience') else '',
-                    normalized_profile.get('bio','') or doc.get('bio',''),
-                    normalized_profile.get('clinic',''),
-                    " ".join(normalized_profile.get('languages', [])) if normalized_profile.get('languages') else ''
-                ] if p]).strip()
-
-                computed = get_embedding(doc_text)
-                db["users"].update_one({"_id": doc["_id"]}, {"$set": {"embedding": computed.tolist()}})
-                doc_emb = np.array(computed)
-            except Exception as e:
-                print(f"Error computing embedding for doctor {doc.get('name')}: {e}")
-                continue
-        else:
-            doc_emb = np.array(doc_emb, dtype=float)
-
-        # Ensure no-zero norm
-        user_norm = np.linalg.norm(user_emb)
-        doc_norm = np.linalg.norm(doc_emb)
-        if user_norm == 0 or doc_norm == 0:
-            continue
-
-        similarity = float(np.dot(user_emb, doc_emb) / (user_norm * doc_norm))
+        similarity = float(similarity)
 
         # Boosting logic
         boost = 0.0
-        spec_lc = (doc.get('_canonical_specialization') or specialization or "").lower()
-        for implied in implied_specs:
-            if implied and (implied in spec_lc or spec_lc in implied):
-                boost += 0.35
+        if doc.get('_canonical_specialization') in implied_specs:
+            boost += 0.35
         if specialization and specialization.lower() in user_text_lc:
             boost += 0.12
         for qual in qualifications:
@@ -324,6 +189,7 @@ def find_related_doctors(user_message, limit=3):
             "specialization": d.get("doctorProfile", {}).get("specialization", ""),
             "yearsExperience": d.get("doctorProfile", {}).get("yearsExperience", ""),
             "qualifications": d.get("doctorProfile", {}).get("qualifications", []),
+            "languages": d.get("doctorProfile", {}).get("languages", []),
             "score": score
         })
 
@@ -331,73 +197,120 @@ def find_related_doctors(user_message, limit=3):
 
 
 # --------------------------------------
-# MongoDB helper functions
+# Persistence helper functions
 # --------------------------------------
 
 def save_message(session_id, role, content, source=None):
-    """Save user or assistant message to MongoDB"""
-    if messages_collection is None or sessions_collection is None:
-        # No DB configured; skip persistence
-        return
-    messages_collection.insert_one({
-        "session_id": session_id,
-        "role": role,
-        "content": content,
-        "source": source,
-        "timestamp": datetime.now(timezone.utc)
-    })
-    sessions_collection.update_one(
-        {"session_id": session_id},
-        {
-            "$setOnInsert": {"created_at": datetime.now(timezone.utc)},
-            "$set": {"last_active": datetime.now(timezone.utc)}
-        },
-        upsert=True
-    )
+    """Record a message in the session's recent buffer and queue it for storage.
+
+    Returns the message id (None without a DB).
+    """
+    message_id = None
+    if message_writer is not None:
+        doc = message_writer.enqueue(session_id, role, content, source)
+        message_id = str(doc["_id"])
+        message = {k: doc[k] for k in ("role", "content", "source", "timestamp")}
+        message["id"] = message_id
+    else:
+        # No DB configured; the message only lives in the recent buffer
+        message = {"role": role, "content": content, "source": source, "timestamp": datetime.now(timezone.utc)}
+    get_recent_messages_cache().append(session_id, message)
+    return message_id
+
+
+def _with_pending(session_id, messages, after=None):
+    """Merge stored messages with the session's not yet written ones, oldest first.
+
+    Each message carries its id as a string under `id`, usable as a history cursor.
+    """
+    if message_writer is not None:
+        seen = {m["id"] for m in messages}
+        for m in message_writer.pending(session_id):
+            m["id"] = str(m.pop("_id"))
+            if m["id"] not in seen and (after is None or m["timestamp"] > after):
+                m.pop("session_id", None)
+                messages.append(m)
+        messages.sort(key=lambda m: m["timestamp"])
+    return messages
 
 
+def resolve_history_cursor(session_id, after):
+    """Timestamp for an `after` cursor given as a message id or an ISO-8601 timestamp"""
+    if not after:
+        return None
+    if message_writer is not None:
+        for m in message_writer.pending(session_id):
+            if str(m["_id"]) == after:
+                return m["timestamp"]
+    if storage is not None:
+        timestamp = storage.message_timestamp(session_id, after)
+        if timestamp is not None:
+            return timestamp
+    return _parse_timestamp(after)
 
-def get_chat_history(session_id):
-    """Retrieve ordered chat messages for a session"""
-    if messages_collection is None:
+
+def get_chat_history(session_id, after=None, limit=None):
+    """Chat messages of a session, oldest first.
+
+    With `after` (a timestamp) only newer messages are returned, at most
+    `limit` of them; without it `limit` keeps the most recent messages.
+    """
+    if storage is None or (retention is not None and retention.is_deleting(session_id)):
         return []
-    messages = list(messages_collection.find(
-        {"session_id": session_id},
-        {"_id": 0}
-    ).sort("timestamp", 1))
+    messages = _with_pending(session_id, storage.find_messages(session_id, after, limit), after)
+    if limit:
+        messages = messages[:limit] if after is not None else messages[-limit:]
     return messages
 
 
-def get_all_sessions():
-    """Fetch all sessions with preview"""
-    if sessions_collection is None or messages_collection is None:
+def history_etag(session_id, *params):
+    """Validator for a session's history: changes whenever a message is added or written"""
+    if storage is None:
+        return None
+    last_active = storage.session_last_active(session_id)
+    pending = message_writer.pending(session_id) if message_writer is not None else []
+    parts = [session_id, last_active.isoformat() if last_active else "", str(pending[-1]["_id"]) if pending else ""]
+    parts.extend("" if p is None else str(p) for p in params)
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()
+
+
+def _load_recent_messages(session_id):
+    """Read the tail of a session from storage (cache miss path)"""
+    return get_chat_history(session_id, limit=SESSION_BUFFER_SIZE)
+
+
+def get_recent_messages(session_id, limit=5):
+    """Last `limit` messages of a session, oldest first, served from the in-process buffer"""
+    return get_recent_messages_cache().get(session_id, limit, loader=lambda: _load_recent_messages(session_id))
+
+
+def get_all_sessions(before=None, limit=SESSION_PAGE_SIZE):
+    """One page of sessions, most recently active first.
+
+    `before` is the `last_active` of the last session of the previous page.
+    Previews and counts are stored on the session records, so this is a
+    single indexed query regardless of how many messages exist.
+    """
+    if storage is None:
         return []
-    sessions = []
-    for s in sessions_collection.find().sort("last_active", -1):
-        first_user_msg = messages_collection.find_one(
-            {"session_id": s["session_id"], "role": "user"},
-            sort=[("timestamp", 1)]
-        )
-        preview = None
-        if first_user_msg and first_user_msg.get("content"):
-            content = first_user_msg["content"]
-            preview = content[:50] + "..." if len(content) > 50 else content
-
-        sessions.append({
-            "session_id": s["session_id"],
-            "created_at": s.get("created_at"),
-            "last_active": s.get("last_active"),
-            "preview": preview
-        })
-    return sessions
+    # Sessions pending deletion are excluded by the query, so pages stay full and the cursor keeps going
+    deleting = retention.deleting() if retention is not None else ()
+    return storage.list_sessions(before, limit, exclude=deleting)
 
 
 def delete_session(session_id):
-    """Delete all messages + session document"""
-    if messages_collection is None or sessions_collection is None:
+    """Delete all messages + session record (in the background; hidden right away)"""
+    get_recent_messages_cache().drop(session_id)
+    get_symptom_vectors().drop(session_id)
+    state = conversation_states.pop(session_id, None)
+    if state is not None:
+        discard_fold(state.get('summary_job'))
+    if storage is None:
         return
-    messages_collection.delete_many({"session_id": session_id})
-    sessions_collection.delete_one({"session_id": session_id})
+    if message_writer is not None:
+        # Unsaved messages must not recreate the session after it is deleted
+        message_writer.discard(session_id)
+    retention.delete(session_id)
 
 
 # --------------------------------------
@@ -405,10 +318,7 @@ def delete_session(session_id):
 # --------------------------------------
 def initialize_system():
     global workflow_app
-    global client, db, sessions_collection, messages_collection
-
-    pdf_path = './data/medical_book.pdf'
-    persist_dir = './medical_db/'
+    global storage, message_writer, retention
 
     print("Initializing Caremate System...")
     def _write_init_status(s):
@@ -421,45 +331,55 @@ def initialize_system():
 
     _write_init_status('starting')
 
-    # Initialize vector DB
-    existing_db = get_or_create_vectorstore(persist_dir=persist_dir)
-
-    if not existing_db and os.path.exists(pdf_path):
-        print("Creating vector database from PDF...")
-        doc_splits = process_pdf(pdf_path)
-        get_or_create_vectorstore(documents=doc_splits, persist_dir=persist_dir)
-    elif not existing_db:
-        print("No vector database and no PDF found — RAG features will be limited")
+    # Initialize the vector DB shard of every enabled corpus
+    corpora = initialize_corpora()
+    if corpora:
+        print(f"Vector DB available for corpora: {', '.join(corpora)}")
+        try:
+            warm_up_retrieval()
+        except Exception as e:
+            print(f"Warning: retrieval warm-up failed: {e}")
     else:
-        print("Vector DB available")
+        print("No vector database and no PDF found — RAG features will be limited")
     _write_init_status('vector_db_done')
 
+    # Embed the intent examples once so the first routed question doesn't pay for it
+    try:
+        get_intent_centroids()
+    except Exception as e:
+        print(f"Warning: intent router unavailable, planner will use keywords only: {e}")
+
     workflow_app = create_workflow()
     print("Caremate Web Interface Ready!")
     _write_init_status('workflow_ready')
 
-    # Lazily initialize MongoDB client so Docker startup doesn't fail when
-    # network/DNS to Atlas isn't available. This keeps the app usable in
-    # limited functionality mode (no persistence).
+    # Lazily connect storage so Docker startup doesn't fail when network/DNS
+    # to Atlas isn't available. This keeps the app usable in limited
+    # functionality mode (no persistence).
     try:
-        if MONGO_URI:
-            client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
-            client.admin.command('ping')
-            db = client["caremate"]
-            sessions_collection = db["sessions"]
-            messages_collection = db["messages"]
-            print("MongoDB connected successfully")
-            _write_init_status('mongo_connected')
+        storage = open_storage()
+        if storage is not None:
+            try:
+                storage.ensure_schema()
+            except Exception as e:
+                print(f"Warning: could not prepare storage indexes/fields: {e}")
+            message_writer = MessageWriter(storage)
+            # Drain unsaved messages on shutdown
+            atexit.register(message_writer.close)
+            # Registered after the writer so it runs first (atexit is LIFO) and can still flush it
+            retention = RetentionWorker(storage, message_writer)
+            atexit.register(retention.close)
+            print(f"Storage connected successfully ({storage.name})")
+            _write_init_status(f'{storage.name}_connected')
         else:
-            print("MONGO_URI not set; running without DB persistence")
-            _write_init_status('mongo_not_configured')
+            print("No storage configured (MONGO_URI/STORAGE_BACKEND unset); running without DB persistence")
+            _write_init_status('storage_not_configured')
     except Exception as e:
-        print(f"Warning: MongoDB connection failed during initialize_system: {e}")
-        client = None
-        db = None
-        sessions_collection = None
-        messages_collection = None
-        _write_init_status('mongo_failed')
+        print(f"Warning: storage connection failed during initialize_system: {e}")
+        storage = None
+        message_writer = None
+        retention = None
+        _write_init_status('storage_failed')
 
     # Final ready
     _write_init_status('ready')
@@ -473,6 +393,8 @@ def initialize_system():
 def index():
     if 'session_id' not in session:
         session['session_id'] = str(uuid.uuid4())
+        # Brand new session: nothing to load from the DB
+        get_recent_messages_cache().start(session['session_id'])
     return render_template('index.html')
 
 
@@ -490,18 +412,21 @@ def chat():
     if not workflow_app:
         return jsonify({'error': 'System not initialized'}), 500
 
-    # Save user message
-    save_message(session_id, 'user', message)
-
     # Detect user language and store in conversation state so downstream
     # agents/LLM can respond in the same language.
     user_lang = detect_language(message)
 
-    # Fetch last 5 messages (for context)
-    previous_messages = list(messages_collection.find(
-        {"session_id": session_id}
-    ).sort("timestamp", -1).limit(5))
-    previous_messages.reverse()  # so oldest comes first
+    # Optional doctor filters, e.g. {"language": "auto", "min_experience": 5}
+    try:
+        filters = doctor_filters(data.get('doctor_filters') or {}, user_lang)
+    except ValueError:
+        return jsonify({'error': 'invalid doctor_filters', 'success': False}), 400
+
+    # Save user message
+    save_message(session_id, 'user', message)
+
+    # Last 5 messages (for context) from the session's in-process buffer
+    previous_messages = get_recent_messages(session_id, 5)
 
     # Build context string
     context = ""
@@ -536,7 +461,7 @@ def chat():
     else:
         combined_query = message or combined_text
 
-    related_doctors = find_related_doctors(combined_query)
+    related_doctors = recommend_doctors(session_id, message, combined_query, previous_messages, filters)
     print(f"[debug] related_doctors found: {len(related_doctors)} for query='{combined_query[:120]}'")
 
     # Extract response and source
@@ -544,7 +469,7 @@ def chat():
     source = result.get('source', 'Unknown')
 
     # Save assistant response
-    save_message(session_id, 'assistant', response, source)
+    message_id = save_message(session_id, 'assistant', response, source)
 
     timestamp = datetime.now().strftime("%I:%M %p")
 
@@ -554,37 +479,139 @@ def chat():
         'timestamp': timestamp,
         'related_doctors': related_doctors,
         'context_used': context,  # for debugging (optional)
+        'message_id': message_id,  # history cursor for incremental fetches
         'success': bool(result.get('generation'))
     })
 
 
+def recommend_doctors(session_id, message, keyword_text, previous_messages, filters):
+    """Doctors for the session's running symptom vector; one embedding per turn.
+
+    Results are reused while the vector stays within RECOMMENDATION_SHIFT of
+    the one they were computed for (and the filters and doctor index match).
+    """
+    vectors = get_symptom_vectors()
+    if session_id in vectors:
+        vector = vectors.add(session_id, get_embedding(message))
+    else:
+        # First turn seen by this process: seed from the patient's messages in context
+        texts = [m['content'] for m in previous_messages if m['role'] == 'user']
+        if not texts or texts[-1] != message:
+            texts.append(message)
+        vector = vectors.add(session_id, *embedder.encode(texts, normalize_embeddings=True))
+
+    index = get_doctor_index(storage, get_embedding)
+    key = (json.dumps(filters, sort_keys=True), index.built_at if index is not None else None)
+    cached = vectors.cached(session_id, vector, key)
+    if cached is not None:
+        return cached
+    results = find_related_doctors(keyword_text, query_embedding=vector, **filters)
+    vectors.store(session_id, vector, results, key)
+    return results
+
+
+def doctor_filters(params, detected_language=None):
+    """find_related_doctors filters from request params.
+
+    `language` is a name or ISO code ("auto" = the language of the message),
+    `min_experience` a number of years and `specialization` one or more
+    specializations (a list or a comma-separated string).
+    """
+    language = params.get('language') or None
+    if language == 'auto':
+        language = detected_language
+    min_experience = params.get('min_experience')
+    min_experience = float(min_experience) if min_experience not in (None, '') else None
+    specializations = params.get('specialization') or params.get('specializations')
+    if isinstance(specializations, str):
+        specializations = [s.strip() for s in specializations.split(',') if s.strip()]
+    return {'language': language, 'min_experience': min_experience, 'specializations': specializations or None}
+
+
+@app.route('/api/doctors/search', methods=['GET'])
+def search_doctors():
+    """Doctors matching a symptom description (`?q=&language=&min_experience=&specialization=&limit=`)"""
+    query = (request.args.get('q') or '').strip()
+    if not query:
+        return jsonify({'error': 'q is required', 'success': False}), 400
+    try:
+        limit = min(max(int(request.args.get('limit', 3)), 1), 50)
+        filters = doctor_filters(request.args, detect_language(query))
+    except ValueError:
+        return jsonify({'error': 'invalid limit/min_experience', 'success': False}), 400
+    doctors = find_related_doctors(query, limit=limit, **filters)
+    return jsonify({'doctors': doctors, 'filters': filters, 'success': True})
+
+
 @app.route('/api/history', methods=['GET'])
 def get_history():
-    """Return chat history for the active session"""
+    """Return chat history for the active session (`?after=<id or timestamp>&limit=`)"""
     session_id = session.get('session_id')
     if not session_id:
         return jsonify({'messages': []})
-    messages = get_chat_history(session_id)
-    return jsonify({'messages': messages, 'success': True})
+    return _history_response(session_id)
 
 
 @app.route('/api/sessions', methods=['GET'])
 def get_sessions_route():
-    """Return all sessions"""
-    sessions = get_all_sessions()
-    return jsonify({'sessions': sessions, 'success': True})
+    """Return one page of sessions (`?before=<last_active>&limit=`)"""
+    try:
+        limit = min(max(int(request.args.get('limit', SESSION_PAGE_SIZE)), 1), SESSION_PAGE_MAX)
+        before = _parse_timestamp(request.args.get('before'))
+    except ValueError:
+        return jsonify({'error': 'invalid before/limit', 'success': False}), 400
+    sessions = get_all_sessions(before, limit)
+    # Exact cursor for the next page (jsonify renders datetimes at second precision)
+    next_before = sessions[-1]['last_active'].isoformat() if len(sessions) == limit else None
+    return jsonify({'sessions': sessions, 'next_before': next_before, 'success': True})
+
+
+def _parse_timestamp(value):
+    """Parse an ISO-8601 query parameter (naive values are UTC); None when absent"""
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _history_response(session_id, **extra):
+    """History JSON for a session, or 304 when the client's copy is current"""
+    after = request.args.get('after')
+    try:
+        limit = int(request.args['limit']) if request.args.get('limit') else None
+        if limit is not None and limit < 1:
+            raise ValueError('limit must be positive')
+    except ValueError:
+        return jsonify({'error': 'invalid limit', 'success': False}), 400
+
+    etag = history_etag(session_id, after, limit)
+    if etag and request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+        response.set_etag(etag)
+        return response
+
+    try:
+        after_ts = resolve_history_cursor(session_id, after)
+    except ValueError:
+        return jsonify({'error': 'invalid after cursor', 'success': False}), 400
+    messages = get_chat_history(session_id, after_ts, limit)
+    response = jsonify({
+        'messages': messages,
+        'next_after': messages[-1]['id'] if messages else after,
+        'success': True,
+        **extra
+    })
+    if etag:
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 
 @app.route('/api/session/<session_id>', methods=['GET'])
 def load_session(session_id):
-    """Load messages from a specific session"""
+    """Load messages from a specific session (`?after=<id or timestamp>&limit=`)"""
     session['session_id'] = session_id
-    messages = get_chat_history(session_id)
-    return jsonify({
-        'messages': messages,
-        'session_id': session_id,
-        'success': True
-    })
+    return _history_response(session_id, session_id=session_id)
 
 
 @app.route('/api/session/<session_id>', methods=['DELETE'])
@@ -593,6 +620,7 @@ def delete_chat_session(session_id):
     delete_session(session_id)
     if session.get('session_id') == session_id:
         session['session_id'] = str(uuid.uuid4())
+        get_recent_messages_cache().start(session['session_id'])
     return jsonify({'message': 'Session deleted', 'success': True})
 
 
@@ -601,7 +629,12 @@ def clear():
     """Reset conversation state (in-memory only)"""
     session_id = session.get('session_id')
     if session_id in conversation_states:
+        discard_fold(conversation_states[session_id].get('summary_job'))
         conversation_states[session_id] = initialize_conversation_state()
+    if session_id:
+        # Recommendations and prompt context must not carry over the cleared symptoms
+        get_symptom_vectors().drop(session_id)
+        get_recent_messages_cache().start(session_id)
     return jsonify({'message': 'Conversation cleared', 'success': True})
 
 
@@ -610,6 +643,7 @@ def new_chat():
     """Create a new session"""
     new_session_id = str(uuid.uuid4())
     session['session_id'] = new_session_id
+    get_recent_messages_cache().start(new_session_id)
     return jsonify({
         'message': 'New chat created',
         'session_id': new_session_id,
@@ -619,7 +653,16 @@ def new_chat():
 
 @app.route('/api/health')
 def health():
-    return jsonify({'status': 'healthy', 'service': 'CareMate'})
+    status = {'status': 'healthy', 'service': 'CareMate'}
+    status['storage'] = storage.name if storage is not None else None
+    if message_writer is not None:
+        status['message_queue'] = message_writer.stats()
+    if retention is not None:
+        status['retention'] = retention.stats()
+    status['session_cache'] = get_recent_messages_cache().stats()
+    status['symptom_vectors'] = get_symptom_vectors().stats()
+    status['search'] = search_stats()
+    return jsonify(status)
 
 
 # ----- Admin: create or update doctor (canonicalize before write) -----
@@ -646,6 +689,8 @@ def upsert_doctor():
 
     if not email:
         return jsonify({'error': 'email is required', 'success': False}), 400
+    if storage is None:
+        return jsonify({'error': 'database not configured', 'success': False}), 503
 
     # Canonicalize/normalize the profile
     try:
@@ -653,10 +698,9 @@ def upsert_doctor():
     except Exception as e:
         return jsonify({'error': f'failed to normalize profile: {e}', 'success': False}), 500
 
-    # Build document to upsert
+    # Build document to upsert (keyed by email)
     doc = {
         'name': name,
-        'email': email,
         'role': 'doctor',
         'doctorProfile': normalized,
     }
@@ -666,34 +710,25 @@ def upsert_doctor():
         doc['bio'] = normalized.get('bio')
 
     try:
-        result = db['users'].update_one({'email': email}, {'$set': doc}, upsert=True)
+        doctor_id = storage.upsert_doctor(email, doc)
     except Exception as e:
         return jsonify({'error': f'database upsert failed: {e}', 'success': False}), 500
+    finally:
+        invalidate_doctor_index()
 
     # Compute and persist embedding for the doctor text (best-effort)
     try:
         # Build text used for embedding (same logic as find_related_doctors)
-        parts = [
-            normalized.get('specialization',''),
-            ' '.join(normalized.get('qualifications', [])) if normalized.get('qualifications') else '',
-            f"{normalized.get('yearsExperience','')} years experience" if normalized.get('yearsExperience') else '',
-            normalized.get('bio',''),
-            normalized.get('clinic',''),
-            ' '.join(normalized.get('languages', [])) if normalized.get('languages') else ''
-        ]
-        doc_text = ' '.join([p for p in parts if p]).strip()
-        if not doc_text:
-            doc_text = name or email
-
-        emb = get_embedding(doc_text)
+        emb = get_embedding(doctor_text(name, email, normalized))
         # store as plain list so other scripts can read
-        db['users'].update_one({'email': email}, {'$set': {'embedding': emb.tolist()}})
+        storage.update_doctor(doctor_id, {'embedding': emb.tolist()})
+        invalidate_doctor_index()
     except Exception as e:
         # Do not fail the whole request because embedding failed; return warning
         return jsonify({
             'message': 'doctor upserted, but embedding failed',
             'email': email,
-            'upserted': bool(result.upserted_id or result.matched_count),
+            'upserted': True,
             'warning': str(e),
             'success': True
         }), 200
@@ -701,11 +736,48 @@ def upsert_doctor():
     return jsonify({
         'message': 'doctor upserted',
         'email': email,
-        'upserted': bool(result.upserted_id or result.matched_count),
+        'upserted': True,
         'success': True
     })
 
 
+def embed_doctor_texts(texts):
+    """Embed a batch of doctor texts in one model call"""
+    return embedder.encode(texts, normalize_embeddings=True, batch_size=64)
+
+
+@app.route('/api/admin/doctors/import', methods=['POST'])
+def import_doctors_route():
+    """Bulk create/update doctors from an NDJSON or CSV request body.
+
+    The body is read as a stream (`Content-Type: application/x-ndjson` or
+    `text/csv`, or `?format=csv|ndjson`), rows are upserted in batches, and
+    the response streams one NDJSON result per row followed by a
+    `{"summary": ...}` line. Admin only, like `/api/admin/doctor`.
+    """
+    if storage is None:
+        return jsonify({'error': 'database not configured', 'success': False}), 503
+    fmt = request.args.get('format') or detect_format(content_type=request.content_type)
+    if fmt not in ('csv', 'ndjson'):
+        return jsonify({'error': 'format must be csv or ndjson', 'success': False}), 400
+    lines = io.TextIOWrapper(request.stream, encoding='utf-8-sig', newline='')
+
+    def generate():
+        results = []
+        try:
+            for result in import_doctors(read_rows(lines, fmt), storage, embed_doctor_texts):
+                results.append(result)
+                yield json.dumps(result) + '\n'
+        finally:
+            # Rows written before any failure must show up in searches
+            invalidate_doctor_index()
+        summary = summarize(results)
+        print(f"Doctor import: {summary['inserted']} inserted, {summary['updated']} updated, {summary['errors']} errors")
+        yield json.dumps({'summary': summary, 'success': summary['errors'] == 0}) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
 # --------------------------------------
 # Run app
 # --------------------------------------
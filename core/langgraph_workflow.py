@@ -12,6 +12,8 @@ from agents.explanation_agent import ExplanationAgent
 def route_after_planner(state: AgentState):
     if state["current_tool"] == "retriever":
         return "retriever"
+    elif state["current_tool"] == "tavily":
+        return "tavily"
     else:
         return "llm_agent"
 
@@ -40,7 +42,10 @@ def route_after_wiki(state: AgentState):
         return "tavily"
 
 def route_after_tavily(state: AgentState):
-    return "executor"
+    if state.get("tavily_success", False) or state.get("llm_attempted", False):
+        return "executor"
+    else:
+        return "llm_agent"  # Routed straight to Tavily and it found nothing
 
 def create_workflow():
     workflow = StateGraph(AgentState)
@@ -67,6 +72,7 @@ def create_workflow():
         route_after_planner,
         {
             "retriever": "retriever",
+            "tavily": "tavily",
             "llm_agent": "llm_agent"
         }
     )
@@ -106,7 +112,8 @@ def create_workflow():
         "tavily",
         route_after_tavily,
         {
-            "executor": "executor"
+            "executor": "executor",
+            "llm_agent": "llm_agent"
         }
     )
     
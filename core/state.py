@@ -9,10 +9,13 @@ class AgentState(TypedDict):
     source: str
     search_query: Optional[str]
     conversation_history: List[dict]
+    conversation_summary: str
+    summary_job: Optional[str]
     llm_attempted: bool
     llm_success: bool
     rag_attempted: bool
     rag_success: bool
+    retrieval_scores: Optional[dict]
     wiki_attempted: bool
     wiki_success: bool
     tavily_attempted: bool
@@ -28,10 +31,13 @@ def initialize_conversation_state():
         "source": "",
         "search_query": None,
         "conversation_history": [],
+        "conversation_summary": "",
+        "summary_job": None,
         "llm_attempted": False,
         "llm_success": False,
         "rag_attempted": False,
         "rag_success": False,
+        "retrieval_scores": None,
         "wiki_attempted": False,
         "wiki_success": False,
         "tavily_attempted": False,
@@ -41,7 +47,7 @@ def initialize_conversation_state():
     }
 
 def reset_query_state(state: AgentState) -> AgentState:
-    """Reset state for new query while preserving conversation history"""
+    """Reset state for new query while preserving conversation history and summary"""
     state.update({
         "question": "",
         "documents": [],
@@ -52,6 +58,7 @@ def reset_query_state(state: AgentState) -> AgentState:
         "llm_success": False,
         "rag_attempted": False,
         "rag_success": False,
+        "retrieval_scores": None,
         "wiki_attempted": False,
         "wiki_success": False,
         "tavily_attempted": False,
@@ -1,37 +1,28 @@
-import os
 from dotenv import load_dotenv
 from core.langgraph_workflow import create_workflow
 from core.state import initialize_conversation_state, reset_query_state
-from tools.pdf_loader import process_pdf
-from tools.vector_store import get_or_create_vectorstore
+from tools.corpora import initialize_corpora
+from tools.hybrid_search import warm_up_retrieval
 
 load_dotenv()
 
 def initialize_system():
-    """Initialize the system and create vector database if needed"""
-    pdf_path = './data/medical_book.pdf'
-    persist_dir = './medical_db/'
-    
+    """Initialize the system and create vector databases if needed"""
     print("\n" + "="*60)
     print("Initializing Medical AI System...")
     print("="*60)
     
-    # Try to load existing database first
-    existing_db = get_or_create_vectorstore(persist_dir=persist_dir)
-    
-    if not existing_db:
-        # Check if PDF exists to create new database
-        if os.path.exists(pdf_path):
-            print("Processing PDF and creating vector database...")
-            doc_splits = process_pdf(pdf_path)
-            vectorstore = get_or_create_vectorstore(documents=doc_splits, persist_dir=persist_dir)
-            if vectorstore:
-                print("Vector database created successfully!")
-            else:
-                print("Failed to create vector database")
-        else:
-            print(f"PDF not found at {pdf_path}")
-            print("System will work with limited functionality (no RAG)")
+    # Load each corpus shard, creating it from its PDFs when missing
+    corpora = initialize_corpora()
+    if corpora:
+        print(f"Vector databases ready: {', '.join(corpora)}")
+        try:
+            warm_up_retrieval()
+        except Exception as e:
+            print(f"Warning: retrieval warm-up failed: {e}")
+    else:
+        print("No vector database and no PDFs found")
+        print("System will work with limited functionality (no RAG)")
 
 def main():
     # Initialize system
@@ -0,0 +1,321 @@
+"""CareMate admin CLI for the doctor directory.
+
+Usage:
+    python scripts/admin.py doctors                          # table of doctors + specialization summary
+    python scripts/admin.py doctors --format ndjson > doctors.ndjson
+    python scripts/admin.py fix-specializations [--apply]    # canonicalize doctorProfile.specialization
+    python scripts/admin.py embed [--force] [--workers 4]    # (re)compute doctor embeddings
+    python scripts/admin.py rank "fever and cough" --top 5   # sample ranking for a symptom text
+    python scripts/admin.py import doctors.csv               # bulk import (see tools/doctor_import.py)
+
+Every command streams doctors from a server-side cursor that loads only the
+fields it needs (listings never transfer embeddings) in batches of
+--batch-size, and prints rows as they arrive, as an aligned table or NDJSON.
+Commands that write send batched bulk updates from --workers threads.
+
+Storage is the same as the app (STORAGE_BACKEND / MONGO_URI / SQLITE_PATH);
+--uri overrides MONGO_URI.
+"""
+
+import argparse
+import heapq
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# Ensure repo root is on sys.path so `tools` is importable when running scripts
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from tools.doctor_import import (DOCTOR_EMBED_MODEL, DOCTOR_IMPORT_BATCH, detect_format, doctor_text, import_doctors,
+                                 read_rows, summarize)
+from tools.specialization_utils import canonicalize_spec, implied_specializations, normalize_profile, specialization_key
+from tools.storage import open_storage
+
+
+class Output:
+    """Streams records as NDJSON lines or as rows of a fixed-width table"""
+
+    def __init__(self, fmt, columns):
+        self.fmt = fmt
+        self.columns = columns  # [(key, header, width)]
+        self.header_printed = False
+
+    def row(self, record):
+        if self.fmt == "ndjson":
+            print(json.dumps(record, default=str, ensure_ascii=False))
+            return
+        if not self.header_printed:
+            print("  ".join(header.ljust(width) for _, header, width in self.columns).rstrip())
+            print("  ".join("-" * width for _, _, width in self.columns))
+            self.header_printed = True
+        cells = []
+        for key, _, width in self.columns:
+            text = str(record.get(key, "") if record.get(key) is not None else "")
+            cells.append(text[:width - 1] + "…" if len(text) > width else text.ljust(width))
+        print("  ".join(cells).rstrip())
+
+    def summary(self, title, counts):
+        if self.fmt == "ndjson":
+            print(json.dumps({"summary": counts}, default=str))
+            return
+        print(f"\n{title}:")
+        for key, value in counts.items():
+            print(f"  {key}: {value}")
+
+
+def display_name(d):
+    # Support multiple name representations
+    name_obj = d.get("name")
+    if isinstance(name_obj, dict):
+        return f"{name_obj.get('first', '') or ''} {name_obj.get('last', '') or ''}".strip() or name_obj.get("full", "")
+    return name_obj or "<no name>"
+
+
+def write_in_parallel(storage, updates, batch_size, workers):
+    """Send (doctor_id, fields[, expected]) updates as bulk batches from a thread pool; returns the modified count"""
+    modified = 0
+    pending = set()
+    batch = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for update in updates:
+            batch.append(update)
+            if len(batch) >= batch_size:
+                pending.add(pool.submit(storage.bulk_update_doctors, batch))
+                batch = []
+                # Keep at most two batches per worker in flight so memory stays bounded
+                if len(pending) >= 2 * workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    modified += sum(f.result() for f in done)
+        if batch:
+            pending.add(pool.submit(storage.bulk_update_doctors, batch))
+        modified += sum(f.result() for f in pending)
+    return modified
+
+
+def cmd_doctors(storage, args):
+    out = Output(args.format, [("_id", "ID", 24), ("name", "NAME", 24), ("email", "EMAIL", 28),
+                               ("specialization", "SPECIALIZATION", 20), ("embedding", "EMB", 3),
+                               ("profile", "PROFILE", 60)])
+    specs_count = {}
+    for d in storage.iter_doctors(batch_size=args.batch_size):
+        profile = d.get("doctorProfile") or {}
+        specialization = (profile.get("specialization", "") or "").strip()
+        bio = profile.get("bio") or d.get("bio", "") or ""
+        qualifications = profile.get("qualifications", [])
+        snippet = " | ".join(p for p in [specialization, ", ".join(qualifications), bio[:120]] if p)[:200]
+        out.row({
+            "_id": d["_id"], "name": display_name(d), "email": d.get("email", ""),
+            "specialization": specialization, "embedding": "Y" if d.get("has_embedding") else "N",
+            "profile": snippet,
+        })
+        # tally specializations
+        key = specialization.lower() if specialization else "<unknown>"
+        specs_count[key] = specs_count.get(key, 0) + 1
+    if not specs_count:
+        print("No doctors found", file=sys.stderr)
+        return
+    out.summary("Specialization summary", dict(sorted(specs_count.items(), key=lambda x: -x[1])))
+
+
+def cmd_fix_specializations(storage, args):
+    out = Output(args.format, [("_id", "ID", 24), ("old", "OLD", 30), ("new", "NEW", 30)])
+    counts = {"changes": 0}
+
+    def changes():
+        for d in storage.iter_doctors(("doctorProfile.specialization",), batch_size=args.batch_size):
+            raw = (d.get("doctorProfile") or {}).get("specialization")
+            if not isinstance(raw, str):
+                continue
+            new = canonicalize_spec(raw)
+            if new and new != raw:
+                out.row({"_id": d["_id"], "old": raw, "new": new})
+                counts["changes"] += 1
+                # Only written if nobody changed the specialization since it was read
+                yield d["_id"], {"doctorProfile.specialization": new}, {"doctorProfile.specialization": raw}
+
+    if args.apply:
+        counts["modified"] = write_in_parallel(storage, changes(), args.batch_size, args.workers)
+        # Doctors edited between the read and the write keep their newer value
+        counts["skipped"] = counts["changes"] - counts["modified"]
+    else:
+        for _ in changes():
+            pass
+        if counts["changes"]:
+            print("\nDry run only. To apply these changes run the command with --apply", file=sys.stderr)
+    out.summary("Specialization fixes", counts)
+
+
+def _load_model():
+    from sentence_transformers import SentenceTransformer
+
+    print(f"Loading embedding model: {DOCTOR_EMBED_MODEL}", file=sys.stderr)
+    return SentenceTransformer(DOCTOR_EMBED_MODEL)
+
+
+def cmd_embed(storage, args):
+    model = _load_model()
+    out = Output(args.format, [("_id", "ID", 24), ("name", "NAME", 30), ("specialization", "SPECIALIZATION", 24)])
+    start = time.time()
+    counts = {"embedded": 0}
+
+    def batches():
+        batch = []
+        docs = storage.iter_doctors(("name", "email", "doctorProfile", "bio"), missing_embedding=not args.force,
+                                    batch_size=args.batch_size)
+        for d in docs:
+            batch.append(d)
+            if len(batch) >= args.embed_batch:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def updates():
+        for batch in batches():
+            texts = []
+            for d in batch:
+                profile = d.get("doctorProfile") or {}
+                normalized = normalize_profile(profile)
+                d["_fields"] = {}
+                # Normalize specialization in DB so embeddings include canonical specialization
+                if normalized.get("specialization") and normalized.get("specialization") != profile.get("specialization"):
+                    d["_fields"]["doctorProfile.specialization"] = normalized["specialization"]
+                texts.append(doctor_text(display_name(d), d.get("email", ""),
+                                         {**normalized, "bio": normalized.get("bio") or d.get("bio", "")}))
+            vectors = model.encode(texts, normalize_embeddings=True, batch_size=64)
+            for d, vector in zip(batch, vectors):
+                out.row({"_id": d["_id"], "name": display_name(d),
+                         "specialization": (d.get("doctorProfile") or {}).get("specialization", "")})
+                counts["embedded"] += 1
+                yield d["_id"], {**d["_fields"], "embedding": [float(v) for v in vector]}
+
+    counts["modified"] = write_in_parallel(storage, updates(), args.batch_size, args.workers)
+    counts["seconds"] = round(time.time() - start, 1)
+    out.summary("Embeddings", counts)
+
+
+def cmd_rank(storage, args):
+    # Default scoring mirrors app.py logic (cosine + keyword boosts)
+    import numpy as np
+
+    model = _load_model()
+    q_emb = np.asarray(model.encode(args.query, normalize_embeddings=True), dtype=float)
+    q_text = args.query.lower()
+    implied_specs = implied_specializations(args.query)
+    top = []
+    docs = storage.iter_doctors(("name", "doctorProfile", "embedding"), batch_size=args.batch_size)
+    for i, doc in enumerate(docs):
+        emb = doc.get("embedding")
+        if not emb:
+            continue
+        emb_np = np.asarray(emb, dtype=float)
+        dn = np.linalg.norm(emb_np)
+        if dn == 0:
+            continue
+        profile = doc.get("doctorProfile") or {}
+        specialization = profile.get("specialization", "")
+        score = float(np.dot(q_emb, emb_np) / (np.linalg.norm(q_emb) * dn))
+        if specialization_key(specialization) in implied_specs:
+            score += 0.35
+        if specialization and specialization.lower() in q_text:
+            score += 0.12
+        for qual in profile.get("qualifications", []):
+            if qual and qual.lower() in q_text:
+                score += 0.05
+        # Only the best `top` doctors are kept while streaming
+        entry = (score, i, {"name": display_name(doc), "specialization": specialization, "score": round(score, 4)})
+        if len(top) < args.top:
+            heapq.heappush(top, entry)
+        else:
+            heapq.heappushpop(top, entry)
+    out = Output(args.format, [("name", "NAME", 30), ("specialization", "SPECIALIZATION", 24), ("score", "SCORE", 8)])
+    for _, _, row in sorted(top, reverse=True):
+        out.row(row)
+
+
+def cmd_import(storage, args):
+    embed_batch = None
+    if not args.no_embed:
+        model = _load_model()
+        embed_batch = lambda texts: model.encode(texts, normalize_embeddings=True, batch_size=64)
+
+    out = Output(args.format, [("line", "LINE", 6), ("email", "EMAIL", 32), ("status", "STATUS", 9),
+                               ("error", "ERROR", 60)])
+    fmt = args.input_format or detect_format(filename=args.file)
+    start = time.time()
+    results = []
+    with open(args.file, encoding="utf-8-sig", newline="") as f:
+        for result in import_doctors(read_rows(f, fmt), storage, embed_batch, args.import_batch):
+            results.append(result)
+            if args.all_rows or result["status"] == "error" or result.get("warning"):
+                out.row({**result, "error": result.get("error") or result.get("warning")})
+
+    summary = summarize(results)
+    summary.pop("failed")
+    summary["seconds"] = round(time.time() - start, 1)
+    out.summary("Import", summary)
+    if summary["errors"]:
+        sys.exit(1)
+
+
+def build_parser():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--uri", help="MongoDB URI (overrides MONGO_URI env)")
+    common.add_argument("--format", choices=["table", "ndjson"], default="table", help="output format")
+    common.add_argument("--batch-size", type=int, default=1000, help="cursor batch and bulk write size")
+    common.add_argument("--workers", type=int, default=4, help="threads sending bulk writes")
+
+    parser = argparse.ArgumentParser(description="CareMate doctor directory admin")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("doctors", parents=[common], help="list doctors")
+    p.set_defaults(func=cmd_doctors)
+
+    p = commands.add_parser("fix-specializations", parents=[common], help="canonicalize specializations")
+    p.add_argument("--apply", action="store_true", help="apply changes to the DB")
+    p.set_defaults(func=cmd_fix_specializations)
+
+    p = commands.add_parser("embed", parents=[common], help="compute doctor embeddings")
+    p.add_argument("--force", action="store_true", help="recompute embeddings for all doctors")
+    p.add_argument("--embed-batch", type=int, default=256, help="doctors per model call")
+    p.set_defaults(func=cmd_embed)
+
+    p = commands.add_parser("rank", parents=[common], help="rank doctors for a symptom text")
+    p.add_argument("query")
+    p.add_argument("--top", type=int, default=5, help="top K to show")
+    p.set_defaults(func=cmd_rank)
+
+    p = commands.add_parser("import", parents=[common], help="bulk import doctors from NDJSON or CSV")
+    p.add_argument("file", help="input file (.ndjson/.jsonl or .csv)")
+    p.add_argument("--input-format", choices=["ndjson", "csv"], help="input format (default: from the file name)")
+    p.add_argument("--import-batch", type=int, default=DOCTOR_IMPORT_BATCH, help="rows per embed + upsert batch")
+    p.add_argument("--no-embed", action="store_true", help="skip embeddings")
+    p.add_argument("--all-rows", action="store_true", help="print every row, not only failures and warnings")
+    p.set_defaults(func=cmd_import)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    load_dotenv()
+    if args.uri:
+        os.environ["MONGO_URI"] = args.uri
+    storage = open_storage("mongo" if args.uri else None)
+    if storage is None:
+        sys.exit("No storage configured (set MONGO_URI or STORAGE_BACKEND, or pass --uri)")
+    storage.ensure_schema()
+    try:
+        args.func(storage, args)
+    finally:
+        storage.close()
+
+
+if __name__ == "__main__":
+    main()
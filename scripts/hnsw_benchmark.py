@@ -0,0 +1,151 @@
+"""Recall/latency benchmark of Chroma HNSW parameters on a chunk store.
+
+Usage:
+    python scripts/hnsw_benchmark.py --persist-dir ./medical_db/ \\
+        --m 8,16,32 --construction-ef 100,200 --search-ef 10,32,64,128 --k 10
+
+    # Benchmark the store of a configured corpus and save the table
+    python scripts/hnsw_benchmark.py --corpus textbook --output reports/hnsw.md
+
+The embeddings of the existing store are copied into in-memory collections,
+one per (M, construction_ef) pair, and queried at every search_ef. Queries
+are the opening words of randomly sampled chunks. recall@k is measured
+against brute-force cosine search over the same vectors. Put the chosen
+values in the corpus `hnsw` entry (tools/corpora.py) or the HNSW_* env vars.
+"""
+
+import argparse
+import itertools
+import os
+import sys
+import time
+from pathlib import Path
+
+import chromadb
+import numpy as np
+
+# Ensure repo root is on sys.path so `tools` is importable when running scripts
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from tools.corpora import get_corpus
+from tools.vector_store import apply_search_ef, embed_query, hnsw_metadata, open_vectorstore
+
+PAGE_SIZE = 1000
+ADD_BATCH_SIZE = 5000
+
+
+def load_collection(persist_dir):
+    """(ids, texts, float32 normalized vectors) of every chunk in the store"""
+    collection = open_vectorstore(persist_dir)._collection
+    ids, texts, vectors = [], [], []
+    for offset in range(0, collection.count(), PAGE_SIZE):
+        page = collection.get(limit=PAGE_SIZE, offset=offset, include=["documents", "embeddings"])
+        ids.extend(page["ids"])
+        texts.extend(page["documents"])
+        vectors.extend(page["embeddings"])
+    vectors = np.asarray(vectors, dtype=np.float32)
+    vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    return ids, texts, vectors
+
+
+def sample_queries(texts, n, words=12, seed=0):
+    rng = np.random.RandomState(seed)
+    rows = rng.choice(len(texts), min(n, len(texts)), replace=False)
+    return np.stack([embed_query(" ".join(texts[row].split()[:words])) for row in rows])
+
+
+def brute_force(vectors, queries, k):
+    return [set(np.argpartition(-(vectors @ q), k - 1)[:k].tolist()) for q in queries]
+
+
+def build_collection(client, name, ids, vectors, params):
+    start = time.perf_counter()
+    try:
+        client.delete_collection(name)
+    except Exception:
+        pass
+    collection = client.create_collection(name, metadata=hnsw_metadata(params))
+    for begin in range(0, len(ids), ADD_BATCH_SIZE):
+        collection.add(ids=ids[begin:begin + ADD_BATCH_SIZE],
+                       embeddings=vectors[begin:begin + ADD_BATCH_SIZE].tolist())
+    return collection, time.perf_counter() - start
+
+
+def run_queries(collection, queries, truth, positions, k):
+    latencies, hits = [], 0
+    for q, expected in zip(queries, truth):
+        start = time.perf_counter()
+        result = collection.query(query_embeddings=[q.tolist()], n_results=k, include=[])
+        latencies.append(time.perf_counter() - start)
+        hits += len(expected & {positions[i] for i in result["ids"][0]})
+    return hits / (len(truth) * k), latencies
+
+
+def parse_grid(value):
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--persist-dir', type=str, default='./medical_db/', help='Vector store directory')
+    parser.add_argument('--corpus', type=str, help='Benchmark the store of this configured corpus')
+    parser.add_argument('--m', type=str, default='8,16,32', help='Comma-separated M values')
+    parser.add_argument('--construction-ef', type=str, default='100,200', help='Comma-separated construction_ef values')
+    parser.add_argument('--search-ef', type=str, default='10,32,64,128', help='Comma-separated search_ef values')
+    parser.add_argument('--queries', type=int, default=200, help='Number of sampled queries')
+    parser.add_argument('--k', type=int, default=10, help='Recall cut-off')
+    parser.add_argument('--output', type=str, help='Also write the report as Markdown to this file')
+    args = parser.parse_args()
+
+    persist_dir = args.persist_dir
+    if args.corpus:
+        corpus = get_corpus(args.corpus)
+        if not corpus:
+            print(f'Unknown corpus: {args.corpus}')
+            return
+        persist_dir = corpus['persist_dir']
+
+    ids, texts, vectors = load_collection(persist_dir)
+    if not ids:
+        print(f'No chunks in the vector store at {persist_dir}')
+        return
+    positions = {cid: i for i, cid in enumerate(ids)}
+    queries = sample_queries(texts, args.queries)
+    truth = brute_force(vectors, queries, args.k)
+    print(f'{len(ids)} chunks, {len(queries)} queries, recall@{args.k} vs brute force')
+
+    client = chromadb.EphemeralClient()
+    search_efs = parse_grid(args.search_ef)
+    rows = []
+    for m, construction_ef in itertools.product(parse_grid(args.m), parse_grid(args.construction_ef)):
+        params = {"M": m, "construction_ef": construction_ef, "search_ef": search_efs[0]}
+        collection, build_s = build_collection(client, "hnsw_benchmark", ids, vectors, params)
+        for search_ef in search_efs:
+            if not apply_search_ef(collection, search_ef):
+                # This Chroma version cannot change search_ef in place, rebuild with it
+                collection, build_s = build_collection(client, "hnsw_benchmark", ids, vectors,
+                                                       {**params, "search_ef": search_ef})
+            recall, latencies = run_queries(collection, queries, truth, positions, args.k)
+            rows.append((m, construction_ef, search_ef, recall, float(np.percentile(latencies, 50)) * 1000.0,
+                         float(np.percentile(latencies, 99)) * 1000.0, build_s))
+            print(f'M={m} construction_ef={construction_ef} search_ef={search_ef}: recall={recall:.3f}')
+
+    lines = [f"{len(ids)} chunks, {len(queries)} queries, recall@{args.k} vs brute force", "",
+             "| M | construction_ef | search_ef | recall | p50 ms | p99 ms | build s |",
+             "|---|---|---|---|---|---|---|"]
+    for m, construction_ef, search_ef, recall, p50, p99, build_s in rows:
+        lines.append(f"| {m} | {construction_ef} | {search_ef} | {recall:.3f} | {p50:.2f} | {p99:.2f} | {build_s:.1f} |")
+    report = "\n".join(lines)
+    print(report)
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(report + "\n")
+        print(f'Report written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
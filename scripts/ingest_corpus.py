@@ -0,0 +1,89 @@
+"""Incrementally ingest PDFs into the medical vector store.
+
+Usage:
+    # Add or update documents (only new/changed chunks are embedded)
+    python scripts/ingest_corpus.py data/medical_book.pdf data/guidelines.pdf
+
+    # Ingest every PDF in a directory
+    python scripts/ingest_corpus.py --dir data
+
+    # Also drop chunks of documents in data/ that no longer exist on disk
+    python scripts/ingest_corpus.py --dir data --prune
+
+    # Ingest the configured sources of one corpus (see tools/corpora.py), or all of them
+    python scripts/ingest_corpus.py --corpus drug_monographs
+    python scripts/ingest_corpus.py --all-corpora
+
+    # Also export the store to the memory-mapped flat index (VECTOR_BACKEND=flat)
+    python scripts/ingest_corpus.py --all-corpora --export-flat
+
+Chunks are identified by a content hash of (source, page, text) and tracked
+in `manifest.json` next to the Chroma store.
+"""
+
+import argparse
+import glob
+import os
+import sys
+from pathlib import Path
+
+# Ensure repo root is on sys.path so `tools` is importable when running scripts
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from tools.corpora import get_corpus, get_enabled_corpora, resolve_sources, source_dirs
+from tools.ingest import ingest_sources
+from tools.vector_store import export_flat_index, open_vectorstore
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('paths', nargs='*', help='PDF files to ingest')
+    parser.add_argument('--dir', type=str, help='Ingest every PDF in this directory')
+    parser.add_argument('--persist-dir', type=str, default='./medical_db/', help='Vector store directory')
+    parser.add_argument('--corpus', type=str, help='Ingest the configured sources of this corpus')
+    parser.add_argument('--all-corpora', action='store_true', help='Ingest every enabled corpus')
+    parser.add_argument('--prune', action='store_true',
+                        help='Remove chunks of sources missing on disk (only under the given directories)')
+    parser.add_argument('--force', action='store_true', help='Re-chunk documents even if the file is unchanged')
+    parser.add_argument('--export-flat', action='store_true', help='Export the store to the flat mmap index afterwards')
+    args = parser.parse_args()
+
+    if args.corpus or args.all_corpora:
+        if args.all_corpora:
+            corpora = get_enabled_corpora()
+        else:
+            corpus = get_corpus(args.corpus)
+            if not corpus:
+                print(f'Unknown corpus: {args.corpus}')
+                return
+            corpora = [corpus]
+        for corpus in corpora:
+            print(f"Corpus '{corpus['name']}' -> {corpus['persist_dir']}")
+            ingest_sources(resolve_sources(corpus), persist_dir=corpus['persist_dir'],
+                           prune=args.prune, prune_dirs=source_dirs(corpus), force=args.force)
+            if args.export_flat:
+                export_flat(corpus['persist_dir'])
+        return
+
+    paths = list(args.paths)
+    if args.dir:
+        paths.extend(sorted(glob.glob(os.path.join(args.dir, '*.pdf'))))
+    if not paths:
+        print('No PDFs given. Pass file paths or --dir.')
+        return
+
+    prune_dirs = [args.dir] if args.dir else None
+    ingest_sources(paths, persist_dir=args.persist_dir, prune=args.prune, prune_dirs=prune_dirs, force=args.force)
+    if args.export_flat:
+        export_flat(args.persist_dir)
+
+
+def export_flat(persist_dir):
+    if export_flat_index(open_vectorstore(persist_dir), persist_dir) is None:
+        print(f'Vector store at {persist_dir} is empty, nothing to export')
+
+
+if __name__ == '__main__':
+    main()
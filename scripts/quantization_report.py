@@ -0,0 +1,142 @@
+"""Recall/latency/memory report for compressed chunk vectors.
+
+Usage:
+    # Compare every quantization mode against exact search on the flat index
+    python scripts/quantization_report.py --persist-dir ./medical_db/ --output reports/quantization.md
+
+    # Persist the chosen mode next to the flat index (used when VECTOR_BACKEND=flat)
+    python scripts/quantization_report.py --write pca+int8
+
+Queries are the opening words of randomly sampled chunks, embedded with the
+retrieval model. Ground truth is exact float32 search over the same index, and
+every compressed mode re-ranks its shortlist with the full-precision rows, so
+recall@k reflects what retrieval would actually return. The flat index must
+exist first (`python scripts/ingest_corpus.py --export-flat`).
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Ensure repo root is on sys.path so `tools` is importable when running scripts
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from tools.flat_index import FlatIndex, flat_dir, flat_index_exists, publish_quantized
+from tools.quantization import CODES_FILENAME, MODES, PCA_DIM, PQ_SUBSPACES, RERANK_FACTOR, VectorCompressor
+from tools.vector_store import embed_query
+
+
+def sample_queries(index, n, words=12, seed=0):
+    rng = np.random.RandomState(seed)
+    rows = rng.choice(len(index), min(n, len(index)), replace=False)
+    texts = [" ".join(index.document(int(row)).page_content.split()[:words]) for row in rows]
+    return np.stack([embed_query(text) for text in texts])
+
+
+def exact_top_k(vectors, queries, k):
+    truth = []
+    for q in queries:
+        scores = vectors @ q
+        truth.append(set(np.argpartition(-scores, k - 1)[:k].tolist()))
+    return truth
+
+
+def percentile_ms(samples, pct):
+    return float(np.percentile(samples, pct) * 1000.0)
+
+
+def evaluate(vectors, queries, truth, k, compressor=None, codes=None, rerank_factor=RERANK_FACTOR):
+    latencies, hits = [], 0
+    for q, expected in zip(queries, truth):
+        start = time.perf_counter()
+        if compressor is None:
+            scores = vectors @ q
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            candidates = compressor.shortlist(codes, q, k * rerank_factor)
+            scores = np.asarray(vectors[candidates]) @ q
+            top = candidates[np.argsort(-scores)[:k]]
+        latencies.append(time.perf_counter() - start)
+        hits += len(expected & set(top.tolist()))
+    return hits / (len(truth) * k), latencies
+
+
+def cold_load_seconds(path):
+    start = time.perf_counter()
+    np.load(path)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--persist-dir', type=str, default='./medical_db/', help='Vector store directory')
+    parser.add_argument('--queries', type=int, default=200, help='Number of sampled queries')
+    parser.add_argument('--k', type=int, default=10, help='Recall cut-off')
+    parser.add_argument('--modes', type=str, default=",".join(MODES), help='Comma-separated modes to compare')
+    parser.add_argument('--pca-dim', type=int, default=PCA_DIM)
+    parser.add_argument('--pq-subspaces', type=int, default=PQ_SUBSPACES)
+    parser.add_argument('--rerank-factor', type=int, default=RERANK_FACTOR)
+    parser.add_argument('--output', type=str, help='Also write the report as Markdown to this file')
+    parser.add_argument('--write', type=str, choices=MODES, help='Persist this mode next to the flat index and exit')
+    args = parser.parse_args()
+
+    if not flat_index_exists(args.persist_dir):
+        print(f'No flat index under {args.persist_dir}. Run scripts/ingest_corpus.py --export-flat first.')
+        return
+    directory = flat_dir(args.persist_dir)
+    index = FlatIndex(directory)
+
+    if args.write:
+        # Published as a new version, so a running app never reads half-written codes
+        print(f"Published {publish_quantized(args.persist_dir, args.write, args.pca_dim, args.pq_subspaces)}")
+        print('Set FLAT_QUANTIZATION to the same mode so future exports keep it.')
+        return
+
+    vectors = np.asarray(index.vectors)
+    queries = sample_queries(index, args.queries)
+    truth = exact_top_k(vectors, queries, args.k)
+    vectors_path = os.path.join(directory, "vectors.npy")
+
+    _, latencies = evaluate(vectors, queries, truth, args.k)
+    rows = [("float32 (exact)", 1.0, percentile_ms(latencies, 50), percentile_ms(latencies, 99),
+             vectors.nbytes / 1e6, cold_load_seconds(vectors_path) * 1000.0, 0.0)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in [m.strip() for m in args.modes.split(",") if m.strip()]:
+            start = time.perf_counter()
+            compressor = VectorCompressor(mode, args.pca_dim, args.pq_subspaces).fit(vectors)
+            codes = compressor.encode(vectors)
+            build_s = time.perf_counter() - start
+            codes_path = os.path.join(tmp, f"{mode}-{CODES_FILENAME}")
+            with open(codes_path, "wb") as f:
+                np.save(f, codes)
+            recall, latencies = evaluate(vectors, queries, truth, args.k, compressor, codes, args.rerank_factor)
+            rows.append((mode, recall, percentile_ms(latencies, 50), percentile_ms(latencies, 99),
+                         codes.nbytes / 1e6, cold_load_seconds(codes_path) * 1000.0, build_s))
+
+    header = (f"Index: {len(index)} chunks x {vectors.shape[1]} dims, {len(queries)} queries, "
+              f"recall@{args.k}, shortlist {args.k * args.rerank_factor} re-ranked in float32")
+    lines = [header, "",
+             "| mode | recall | p50 ms | p99 ms | resident MB | cold load ms | build s |",
+             "|---|---|---|---|---|---|---|"]
+    for mode, recall, p50, p99, mb, load_ms, build_s in rows:
+        lines.append(f"| {mode} | {recall:.3f} | {p50:.2f} | {p99:.2f} | {mb:.1f} | {load_ms:.1f} | {build_s:.1f} |")
+    report = "\n".join(lines)
+    print(report)
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(report + "\n")
+        print(f'Report written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""Run the session retention job once, or restore archived sessions.
+
+Usage:
+    # Archive (to ARCHIVE_DIR) and delete sessions idle for more than 90 days
+    python scripts/sweep_sessions.py --days 90
+
+    # Show what would be removed without touching anything
+    python scripts/sweep_sessions.py --days 90 --dry-run
+
+    # Load an archive back into the database
+    python scripts/sweep_sessions.py --restore chat_db/archive/sessions-20250101T000000000000.ndjson.zst
+
+Uses the same storage as the app (STORAGE_BACKEND / MONGO_URI / SQLITE_PATH).
+The app runs the same sweep in the background when SESSION_RETENTION_DAYS is set.
+"""
+
+import argparse
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# Ensure repo root is on sys.path so `tools` is importable when running scripts
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from tools.retention import (ARCHIVE_DIR, RETENTION_BATCH_SIZE, SESSION_RETENTION_DAYS, RetentionWorker,
+                             restore_archive)
+from tools.storage import open_storage
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive and delete idle chat sessions")
+    parser.add_argument("--days", type=float, default=SESSION_RETENTION_DAYS,
+                        help="remove sessions idle for longer than this (default SESSION_RETENTION_DAYS)")
+    parser.add_argument("--archive-dir", default=ARCHIVE_DIR, help="archive directory; empty string skips archiving")
+    parser.add_argument("--batch-size", type=int, default=RETENTION_BATCH_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="only count the sessions that would be removed")
+    parser.add_argument("--restore", metavar="ARCHIVE", help="restore sessions from an .ndjson.zst archive")
+    args = parser.parse_args()
+
+    load_dotenv()
+    storage = open_storage()
+    if storage is None:
+        sys.exit("No storage configured (set MONGO_URI or STORAGE_BACKEND)")
+    storage.ensure_schema()
+
+    if args.restore:
+        print(f"Restored {restore_archive(storage, args.restore)} sessions from {args.restore}")
+        return
+    if args.days <= 0:
+        sys.exit("Pass --days (or set SESSION_RETENTION_DAYS) to a positive number")
+
+    if args.dry_run:
+        cutoff = datetime.now(timezone.utc) - timedelta(days=args.days)
+        stale = storage.stale_sessions(cutoff)
+        print(f"{len(stale)} sessions idle since before {cutoff.isoformat()}")
+        for s in stale[:20]:
+            print(f"  {s['session_id']}  last_active={s['last_active']}  messages={s.get('message_count')}")
+        return
+
+    worker = RetentionWorker(storage, retention_days=args.days, archive_dir=args.archive_dir,
+                             batch_size=args.batch_size, start=False)
+    removed = worker.sweep()
+    print(f"Removed {removed} sessions")
+    if worker.archive_files:
+        print(f"Wrote {worker.archive_files} archive files, most recently:")
+    for path in worker.archives:
+        print(f"  archived to {path}")
+
+
+if __name__ == "__main__":
+    main()
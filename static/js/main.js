@@ -22,6 +22,10 @@ let chatHistory = [];
 let currentTheme = localStorage.getItem('theme') || 'light';
 let sidebarOpen = localStorage.getItem('sidebarOpen') !== 'false';
 let currentSessionId = null;
+let sessionsCursor = null;
+// Incremental history: id of the newest rendered message and the server's ETag for it
+let lastMessageId = null;
+let historyEtag = null;
 
 // Initialize
 document.addEventListener('DOMContentLoaded', () => {
@@ -31,6 +35,13 @@ document.addEventListener('DOMContentLoaded', () => {
     loadCurrentChatHistory();
 });
 
+// Pick up messages added elsewhere (another tab or device) when the page becomes visible
+document.addEventListener('visibilitychange', () => {
+    if (document.visibilityState === 'visible' && lastMessageId) {
+        loadCurrentChatHistory();
+    }
+});
+
 // Initialize App
 function initializeApp() {
     if (currentTheme === 'dark') {
@@ -87,14 +98,17 @@ function toggleSidebar() {
     localStorage.setItem('sidebarOpen', sidebarOpen);
 }
 
-// Load Chat Sessions from Database
-async function loadChatSessions() {
+// Load Chat Sessions from Database (one page at a time, newest first)
+async function loadChatSessions(append = false) {
     try {
-        const response = await fetch('/api/sessions');
+        const params = new URLSearchParams({ limit: 30 });
+        if (append && sessionsCursor) params.set('before', sessionsCursor);
+        const response = await fetch(`/api/sessions?${params}`);
         const data = await response.json();
 
         if (data.success && data.sessions) {
-            displayChatSessions(data.sessions);
+            sessionsCursor = data.next_before;
+            displayChatSessions(data.sessions, append);
         }
     } catch (error) {
         console.error('Error loading sessions:', error);
@@ -103,13 +117,16 @@ async function loadChatSessions() {
 }
 
 // Display Chat Sessions
-function displayChatSessions(sessions) {
-    if (sessions.length === 0) {
+function displayChatSessions(sessions, append = false) {
+    const loadMore = chatList.querySelector('.chat-load-more');
+    if (loadMore) loadMore.remove();
+
+    if (!append && sessions.length === 0) {
         chatList.innerHTML = '<div style="text-align: center; padding: 20px; color: var(--text-tertiary); font-size: 13px;">No chat history yet</div>';
         return;
     }
 
-    chatList.innerHTML = '';
+    if (!append) chatList.innerHTML = '';
     sessions.forEach(session => {
         const chatItem = document.createElement('div');
         chatItem.className = 'chat-item';
@@ -137,6 +154,15 @@ function displayChatSessions(sessions) {
 
         chatList.appendChild(chatItem);
     });
+
+    if (sessionsCursor) {
+        const more = document.createElement('button');
+        more.className = 'chat-load-more';
+        more.textContent = 'Load older chats';
+        more.style.cssText = 'width: 100%; padding: 10px; background: none; border: none; color: var(--text-tertiary); font-size: 13px; cursor: pointer;';
+        more.addEventListener('click', () => loadChatSessions(true));
+        chatList.appendChild(more);
+    }
 }
 
 // Format Time Ago
@@ -155,18 +181,43 @@ function formatTimeAgo(timestamp) {
     return past.toLocaleDateString();
 }
 
+// Fetch history; with `incremental`, only messages after the newest rendered one.
+// Resolves to null when nothing changed (304).
+async function fetchHistory(url, incremental) {
+    const headers = {};
+    if (incremental && lastMessageId) {
+        url += `${url.includes('?') ? '&' : '?'}after=${encodeURIComponent(lastMessageId)}`;
+        if (historyEtag) headers['If-None-Match'] = historyEtag;
+    }
+    const response = await fetch(url, { headers });
+    if (response.status === 304) return null;
+    const data = await response.json();
+    if (data.success) {
+        historyEtag = response.headers.get('ETag');
+        if (data.next_after) lastMessageId = data.next_after;
+    }
+    return data;
+}
+
+function resetHistoryCursor() {
+    lastMessageId = null;
+    historyEtag = null;
+}
+
 // Load Session
 async function loadSession(sessionId) {
     try {
-        const response = await fetch(`/api/session/${sessionId}`);
-        const data = await response.json();
+        // Re-opening the chat on screen only needs what was added since
+        const incremental = sessionId === currentSessionId && lastMessageId !== null;
+        if (!incremental) resetHistoryCursor();
+        const data = await fetchHistory(`/api/session/${sessionId}`, incremental);
 
-        if (data.success) {
+        if (data === null || data.success) {
             currentSessionId = sessionId;
-            messagesContainer.innerHTML = '';
+            if (!incremental) messagesContainer.innerHTML = '';
             welcomeScreen.classList.add('hidden');
 
-            data.messages.forEach(msg => {
+            (data ? data.messages : []).forEach(msg => {
                 addMessage(msg.content, msg.role, msg.timestamp, msg.source, false);
             });
 
@@ -185,13 +236,12 @@ async function loadSession(sessionId) {
     }
 }
 
-// Load Current Chat History
+// Load Current Chat History (only new messages once the chat has been rendered)
 async function loadCurrentChatHistory() {
     try {
-        const response = await fetch('/api/history');
-        const data = await response.json();
+        const data = await fetchHistory('/api/history', lastMessageId !== null);
 
-        if (data.success && data.messages && data.messages.length > 0) {
+        if (data && data.success && data.messages && data.messages.length > 0) {
             welcomeScreen.classList.add('hidden');
             data.messages.forEach(msg => {
                 addMessage(msg.content, msg.role, msg.timestamp, msg.source, false);
@@ -258,6 +308,10 @@ async function sendMessage() {
 
         if (data.success) {
             addMessage(data.response, 'assistant', data.timestamp, data.source);
+            if (data.message_id) {
+                lastMessageId = data.message_id;
+                historyEtag = null;
+            }
             showToast('Response received', 'success');
             loadChatSessions();
         } else {
@@ -393,6 +447,7 @@ async function createNewChat() {
             welcomeScreen.classList.remove('hidden');
             chatHistory = [];
             currentSessionId = null;
+            resetHistoryCursor();
 
             document.querySelectorAll('.chat-item').forEach(item => {
                 item.classList.remove('active');
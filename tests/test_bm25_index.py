@@ -0,0 +1,39 @@
+from tools.bm25_index import BM25Index, build_index, tokenize
+
+
+CHUNKS = {
+    "a": "Metformin is a first-line medication for type 2 diabetes.",
+    "b": "Amoxicillin 500 mg is commonly prescribed for bacterial infections.",
+    "c": "Diabetes mellitus is a chronic condition affecting blood sugar.",
+}
+
+
+def _index():
+    return build_index(list(CHUNKS), list(CHUNKS.values()), [{"page": i} for i in range(len(CHUNKS))])
+
+
+def test_tokenize_keeps_drug_names_and_dosages():
+    assert tokenize("Take co-amoxiclav 500 mg for the infection") == ["take", "co-amoxiclav", "500", "mg", "infection"]
+
+
+def test_search_ranks_exact_term_matches():
+    index = _index()
+    hits = index.search("what is amoxicillin used for", k=3)
+    assert [index.ids[i] for i, _ in hits] == ["b"]
+
+    hits = index.search("metformin for diabetes", k=3)
+    assert index.ids[hits[0][0]] == "a"
+    assert {index.ids[i] for i, _ in hits} == {"a", "c"}
+
+
+def test_save_and_load_round_trip(tmp_path):
+    index = _index()
+    path = str(tmp_path / "bm25_index.json.gz")
+    index.save(path)
+
+    loaded = BM25Index.load(path)
+    assert len(loaded) == 3
+    assert loaded.search("amoxicillin", k=1) == index.search("amoxicillin", k=1)
+    doc = loaded.document(0)
+    assert doc.id == "a"
+    assert doc.metadata == {"page": 0}
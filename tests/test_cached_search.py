@@ -0,0 +1,103 @@
+import threading
+import time
+
+from tools.cached_search import CachedSearch, SearchCache, normalize_query
+
+
+def test_normalize_query_collapses_case_space_and_punctuation():
+    assert normalize_query("  What causes   Fever? ") == "what causes fever"
+
+
+def test_results_are_cached_across_instances_by_normalized_query(tmp_path):
+    path = str(tmp_path / "cache.db")
+    calls = []
+
+    def provider(query):
+        calls.append(query)
+        return [{"content": f"about {query}"}]
+
+    search = CachedSearch("stub", provider, SearchCache(path))
+    first = search.search("Fever")
+    assert search.search("fever ") == first
+    assert search.stats()["hits"] == 1 and search.stats()["misses"] == 1
+
+    # A fresh process reads the same file
+    assert CachedSearch("stub", provider, SearchCache(path)).search("FEVER") == first
+    assert calls == ["Fever"]
+    # Keys are per provider
+    assert CachedSearch("other", provider, SearchCache(path)).search("fever") is not None
+    assert len(calls) == 2
+
+
+def test_expired_entries_are_refetched_and_failures_not_cached(tmp_path):
+    cache = SearchCache(str(tmp_path / "cache.db"), ttl=0)
+    calls = []
+
+    def provider(query):
+        calls.append(query)
+        if len(calls) == 1:
+            raise RuntimeError("rate limited")
+        return "text"
+
+    search = CachedSearch("stub", provider, cache)
+    assert search.search("cough") is None
+    assert search.search("cough") == "text"
+    assert search.search("cough") == "text"
+    assert len(calls) == 3
+    assert search.stats()["errors"] == 1
+    assert cache.purge() == 1
+
+
+def test_concurrency_is_capped_and_identical_queries_share_one_call():
+    lock = threading.Lock()
+    running, peak, calls = [0], [0], []
+
+    def provider(query):
+        with lock:
+            calls.append(query)
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+        return query
+
+    search = CachedSearch("stub", provider, max_concurrency=2)
+    queries = ["a", "A ", "b", "c", "d"]
+    assert search.search_all(queries) == ["a", "a", "b", "c", "d"]
+    assert peak[0] == 2
+    assert sorted(calls) == ["a", "b", "c", "d"]
+
+
+def test_variants_run_concurrently_and_slow_providers_time_out():
+    started = threading.Barrier(2, timeout=1)
+    release = threading.Event()
+
+    def provider(query):
+        started.wait()  # only passes if both variants are running at once
+        if query == "slow":
+            release.wait(1)
+        return query
+
+    search = CachedSearch("stub", provider, max_concurrency=2, timeout=0.2)
+    assert search.search_all(["fast", "slow"]) == ["fast", None]
+    assert search.stats()["timeouts"] == 1
+    release.set()
+
+
+def test_calls_beyond_the_slots_are_rejected_instead_of_queued():
+    release = threading.Event()
+    calls = []
+
+    def provider(query):
+        calls.append(query)
+        release.wait(1)
+        return query
+
+    search = CachedSearch("stub", provider, max_concurrency=1, timeout=0.1)
+    assert search.search("hung") is None
+    # The hung call still holds the only slot, so this one is never started
+    assert search.search("next") is None
+    assert calls == ["hung"]
+    assert search.stats()["rejected"] == 1
+    release.set()
@@ -0,0 +1,27 @@
+import numpy as np
+
+from tools.context_compressor import split_sentences, select_sentences
+
+
+def test_split_sentences_drops_short_fragments():
+    text = "Fever is a rise in body temperature above normal. Ok.\n\nIt is usually caused by an infection of some kind."
+    sentences = split_sentences(text)
+    assert sentences == [
+        "Fever is a rise in body temperature above normal.",
+        "It is usually caused by an infection of some kind.",
+    ]
+
+
+def test_select_sentences_respects_budget_and_skips_duplicates():
+    query = np.array([1.0, 0.0], dtype=np.float32)
+    vecs = np.array([
+        [1.0, 0.0],      # best match
+        [1.0, 0.0],      # exact duplicate of the best match
+        [0.8, 0.6],      # relevant, distinct
+        [0.0, 1.0],      # irrelevant
+    ], dtype=np.float32)
+    lengths = [40, 40, 40, 40]
+
+    keep = select_sentences(query, vecs, lengths, budget=100, min_score=0.1)
+
+    assert keep == [0, 2]
@@ -0,0 +1,93 @@
+import json
+
+import pytest
+from langchain_core.documents import Document
+
+import tools.hybrid_search as hybrid_module
+from tools.corpora import load_corpora
+from tools.vector_store import hnsw_metadata
+
+
+def test_load_corpora_defaults_to_textbook(tmp_path):
+    corpora = load_corpora(str(tmp_path / "missing.json"))
+    assert [c["name"] for c in corpora] == ["textbook"]
+    assert corpora[0]["enabled"] is True
+
+
+def test_load_corpora_from_config(tmp_path):
+    path = tmp_path / "corpora.json"
+    path.write_text(json.dumps([
+        {"name": "textbook", "sources": ["./data/medical_book.pdf"], "persist_dir": "./medical_db/"},
+        {"name": "protocols", "sources": ["./data/protocols/*.pdf"], "enabled": False, "weight": 0.5},
+    ]))
+    corpora = load_corpora(str(path))
+    assert corpora[1]["persist_dir"].endswith("protocols")
+    assert corpora[1]["enabled"] is False
+    assert corpora[1]["weight"] == 0.5
+
+
+def test_search_corpora_merges_shards_by_weighted_score(monkeypatch):
+    def fake_hybrid(query, k, fetch_k, use_mmr, lambda_mult, persist_dir):
+        if persist_dir == "missing":
+            return None
+        return [
+            (Document(id=f"{persist_dir}-{i}", page_content=f"{persist_dir} chunk {i}",
+                      metadata={"rrf_score": 1.0 / (i + 1)}), 0.6 - 0.05 * i, None)
+            for i in range(k)
+        ]
+
+    monkeypatch.setattr(hybrid_module, "hybrid_search", fake_hybrid)
+    corpora = [
+        {"name": "textbook", "persist_dir": "a", "weight": 1.0},
+        {"name": "drugs", "persist_dir": "b", "weight": 1.5},
+        {"name": "empty", "persist_dir": "missing", "weight": 1.0},
+    ]
+    results = hybrid_module.search_corpora("dose", k=3, corpora=corpora)
+
+    # drugs: 0.9, 0.825, 0.75; textbook: 0.6, 0.55, 0.5
+    assert [doc.id for doc, _, _ in results] == ["b-0", "b-1", "b-2"]
+    assert results[0][0].metadata["corpus"] == "drugs"
+
+
+def test_search_corpora_ranks_a_weak_shards_top_hit_below_strong_matches(monkeypatch):
+    relevance = {"strong": [0.82, 0.8, 0.78], "weak": [0.21, 0.2, 0.19]}
+
+    def fake_hybrid(query, k, fetch_k, use_mmr, lambda_mult, persist_dir):
+        # Same ranks, so the same RRF scores, in both shards
+        return [
+            (Document(id=f"{persist_dir}-{i}", page_content="chunk", metadata={"rrf_score": 1.0 / (61 + i)}),
+             score, None)
+            for i, score in enumerate(relevance[persist_dir])
+        ] + [(Document(id=f"{persist_dir}-bm25", page_content="chunk", metadata={"rrf_score": 0.001}), None, 7.0)]
+
+    monkeypatch.setattr(hybrid_module, "hybrid_search", fake_hybrid)
+    corpora = [
+        {"name": "weak", "persist_dir": "weak", "weight": 1.2},
+        {"name": "strong", "persist_dir": "strong", "weight": 1.0},
+    ]
+    results = hybrid_module.search_corpora("dose", k=5, corpora=corpora)
+    assert [doc.id for doc, _, _ in results] == ["strong-0", "strong-1", "strong-2", "strong-bm25", "weak-0"]
+
+
+def test_search_corpora_without_shards_returns_none(monkeypatch):
+    monkeypatch.setattr(hybrid_module, "hybrid_search", lambda *args: None)
+    assert hybrid_module.search_corpora("dose", corpora=[{"name": "x", "persist_dir": "x", "weight": 1.0}]) is None
+
+
+def test_corpus_hnsw_params_are_validated(tmp_path):
+    path = tmp_path / "corpora.json"
+    path.write_text(json.dumps([
+        {"name": "textbook", "hnsw": {"M": 32, "search_ef": "64"}},
+    ]))
+    assert load_corpora(str(path))[0]["hnsw"] == {"M": 32, "search_ef": 64}
+
+    path.write_text(json.dumps([{"name": "textbook", "hnsw": {"ef": 10}}]))
+    with pytest.raises(ValueError):
+        load_corpora(str(path))
+
+
+def test_hnsw_metadata_keeps_cosine_space():
+    assert hnsw_metadata() == {"hnsw:space": "cosine"}
+    assert hnsw_metadata({"M": 16, "construction_ef": 200, "search_ef": None}) == {
+        "hnsw:space": "cosine", "hnsw:M": 16, "hnsw:construction_ef": 200,
+    }
@@ -0,0 +1,27 @@
+from langchain_core.documents import Document
+
+from tools.dedup import NearDuplicateFilter
+
+DEFINITION = (
+    "Hypertension is a chronic medical condition in which the blood pressure in the arteries "
+    "is persistently elevated. Long-term high blood pressure is a major risk factor for stroke, "
+    "coronary artery disease, heart failure, atrial fibrillation and chronic kidney disease."
+)
+
+
+def _doc(text, page):
+    return Document(page_content=text, metadata={"source": "book.pdf", "page": page})
+
+
+def test_near_duplicates_are_dropped_and_merged():
+    dedup = NearDuplicateFilter(threshold=0.8)
+
+    assert dedup.check("a", _doc(DEFINITION, 3)) is None
+    # Same definition repeated later with a trailing page footer
+    assert dedup.check("b", _doc(DEFINITION + " Page 120", 120)) == "a"
+    assert dedup.check("c", _doc("Asthma is a long-term inflammatory disease of the airways of the lungs.", 7)) is None
+
+    merged = dict(dedup.merged_metadatas())
+    assert merged["a"]["duplicate_pages"] == "book.pdf:120"
+    assert merged["a"]["duplicate_count"] == 1
+    assert dedup.report() == {"chunks": 3, "dropped": 1, "reduction": 0.3333}
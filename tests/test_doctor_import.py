@@ -0,0 +1,93 @@
+import io
+import json
+
+from tools.doctor_import import build_doctor, import_doctors, read_rows, summarize
+from tools.sqlite_storage import SQLiteStorage
+
+CSV = """name,email,specialization,languages,yearsExperience,clinic
+Dr. A,a@example.com,cardiology,English; Hindi,12,City Clinic
+Dr. B,,derm,,,
+Dr. C,c@example.com,Pediatrist,Telugu,,
+"""
+
+
+def _storage(tmp_path):
+    storage = SQLiteStorage(str(tmp_path / "chats.db"))
+    storage.ensure_schema()
+    return storage
+
+
+def test_csv_rows_become_normalized_profiles():
+    _, record, _ = next(read_rows(io.StringIO(CSV), "csv"))
+    email, doc = build_doctor(record)
+    assert email == "a@example.com"
+    assert doc["doctorProfile"] == {"specialization": "Cardiologist", "languages": ["English", "Hindi"],
+                                    "yearsExperience": 12, "clinic": "City Clinic"}
+
+
+def test_import_reports_every_row_and_batches_embeddings(tmp_path):
+    storage = _storage(tmp_path)
+    batches = []
+
+    def embed(texts):
+        batches.append(list(texts))
+        return [[1.0, 0.0] for _ in texts]
+
+    results = list(import_doctors(read_rows(io.StringIO(CSV), "csv"), storage, embed, batch_size=10))
+    assert [(r["line"], r["status"]) for r in results] == [(2, "inserted"), (3, "error"), (4, "inserted")]
+    assert results[1]["error"] == "email is required"
+    assert len(batches) == 1 and len(batches[0]) == 2
+
+    doctors = {d["email"]: d for d in storage.list_doctors()}
+    assert doctors["c@example.com"]["doctorProfile"]["specialization"] == "Pediatrician"
+    assert doctors["a@example.com"]["embedding"] == [1.0, 0.0]
+    storage.close()
+
+
+def test_ndjson_updates_existing_and_repeated_emails_apply_in_order(tmp_path):
+    storage = _storage(tmp_path)
+    storage.upsert_doctor("a@example.com", {"name": "Old", "role": "doctor", "doctorProfile": {}})
+    lines = [
+        json.dumps({"email": "a@example.com", "name": "Dr. A", "doctorProfile": {"specialization": "ent"}}),
+        "not json",
+        json.dumps({"email": "b@example.com", "name": "Dr. B"}),
+        json.dumps({"email": "b@example.com", "name": "Dr. B2"}),
+    ]
+    results = list(import_doctors(read_rows(io.StringIO("\n".join(lines)), "ndjson"), storage))
+    assert [r["status"] for r in results] == ["updated", "error", "inserted", "updated"]
+
+    summary = summarize(results)
+    assert (summary["inserted"], summary["updated"], summary["errors"]) == (1, 2, 1)
+    doctors = {d["email"]: d for d in storage.list_doctors()}
+    assert doctors["a@example.com"]["doctorProfile"] == {"specialization": "ENT"}
+    assert doctors["b@example.com"]["name"] == "Dr. B2"
+    storage.close()
+
+
+def test_failed_embedding_keeps_profiles_with_warning(tmp_path):
+    storage = _storage(tmp_path)
+
+    def embed(texts):
+        raise RuntimeError("model unavailable")
+
+    rows = read_rows(io.StringIO(json.dumps({"email": "a@example.com", "name": "Dr. A"})), "ndjson")
+    (result,) = import_doctors(rows, storage, embed)
+    assert result["status"] == "inserted"
+    assert "model unavailable" in result["warning"]
+    assert storage.list_doctors()[0]["embedding"] is None
+    storage.close()
+
+
+def test_rows_with_wrong_types_fail_alone(tmp_path):
+    storage = _storage(tmp_path)
+    lines = [
+        json.dumps({"name": "Dr. N", "email": 123}),
+        json.dumps({"name": "Dr. L", "email": "l@example.com", "doctorProfile": {"languages": "English"}}),
+        json.dumps({"name": ["x"], "email": "x@example.com"}),
+        json.dumps({"name": "Dr. OK", "email": "ok@example.com", "doctorProfile": {"specialization": "ENT"}}),
+    ]
+    results = list(import_doctors(read_rows(lines), storage))
+    assert [r["status"] for r in results] == ["error", "error", "error", "inserted"]
+    assert results[0]["error"] == "email must be a string"
+    assert results[1]["error"] == "doctorProfile.languages must be a list of strings"
+    assert summarize(results)["errors"] == 3
@@ -0,0 +1,86 @@
+import numpy as np
+
+from tools.doctor_index import DoctorIndex, build_doctor_index, parse_years
+
+
+def _doctor(email, spec, languages, years, vector):
+    return {"_id": email, "email": email, "name": email,
+            "doctorProfile": {"specialization": spec, "languages": languages, "yearsExperience": years},
+            "embedding": vector}
+
+
+DOCTORS = [
+    _doctor("a", "cardiology", ["English", "Hindi"], 12, [1.0, 0.0]),
+    _doctor("b", "Cardiologist", ["Telugu"], "5+", [0.8, 0.6]),
+    _doctor("c", "derm", ["en"], None, [0.0, 1.0]),
+]
+
+
+def _index():
+    return DoctorIndex(DOCTORS, [d["embedding"] for d in DOCTORS])
+
+
+def test_parse_years():
+    assert parse_years(7) == 7.0
+    assert parse_years("10+ years") == 10.0
+    assert np.isnan(parse_years(""))
+
+
+def test_filters_use_language_codes_experience_and_canonical_specialization():
+    index = _index()
+    assert index.candidates(language="en").tolist() == [0, 2]
+    assert index.candidates(language="te").tolist() == [1]
+    assert index.candidates(language="fr").tolist() == []
+    # Unknown experience never passes a minimum
+    assert index.candidates(min_experience=5).tolist() == [0, 1]
+    assert index.candidates(specializations=["Cardiology"]).tolist() == [0, 1]
+    assert index.candidates(language="hindi", min_experience=10, specializations=["cardiologist"]).tolist() == [0]
+
+
+def test_similarities_are_computed_for_candidates_only():
+    index = _index()
+    rows = index.candidates(language="en")
+    sims = index.similarities([2.0, 0.0], rows)
+    assert sims.shape == (2,)
+    assert np.allclose(sims, [1.0, 0.0])
+
+
+class FakeStorage:
+    def __init__(self, doctors):
+        self.doctors = doctors
+        self.updates = []
+
+    def list_doctors(self):
+        return [dict(d) for d in self.doctors]
+
+    def update_doctor(self, doctor_id, fields):
+        self.updates.append((doctor_id, fields))
+
+
+def test_build_embeds_and_saves_missing_vectors():
+    storage = FakeStorage([_doctor("a", "neuro", ["English"], 3, None)])
+    index = build_doctor_index(storage, lambda text: np.array([0.0, 2.0]), dim=2)
+    assert len(index) == 1
+    assert np.allclose(index.embeddings[0], [0.0, 1.0])
+    assert ("a", {"doctorProfile": {"specialization": "Neurologist", "languages": ["English"], "yearsExperience": 3}}) \
+        in storage.updates
+    assert ("a", {"embedding": [0.0, 2.0]}) in storage.updates
+
+
+def test_build_reembeds_vectors_of_the_wrong_length_and_skips_failures(capsys):
+    storage = FakeStorage([
+        _doctor("a", "Neurologist", ["English"], 3, [1.0, 0.0]),
+        _doctor("b", "Neurologist", ["English"], 3, [1.0, 0.0, 0.0]),
+        _doctor("c", "Dermatologist", ["English"], 3, [1.0, 0.0, 0.0, 0.0]),
+    ])
+
+    def embed(text):
+        if "Dermatologist" in text:
+            raise RuntimeError("model unavailable")
+        return np.array([0.0, 2.0])
+
+    index = build_doctor_index(storage, embed, dim=2)
+    assert [d["_id"] for d in index.doctors] == ["a", "b"]
+    assert np.allclose(index.embeddings, [[1.0, 0.0], [0.0, 1.0]])
+    assert storage.updates == [("b", {"embedding": [0.0, 2.0]})]
+    assert "2 stored embeddings were not 2-dim and were recomputed; skipped 1 doctors" in capsys.readouterr().out
@@ -0,0 +1,76 @@
+import os
+
+import numpy as np
+
+from tools.flat_index import FlatIndex, export_from_collection, flat_dir, flat_index_exists, write_flat_index
+
+
+def _records():
+    vectors = [[1.0, 0.0], [0.0, 2.0], [0.9, 0.1], [0.6, 0.8]]
+    for i, vec in enumerate(vectors):
+        yield f"c{i}", f"chunk {i}", {"page": i}, vec
+
+
+def test_top_k_is_exact_and_documents_round_trip(tmp_path):
+    write_flat_index(str(tmp_path / "flat"), _records(), 4, 2)
+    assert flat_index_exists(str(tmp_path))
+
+    index = FlatIndex(str(tmp_path / "flat"))
+    assert len(index) == 4
+    # Rows are stored normalized
+    assert np.allclose(np.linalg.norm(index.vectors, axis=1), 1.0)
+
+    results = index.search(np.array([1.0, 0.0], dtype=np.float32), k=2)
+    assert [doc.id for doc, _ in results] == ["c0", "c2"]
+    assert results[0][1] > results[1][1]
+
+    doc = index.document(3)
+    assert doc.page_content == "chunk 3"
+    assert doc.metadata == {"page": 3}
+    index.close()
+
+
+def test_mmr_skips_near_duplicate_rows(tmp_path):
+    write_flat_index(str(tmp_path / "flat"), _records(), 4, 2)
+    index = FlatIndex(str(tmp_path / "flat"))
+
+    query = np.array([0.8, 0.6], dtype=np.float32)
+    plain = [doc.id for doc, _ in index.search(query, k=2)]
+    diverse = [doc.id for doc, _ in index.search(query, k=2, fetch_k=4, use_mmr=True, lambda_mult=0.3)]
+    assert plain == ["c3", "c2"]
+    assert diverse[0] == "c3"
+    assert diverse[1] != "c2"
+    index.close()
+
+
+class FakeCollection:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def count(self):
+        return len(self.rows)
+
+    def get(self, limit=None, offset=0, include=None):
+        page = self.rows[offset:offset + limit]
+        return {"ids": [r[0] for r in page], "documents": [r[1] for r in page],
+                "metadatas": [r[2] for r in page], "embeddings": [r[3] for r in page]}
+
+
+def test_export_publishes_a_new_version_and_open_indexes_keep_theirs(tmp_path):
+    persist_dir = str(tmp_path)
+    first = export_from_collection(FakeCollection(list(_records())), persist_dir)
+    first_dir = flat_dir(persist_dir)
+
+    rows = [("n0", "new chunk", {}, [0.0, 1.0])]
+    second = export_from_collection(FakeCollection(rows), persist_dir)
+    assert flat_dir(persist_dir) != first_dir
+    assert len(FlatIndex(flat_dir(persist_dir))) == 1
+
+    # The index opened before the swap still reads its own, complete version
+    assert len(first) == 4
+    assert first.document(3).page_content == "chunk 3"
+
+    # A third export drops the oldest version
+    export_from_collection(FakeCollection(rows), persist_dir)
+    assert not os.path.exists(first_dir)
+    assert second.document(0).id == "n0"
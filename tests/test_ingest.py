@@ -0,0 +1,115 @@
+from langchain_core.documents import Document
+
+import tools.ingest as ingest_module
+
+
+class FakeCollection:
+    def __init__(self, store):
+        self.store = store
+
+    def delete(self, ids):
+        for cid in ids:
+            self.store.chunks.pop(cid, None)
+
+    def get(self, include=None):
+        ids = list(self.store.chunks)
+        return {"ids": ids, "metadatas": [self.store.chunks[i][1] for i in ids]}
+
+
+class FakeVectorStore:
+    def __init__(self):
+        self.chunks = {}
+        self.embedded = 0
+        self._collection = FakeCollection(self)
+
+    def add_texts(self, texts, metadatas, ids):
+        self.embedded += len(texts)
+        for cid, text, metadata in zip(ids, texts, metadatas):
+            self.chunks[cid] = (text, metadata)
+
+
+def _setup(monkeypatch, tmp_path, pages):
+    store = FakeVectorStore()
+    pdf = tmp_path / "book.pdf"
+    pdf.write_bytes(b"v1")
+
+    def fake_chunks(path):
+        for page, text in enumerate(pages[0]):
+            yield Document(page_content=text, metadata={"source": path, "page": page})
+
+    monkeypatch.setattr(ingest_module, "open_vectorstore", lambda persist_dir: store)
+    monkeypatch.setattr(ingest_module, "iter_pdf_chunks", fake_chunks)
+    monkeypatch.setattr(ingest_module, "rebuild_bm25_index", lambda vs, persist_dir: None)
+    return store, pdf
+
+
+def test_ingest_embeds_only_new_chunks(monkeypatch, tmp_path):
+    pages = [["fever chunk", "cough chunk"]]
+    store, pdf = _setup(monkeypatch, tmp_path, pages)
+    persist_dir = str(tmp_path / "db")
+
+    stats = ingest_module.ingest_sources([str(pdf)], persist_dir=persist_dir)
+    assert stats["added"] == 2
+    assert store.embedded == 2
+
+    # Unchanged file is skipped entirely
+    stats = ingest_module.ingest_sources([str(pdf)], persist_dir=persist_dir)
+    assert stats["unchanged"] == 1
+    assert store.embedded == 2
+
+    # Changing one page embeds one chunk and deletes the stale one
+    pages[0] = ["fever chunk", "cough chunk, revised"]
+    pdf.write_bytes(b"v2")
+    stats = ingest_module.ingest_sources([str(pdf)], persist_dir=persist_dir)
+    assert stats["added"] == 1
+    assert stats["deleted"] == 1
+    assert store.embedded == 3
+    assert sorted(text for text, _ in store.chunks.values()) == ["cough chunk, revised", "fever chunk"]
+
+
+def test_ingest_prunes_missing_sources(monkeypatch, tmp_path):
+    store, pdf = _setup(monkeypatch, tmp_path, [["fever chunk"]])
+    persist_dir = str(tmp_path / "db")
+    ingest_module.ingest_sources([str(pdf)], persist_dir=persist_dir)
+    assert len(store.chunks) == 1
+
+    pdf.unlink()
+    # Pruning is opt-in
+    ingest_module.ingest_sources([], persist_dir=persist_dir)
+    assert len(store.chunks) == 1
+    stats = ingest_module.ingest_sources([], persist_dir=persist_dir, prune=True, prune_dirs=[str(tmp_path)])
+    assert stats["removed_sources"] == 1
+    assert store.chunks == {}
+
+
+def test_ingest_keys_sources_by_absolute_path_and_prunes_only_given_dirs(monkeypatch, tmp_path):
+    store, pdf = _setup(monkeypatch, tmp_path, [["fever chunk"]])
+    persist_dir = str(tmp_path / "db")
+    monkeypatch.chdir(tmp_path)
+    ingest_module.ingest_sources(["book.pdf"], persist_dir=persist_dir)
+    stats = ingest_module.ingest_sources([str(pdf)], persist_dir=persist_dir)
+    assert stats["unchanged"] == 1
+
+    # A new file ingested from another directory must not prune book.pdf
+    other = tmp_path / "other"
+    other.mkdir()
+    (other / "new.pdf").write_bytes(b"n")
+    monkeypatch.chdir(other)
+    stats = ingest_module.ingest_sources(["new.pdf"], persist_dir=persist_dir, prune=True)
+    assert stats["removed_sources"] == 0
+    assert set(ingest_module.load_manifest(persist_dir)["sources"]) == {str(pdf), str(other / "new.pdf")}
+
+
+def test_stored_chunk_count_reads_manifest_without_chroma(tmp_path):
+    from tools.manifest import new_manifest, save_manifest
+    from tools.vector_store import stored_chunk_count
+
+    assert stored_chunk_count(str(tmp_path)) == 0
+    # Legacy store: Chroma files but no manifest
+    (tmp_path / "chroma.sqlite3").write_bytes(b"")
+    assert stored_chunk_count(str(tmp_path)) == -1
+
+    manifest = new_manifest()
+    manifest["sources"]["book.pdf"] = {"sha1": None, "chunks": ["a", "b", "c"]}
+    save_manifest(str(tmp_path), manifest)
+    assert stored_chunk_count(str(tmp_path)) == 3
@@ -0,0 +1,82 @@
+import threading
+
+import agents.memory_agent as memory_agent_module
+import tools.conversation_memory as memory_module
+from agents.memory_agent import MemoryAgent
+
+
+def _history(n):
+    return [
+        {'role': 'user' if i % 2 == 0 else 'assistant', 'content': f'message {i}'}
+        for i in range(n)
+    ]
+
+
+def test_memory_agent_folds_overflow_into_summary(monkeypatch):
+    # No LLM configured -> extractive summary of the patient's messages
+    monkeypatch.setattr(memory_module, 'get_llm', lambda: None)
+
+    state = {'conversation_history': _history(memory_module.HISTORY_MAX + 2), 'conversation_summary': ''}
+    state = MemoryAgent(state)
+
+    assert len(state['conversation_history']) == memory_module.HISTORY_WINDOW
+    job_id = state['summary_job']
+    assert job_id
+
+    # Wait for the background fold, then the next turn picks it up
+    memory_module._jobs[job_id].future.result(timeout=5)
+    state = memory_agent_module.MemoryAgent(state)
+
+    assert state['summary_job'] is None
+    assert 'message 0' in state['conversation_summary']
+    assert 'message 1' not in state['conversation_summary']
+
+
+def test_folds_chain_per_session_and_merge_while_waiting(monkeypatch):
+    release = threading.Event()
+    calls = []
+
+    def summarize(previous, turns):
+        calls.append([t['content'] for t in turns])
+        if len(calls) == 1:
+            release.wait(5)
+        return f"{previous}+{len(turns)}"
+
+    monkeypatch.setattr(memory_module, 'summarize_turns', summarize)
+    first = memory_module.schedule_fold('s', None, _history(2))
+    second = memory_module.schedule_fold('ignored', first, _history(1))
+    # The second fold waits for the first, so a third one is merged into it
+    assert memory_module.schedule_fold('ignored', second, _history(3)) == second
+    assert first not in memory_module._jobs
+
+    release.set()
+    assert memory_module._jobs[second].future.result(timeout=5) == 's+2+4'
+    assert len(calls) == 2
+    assert memory_module.collect_fold(second) == 's+2+4'
+
+
+def test_uncollected_jobs_are_discarded_or_expire(monkeypatch):
+    monkeypatch.setattr(memory_module, 'summarize_turns', lambda previous, turns: 'done')
+    job_id = memory_module.schedule_fold('', None, _history(2))
+    memory_module._jobs[job_id].future.result(timeout=5)
+    memory_module.discard_fold(job_id)
+    assert job_id not in memory_module._jobs
+
+    stale = memory_module.schedule_fold('', None, _history(2))
+    memory_module._jobs[stale].future.result(timeout=5)
+    monkeypatch.setattr(memory_module, 'MEMORY_JOB_TTL', 0)
+    fresh = memory_module.schedule_fold('', None, _history(2))
+    assert stale not in memory_module._jobs
+    memory_module._jobs[fresh].future.result(timeout=5)
+    memory_module.discard_fold(fresh)
+
+
+def test_render_history_includes_summary():
+    state = {
+        'conversation_summary': 'Patient has had a cough for a week.',
+        'conversation_history': _history(4),
+    }
+    rendered = memory_module.render_history(state, 2)
+    assert rendered.startswith('Summary of earlier conversation: Patient has had a cough')
+    assert 'message 3' in rendered
+    assert 'message 1' not in rendered
@@ -0,0 +1,94 @@
+import threading
+
+from tools.message_queue import MessageWriter
+
+
+class FakeStorage:
+    def __init__(self):
+        self.docs = []
+        self.session_updates = []
+        self.lock = threading.Lock()
+
+    def insert_messages(self, messages):
+        with self.lock:
+            self.docs.extend(messages)
+
+    def update_sessions(self, updates):
+        with self.lock:
+            self.session_updates.append(updates)
+
+
+def test_messages_are_batched_and_sessions_coalesced():
+    storage = FakeStorage()
+    writer = MessageWriter(storage, batch_size=100, flush_interval=60)
+
+    for i in range(4):
+        writer.enqueue("s1", "user", f"q{i}")
+    writer.enqueue("s2", "user", "hello")
+    assert writer.depth() == 5
+    assert [m["content"] for m in writer.pending("s1")] == ["q0", "q1", "q2", "q3"]
+
+    assert writer.flush(timeout=5)
+    assert [m["content"] for m in storage.docs] == ["q0", "q1", "q2", "q3", "hello"]
+    # One session update call with a single entry per session
+    assert len(storage.session_updates) == 1
+    assert set(storage.session_updates[0]) == {"s1", "s2"}
+    assert writer.depth() == 0
+    writer.close()
+
+
+def test_discard_and_close_drains_remaining():
+    storage = FakeStorage()
+    writer = MessageWriter(storage, batch_size=100, flush_interval=60)
+    writer.enqueue("deleted", "user", "gone")
+    writer.enqueue("kept", "user", "stays")
+    writer.discard("deleted")
+
+    assert writer.close(timeout=5)
+    assert [m["content"] for m in storage.docs] == ["stays"]
+
+
+class FailingOnceStorage(FakeStorage):
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def insert_messages(self, messages):
+        self.calls += 1
+        if self.calls == 1:
+            raise RuntimeError("network down")
+        super().insert_messages(messages)
+
+
+def test_failed_batch_is_retried():
+    storage = FailingOnceStorage()
+    writer = MessageWriter(storage, batch_size=1, flush_interval=0.01)
+    writer.enqueue("s1", "user", "retry me")
+
+    assert writer.flush(timeout=5)
+    assert [m["content"] for m in storage.docs] == ["retry me"]
+    assert writer.stats()["failures"] == 1
+    writer.close()
+
+
+def test_session_update_carries_preview_and_count():
+    storage = FakeStorage()
+    writer = MessageWriter(storage, batch_size=100, flush_interval=60)
+    first = writer.enqueue("s1", "user", "I have had a persistent dry cough for three weeks and mild fever")
+    last = writer.enqueue("s1", "assistant", "How high is the fever?")
+    assert writer.flush(timeout=5)
+    writer.close()
+
+    assert storage.session_updates[0] == {"s1": {
+        "first": first["timestamp"],
+        "last": last["timestamp"],
+        "count": 2,
+        "preview": "I have had a persistent dry cough for three weeks ...",
+    }}
+
+
+def test_queued_timestamps_have_millisecond_precision():
+    writer = MessageWriter(FakeStorage(), batch_size=100, flush_interval=60)
+    doc = writer.enqueue("s1", "user", "hi")
+    assert doc["timestamp"].microsecond % 1000 == 0
+    writer.close()
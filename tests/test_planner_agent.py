@@ -0,0 +1,28 @@
+import agents.planner_agent as planner_module
+from agents.planner_agent import PlannerAgent, find_medical_keywords
+
+
+def test_keywords_match_whole_words_only():
+    assert find_medical_keywords('I want to learn about the pharmacy opening hours') == set()
+    assert find_medical_keywords('My ears hurt and my arm is numb') == {'ear', 'arm'}
+
+
+def test_planner_fast_path_skips_router(monkeypatch):
+    def fail(_question):
+        raise AssertionError('router should not be called')
+
+    monkeypatch.setattr(planner_module, 'classify_intent', fail)
+    state = PlannerAgent({'question': 'I have a fever and a bad cough'})
+    assert state['current_tool'] == 'retriever'
+
+
+def test_planner_uses_router_intent(monkeypatch):
+    monkeypatch.setattr(planner_module, 'classify_intent', lambda q: ('current_events', 0.6, 0.2))
+    state = PlannerAgent({'question': 'Any news about the outbreak this week?'})
+    assert state['current_tool'] == 'tavily'
+
+
+def test_planner_keyword_tiebreak_when_router_unsure(monkeypatch):
+    monkeypatch.setattr(planner_module, 'classify_intent', lambda q: (None, 0.2, 0.01))
+    assert PlannerAgent({'question': 'what about the test?'})['current_tool'] == 'retriever'
+    assert PlannerAgent({'question': 'hello there'})['current_tool'] == 'llm_agent'
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from tools.flat_index import FlatIndex, write_flat_index
+from tools.quantization import VectorCompressor, build_quantized
+
+
+def _vectors(n=400, dim=32, seed=0):
+    rng = np.random.RandomState(seed)
+    vectors = rng.randn(n, dim).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+@pytest.mark.parametrize("mode", ["int8", "pq", "pca", "pca+int8", "pca+pq"])
+def test_shortlist_contains_exact_nearest_neighbour(mode):
+    vectors = _vectors()
+    compressor = VectorCompressor(mode, pca_dim=16, pq_subspaces=8).fit(vectors)
+    codes = compressor.encode(vectors)
+    assert len(codes) == len(vectors)
+
+    for row in range(0, 400, 40):
+        shortlist = compressor.shortlist(codes, vectors[row], 40)
+        assert row in shortlist
+
+
+def test_flat_index_reranks_quantized_shortlist(tmp_path):
+    vectors = _vectors()
+    directory = str(tmp_path / "flat")
+    records = ((f"c{i}", f"chunk {i}", {}, vec) for i, vec in enumerate(vectors))
+    write_flat_index(directory, records, len(vectors), vectors.shape[1])
+    compressor, codes = build_quantized(directory, vectors, "int8")
+    assert codes.dtype == np.int8
+
+    index = FlatIndex(directory)
+    assert index.compressor is not None
+    idx, scores = index.top_k(vectors[7], 3)
+    assert idx[0] == 7
+    # Scores come from the full-precision rows, not the codes
+    assert scores[0] == pytest.approx(1.0, abs=1e-5)
+    index.close()
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        VectorCompressor("int4")
@@ -0,0 +1,30 @@
+import numpy as np
+
+from tools.ranking import mmr_select, reciprocal_rank_fusion, score_summary
+
+
+def test_mmr_drops_near_duplicates():
+    query = np.array([0.8, 0.6], dtype=np.float32)
+    candidates = np.array([
+        [1.0, 0.0],
+        [0.999, 0.0447],   # near-duplicate of the first, slightly more relevant
+        [0.0, 1.0],
+    ], dtype=np.float32)
+
+    assert mmr_select(query, candidates, k=2, lambda_mult=0.5) == [1, 2]
+    # Pure relevance ranking keeps the duplicate
+    assert mmr_select(query, candidates, k=2, lambda_mult=1.0) == [1, 0]
+
+
+def test_score_summary():
+    assert score_summary([]) == {"count": 0}
+    summary = score_summary([0.2, 0.4, 0.6])
+    assert summary["count"] == 3
+    assert summary["max"] == 0.6
+    assert summary["min"] == 0.2
+    assert summary["mean"] == 0.4
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "a"]], k=60)
+    assert [item for item, _ in fused] == ["a", "c", "b"]
@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta, timezone
+
+from tools.retention import RetentionWorker, read_archive, restore_archive
+from tools.sqlite_storage import SQLiteStorage
+
+NOW = datetime(2025, 6, 1, tzinfo=timezone.utc)
+
+
+def _storage_with_sessions(tmp_path, ages_days):
+    storage = SQLiteStorage(str(tmp_path / "chats.db"))
+    storage.ensure_schema()
+    for i, age in enumerate(ages_days):
+        ts = NOW - timedelta(days=age)
+        session_id = f"s{i}"
+        storage.insert_messages([
+            {"_id": f"{i:012x}{j:012x}", "session_id": session_id, "role": role, "content": f"{session_id}-{role}",
+             "source": None, "timestamp": ts + timedelta(seconds=j)}
+            for j, role in enumerate(["user", "assistant"])
+        ])
+        storage.update_sessions({session_id: {"first": ts, "last": ts + timedelta(seconds=1), "count": 2,
+                                              "preview": f"{session_id}-user"}})
+    return storage
+
+
+def test_sweep_deletes_only_expired_sessions_in_batches(tmp_path):
+    storage = _storage_with_sessions(tmp_path, [100, 95, 40, 1])
+    worker = RetentionWorker(storage, retention_days=90, archive_dir="", batch_size=1, start=False)
+
+    assert worker.sweep(now=NOW) == 2
+    assert [s["session_id"] for s in storage.list_sessions()] == ["s3", "s2"]
+    assert storage.find_messages("s0") == []
+    assert worker.stats()["expired"] == 2
+    storage.close()
+
+
+def test_marked_deletes_are_hidden_then_removed_in_background(tmp_path):
+    storage = _storage_with_sessions(tmp_path, [1, 2, 3])
+    worker = RetentionWorker(storage, start=False)
+    worker.delete("s0")
+    worker.delete("s2")
+
+    assert worker.deleting() == {"s0", "s2"}
+    assert worker.process_deletes() == 2
+    assert not worker.is_deleting("s0")
+    assert [s["session_id"] for s in storage.list_sessions()] == ["s1"]
+    storage.close()
+
+
+def test_archive_round_trip(tmp_path):
+    storage = _storage_with_sessions(tmp_path, [200, 1])
+    worker = RetentionWorker(storage, retention_days=30, archive_dir=str(tmp_path / "archive"), start=False)
+    assert worker.sweep(now=NOW) == 1
+
+    (path,) = worker.archives
+    (record,) = list(read_archive(path))
+    assert record["session_id"] == "s0"
+    assert [m["content"] for m in record["messages"]] == ["s0-user", "s0-assistant"]
+    assert record["last_active"] == NOW - timedelta(days=200) + timedelta(seconds=1)
+
+    assert restore_archive(storage, path) == 1
+    assert [m["content"] for m in storage.find_messages("s0")] == ["s0-user", "s0-assistant"]
+    restored = {s["session_id"]: s for s in storage.list_sessions()}["s0"]
+    assert restored["message_count"] == 2
+    assert restored["preview"] == "s0-user"
+    storage.close()
+
+
+def test_sweep_keeps_sessions_that_became_active_again(tmp_path):
+    storage = _storage_with_sessions(tmp_path, [100, 95])
+    worker = RetentionWorker(storage, retention_days=90, archive_dir="", start=False)
+    stale_sessions = storage.stale_sessions
+
+    def select_then_new_turn(before, limit=None):
+        selected = stale_sessions(before, limit)
+        if selected:
+            # s0 gets a new message between the select and the delete
+            storage.insert_messages([{"_id": "f" * 24, "session_id": "s0", "role": "user", "content": "back again",
+                                      "source": None, "timestamp": NOW}])
+            storage.update_sessions({"s0": {"first": NOW, "last": NOW, "count": 1, "preview": None}})
+        return selected
+
+    worker.storage.stale_sessions = select_then_new_turn
+    assert worker.sweep(now=NOW) == 1
+    assert [s["session_id"] for s in storage.list_sessions()] == ["s0"]
+    assert [m["content"] for m in storage.find_messages("s0")] == ["back again"]
+    storage.close()
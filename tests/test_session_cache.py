@@ -0,0 +1,38 @@
+from tools.session_cache import RecentMessages
+
+
+def _msg(i):
+    return {"role": "user", "content": f"m{i}"}
+
+
+def test_miss_loads_once_then_appends_are_served_from_memory():
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return [_msg(i) for i in range(3)]
+
+    cache = RecentMessages(buffer_size=4)
+    assert [m["content"] for m in cache.get("s", 2, loader)] == ["m1", "m2"]
+    cache.append("s", _msg(3))
+    cache.append("s", _msg(4))
+    # Ring buffer keeps only the newest buffer_size messages
+    assert [m["content"] for m in cache.get("s", loader=loader)] == ["m1", "m2", "m3", "m4"]
+    assert len(calls) == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_append_to_uncached_session_is_left_to_the_loader():
+    cache = RecentMessages()
+    cache.append("s", _msg(0))
+    assert cache.get("s") == []
+
+
+def test_least_recently_used_session_is_evicted():
+    cache = RecentMessages(max_sessions=2)
+    cache.start("a", [_msg(0)])
+    cache.start("b")
+    cache.get("a")
+    cache.start("c")
+    assert cache.stats()["sessions"] == 2
+    assert cache.get("b", loader=lambda: [_msg(9)])[0]["content"] == "m9"
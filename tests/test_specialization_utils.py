@@ -0,0 +1,32 @@
+from tools.specialization_utils import (SPECIALIZATIONS, SYMPTOM_KEYWORDS, canonicalize_spec, implied_specializations,
+                                        normalize_profile, specialization_key)
+
+
+def test_exact_aliases_and_typos_canonicalize():
+    assert canonicalize_spec("pediadrist") == "Pediatrician"
+    assert canonicalize_spec(" Cardiology ") == "Cardiologist"
+    assert canonicalize_spec("Cardiolgist") == "Cardiologist"
+    assert canonicalize_spec("nuerologist") == "Neurologist"
+    assert canonicalize_spec("OB-GYN") == "OB/GYN"
+
+
+def test_unknown_and_short_values_are_left_alone():
+    assert canonicalize_spec("Radiologist") == "Radiologist"
+    assert canonicalize_spec("xyz specialist") == "xyz specialist"
+    assert canonicalize_spec("ent") == "ENT"
+    assert canonicalize_spec("emt") == "emt"
+    assert canonicalize_spec("") == ""
+
+
+def test_keys_are_shared_by_doctor_profiles_and_symptom_keywords():
+    assert set(SYMPTOM_KEYWORDS) <= set(SPECIALIZATIONS)
+    # "Neurology" in a profile and the "neurologist" keyword entry now agree
+    assert specialization_key("Neurology") == "neurologist"
+    assert "neurologist" in implied_specializations("I get a migraine every morning")
+    assert specialization_key("Radiology") == "radiology"
+
+
+def test_normalize_profile_copies():
+    profile = {"specialization": "derm", "bio": "x"}
+    assert normalize_profile(profile) == {"specialization": "Dermatologist", "bio": "x"}
+    assert profile["specialization"] == "derm"
@@ -0,0 +1,119 @@
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+from tools.sqlite_storage import SQLiteStorage
+
+T0 = datetime(2025, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def _msg(i, session_id="s1", role="user"):
+    return {"_id": f"{i:024x}", "session_id": session_id, "role": role, "content": f"m{i}",
+            "source": None, "timestamp": T0 + timedelta(seconds=i)}
+
+
+def _storage(tmp_path):
+    storage = SQLiteStorage(str(tmp_path / "chats.db"))
+    storage.ensure_schema()
+    return storage
+
+
+def test_legacy_database_is_migrated_in_place(tmp_path):
+    path = tmp_path / "legacy.db"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE sessions (session_id TEXT PRIMARY KEY, created_at TIMESTAMP, last_active TIMESTAMP)")
+    conn.execute("""CREATE TABLE messages (id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT NOT NULL,
+                    role TEXT NOT NULL, content TEXT NOT NULL, source TEXT, timestamp TIMESTAMP)""")
+    conn.execute("INSERT INTO sessions VALUES ('old', '2024-05-01 10:00:00', '2024-05-01 10:01:00')")
+    conn.execute("INSERT INTO messages (session_id, role, content, timestamp) "
+                 "VALUES ('old', 'user', 'legacy question', '2024-05-01 10:00:00')")
+    conn.commit()
+    conn.close()
+
+    storage = SQLiteStorage(str(path))
+    storage.ensure_schema()
+    (message,) = storage.find_messages("old")
+    assert message["id"] == f"{1:024x}"
+    assert message["timestamp"] == datetime(2024, 5, 1, 10, 0, tzinfo=timezone.utc)
+    (listed,) = storage.list_sessions()
+    assert listed["message_count"] == 1
+    assert listed["preview"] == "legacy question"
+    storage.close()
+
+
+def test_insert_is_idempotent_and_sessions_accumulate(tmp_path):
+    storage = _storage(tmp_path)
+    batch = [_msg(0), _msg(1, role="assistant")]
+    storage.insert_messages(batch)
+    storage.insert_messages(batch)  # retried batch
+    storage.update_sessions({"s1": {"first": T0, "last": T0 + timedelta(seconds=1), "count": 2, "preview": "m0"}})
+    storage.update_sessions({"s1": {"first": T0, "last": T0, "count": 1, "preview": "later"}})
+
+    assert [m["content"] for m in storage.find_messages("s1")] == ["m0", "m1"]
+    (session,) = storage.list_sessions()
+    assert session["message_count"] == 3
+    assert session["preview"] == "m0"
+    # last_active never moves backwards
+    assert session["last_active"] == T0 + timedelta(seconds=1)
+    assert storage.session_last_active("s1") == T0 + timedelta(seconds=1)
+    storage.close()
+
+
+def test_find_messages_after_and_limit(tmp_path):
+    storage = _storage(tmp_path)
+    storage.insert_messages([_msg(i) for i in range(5)])
+
+    assert [m["content"] for m in storage.find_messages("s1", limit=2)] == ["m3", "m4"]
+    after = storage.message_timestamp("s1", f"{1:024x}")
+    assert [m["content"] for m in storage.find_messages("s1", after=after, limit=2)] == ["m2", "m3"]
+    assert storage.message_timestamp("other", f"{1:024x}") is None
+    storage.close()
+
+
+def test_list_sessions_pages_and_delete(tmp_path):
+    storage = _storage(tmp_path)
+    for i in range(3):
+        ts = T0 + timedelta(minutes=i)
+        storage.update_sessions({f"s{i}": {"first": ts, "last": ts, "count": 1, "preview": None}})
+
+    first_page = storage.list_sessions(limit=2)
+    assert [s["session_id"] for s in first_page] == ["s2", "s1"]
+    assert [s["session_id"] for s in storage.list_sessions(before=first_page[-1]["last_active"])] == ["s0"]
+    # Excluded sessions do not shorten the page
+    assert [s["session_id"] for s in storage.list_sessions(limit=2, exclude={"s2"})] == ["s1", "s0"]
+
+    storage.insert_messages([_msg(0, session_id="s2")])
+    storage.delete_session("s2")
+    assert storage.find_messages("s2") == []
+    assert storage.session_last_active("s2") is None
+    storage.close()
+
+
+def test_doctor_upsert_update_and_list(tmp_path):
+    storage = _storage(tmp_path)
+    profile = {"specialization": "Cardiology", "languages": ["English"]}
+    doctor_id = storage.upsert_doctor("a@example.com", {"name": "Dr. A", "role": "doctor", "doctorProfile": profile})
+    assert storage.upsert_doctor("a@example.com", {"name": "Dr. Alice"}) == doctor_id
+    storage.update_doctor(doctor_id, {"embedding": [0.1, 0.2]})
+
+    (doctor,) = storage.list_doctors()
+    assert doctor["_id"] == doctor_id
+    assert doctor["name"] == "Dr. Alice"
+    assert doctor["doctorProfile"] == profile
+    assert doctor["embedding"] == [0.1, 0.2]
+    storage.close()
+
+
+def test_bulk_update_doctors_skips_rows_changed_since_read(tmp_path):
+    storage = _storage(tmp_path)
+    a = storage.upsert_doctor("a@example.com", {"name": "Dr. A", "role": "doctor",
+                                                "doctorProfile": {"specialization": "neuro"}})
+    b = storage.upsert_doctor("b@example.com", {"name": "Dr. B", "role": "doctor",
+                                                "doctorProfile": {"specialization": "Dermatology"}})
+    guard = {"doctorProfile.specialization": "neuro"}
+    fix = {"doctorProfile.specialization": "Neurologist"}
+    assert storage.bulk_update_doctors([(a, fix, guard), (b, fix, guard)]) == 1
+    profiles = {d["_id"]: d["doctorProfile"]["specialization"] for d in storage.iter_doctors(("doctorProfile",))}
+    assert profiles == {a: "Neurologist", b: "Dermatology"}
+    assert storage.bulk_update_doctors([(a, {"name": "Dr. A2"}, {"name": "Dr. A"})]) == 1
+    assert storage.bulk_update_doctors([(a, {"name": "Dr. A3"}, {"name": "Dr. A"})]) == 0
+    storage.close()
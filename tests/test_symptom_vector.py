@@ -0,0 +1,48 @@
+import numpy as np
+
+from tools.symptom_vector import SymptomVectors
+
+
+def test_running_vector_is_a_decayed_mean_of_message_embeddings():
+    vectors = SymptomVectors(decay=0.5)
+    first = vectors.add("s", [1.0, 0.0])
+    assert np.allclose(first, [1.0, 0.0])
+    # (0.5 * e1 + e2) / 1.5, normalized
+    second = vectors.add("s", [0.0, 3.0])
+    expected = np.array([0.5, 1.0]) / np.linalg.norm([0.5, 1.0])
+    assert np.allclose(second, expected)
+    assert np.allclose(vectors.vector("s"), expected)
+
+
+def test_seeding_with_several_embeddings_equals_adding_them_one_by_one():
+    a, b = SymptomVectors(decay=0.7), SymptomVectors(decay=0.7)
+    msgs = [[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]]
+    seeded = a.add("s", *msgs)
+    for m in msgs:
+        one_by_one = b.add("s", m)
+    assert np.allclose(seeded, one_by_one)
+
+
+def test_recommendations_are_cached_until_the_vector_shifts():
+    vectors = SymptomVectors(decay=0.9, shift=0.05)
+    v = vectors.add("s", [1.0, 0.0])
+    assert vectors.cached("s", v, key="f") is None
+    vectors.store("s", v, ["dr-a"], key="f")
+
+    # A message in nearly the same direction keeps the cached list
+    v = vectors.add("s", [1.0, 0.1])
+    assert vectors.cached("s", v, key="f") == ["dr-a"]
+    # Different filters, or a real change of topic, recompute
+    assert vectors.cached("s", v, key="other") is None
+    v = vectors.add("s", [0.0, 1.0])
+    v = vectors.add("s", [0.0, 1.0])
+    assert vectors.cached("s", v, key="f") is None
+
+
+def test_sessions_are_bounded_and_droppable():
+    vectors = SymptomVectors(max_sessions=2)
+    for sid in ("a", "b", "c"):
+        vectors.add(sid, [1.0, 0.0])
+    assert "a" not in vectors and "c" in vectors
+    vectors.drop("c")
+    assert vectors.vector("c") is None
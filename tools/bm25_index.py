@@ -0,0 +1,149 @@
+"""Lexical BM25 index over the medical chunks.
+
+Dense MiniLM embeddings are weak on exact tokens such as drug names, dosages
+and rare disease terms. This index is built from the same chunks as the
+Chroma collection, persisted next to it, and queried alongside it.
+"""
+
+import gzip
+import json
+import os
+import re
+
+import numpy as np
+from langchain_core.documents import Document
+
+BM25_FILENAME = "bm25_index.json.gz"
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-'][a-z0-9]+)*")
+_STOPWORDS = frozenset("""
+a an and are as at be but by can do does for from had has have how i if in into is it its
+may me my of on or our so than that the their them then there these they this to was we
+were what when which who will with you your
+""".split())
+
+
+def tokenize(text):
+    return [t for t in _TOKEN_PATTERN.findall((text or "").lower()) if t not in _STOPWORDS]
+
+
+class BM25Index:
+    """Inverted index with Okapi BM25 scoring.
+
+    Postings are kept as dicts while the index is being built and converted
+    to numpy arrays on first search, so a query is one vectorized
+    accumulation per query term.
+    """
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.ids = []
+        self.texts = []
+        self.metadatas = []
+        self.doc_lens = []
+        self._postings = {}
+        self._arrays = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, chunk_id, text, metadata=None):
+        idx = len(self.ids)
+        tokens = tokenize(text)
+        self.ids.append(chunk_id)
+        self.texts.append(text)
+        self.metadatas.append(dict(metadata or {}))
+        self.doc_lens.append(len(tokens))
+        counts = {}
+        for tok in tokens:
+            counts[tok] = counts.get(tok, 0) + 1
+        for tok, tf in counts.items():
+            self._postings.setdefault(tok, {})[idx] = tf
+        self._arrays = None
+
+    def _finalize(self):
+        if self._arrays is None:
+            n_docs = max(len(self.ids), 1)
+            arrays = {}
+            for tok, posting in self._postings.items():
+                doc_idx = np.fromiter(posting.keys(), dtype=np.int32, count=len(posting))
+                tfs = np.fromiter(posting.values(), dtype=np.float32, count=len(posting))
+                df = len(posting)
+                idf = np.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+                arrays[tok] = (doc_idx, tfs, float(idf))
+            self._doc_lens_arr = np.asarray(self.doc_lens, dtype=np.float32)
+            self._avg_len = float(self._doc_lens_arr.mean()) if len(self.doc_lens) else 1.0
+            self._arrays = arrays
+        return self._arrays
+
+    def search(self, query, k=10):
+        """Return [(chunk_index, score)] for the top `k` chunks, best first"""
+        if not self.ids:
+            return []
+        arrays = self._finalize()
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        norm = self.k1 * (1 - self.b + self.b * self._doc_lens_arr / (self._avg_len or 1.0))
+        for tok in set(tokenize(query)):
+            entry = arrays.get(tok)
+            if entry is None:
+                continue
+            doc_idx, tfs, idf = entry
+            scores[doc_idx] += idf * tfs * (self.k1 + 1) / (tfs + norm[doc_idx])
+
+        nonzero = np.flatnonzero(scores)
+        if nonzero.size == 0:
+            return []
+        if nonzero.size > k:
+            top = nonzero[np.argpartition(-scores[nonzero], k - 1)[:k]]
+        else:
+            top = nonzero
+        top = top[np.argsort(-scores[top])]
+        return [(int(i), float(scores[i])) for i in top]
+
+    def document(self, idx):
+        return Document(id=self.ids[idx], page_content=self.texts[idx], metadata=dict(self.metadatas[idx]))
+
+    def save(self, path):
+        payload = {
+            "k1": self.k1,
+            "b": self.b,
+            "ids": self.ids,
+            "texts": self.texts,
+            "metadatas": self.metadatas,
+            "doc_lens": self.doc_lens,
+            "postings": {
+                tok: [list(posting.keys()), list(posting.values())]
+                for tok, posting in self._postings.items()
+            },
+        }
+        tmp_path = f"{path}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump(payload, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            payload = json.load(f)
+        index = cls(k1=payload.get("k1", 1.5), b=payload.get("b", 0.75))
+        index.ids = payload["ids"]
+        index.texts = payload["texts"]
+        index.metadatas = payload["metadatas"]
+        index.doc_lens = payload["doc_lens"]
+        index._postings = {
+            tok: dict(zip(doc_idx, tfs)) for tok, (doc_idx, tfs) in payload["postings"].items()
+        }
+        return index
+
+
+def build_index(ids, texts, metadatas=None):
+    index = BM25Index()
+    metadatas = metadatas or [None] * len(ids)
+    for chunk_id, text, metadata in zip(ids, texts, metadatas):
+        index.add(chunk_id, text, metadata)
+    return index
+
+
+def index_path(persist_dir):
+    return os.path.join(persist_dir, BM25_FILENAME)
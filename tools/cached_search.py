@@ -0,0 +1,207 @@
+"""Cached, rate-limited wrapper around the external search providers.
+
+Wikipedia and Tavily are the slowest fallback hops, and medical questions
+repeat heavily, so every provider call goes through a `CachedSearch`:
+
+- results are kept in a small SQLite file keyed by (provider, normalized
+  query) for SEARCH_CACHE_TTL seconds, so they survive restarts;
+- each provider has `max_concurrency` call slots; a call that cannot get a
+  slot before the caller's deadline is not queued but answered with None,
+  so hung calls cannot pile up work behind them; identical queries already
+  in flight share the pending call instead of starting another;
+- callers wait at most `timeout` seconds and get None on timeout or error.
+  Providers should apply the same timeout to their own I/O (see
+  tools/search_tools.py), so a slot is freed when a call hangs.
+
+Providers are plain callables `query -> result` (the result must be JSON
+serializable; None means "no result" and is not cached), so tests can plug
+in local stubs.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+SEARCH_CACHE_PATH = os.getenv("SEARCH_CACHE_PATH", "./chat_db/search_cache.db")
+# Seconds a cached search result stays valid (default one week)
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", str(7 * 24 * 3600)))
+# Seconds a caller waits for a provider before giving up on it
+SEARCH_TIMEOUT = float(os.getenv("SEARCH_TIMEOUT", "8"))
+
+SCHEMA = """CREATE TABLE IF NOT EXISTS search_cache (
+    provider TEXT NOT NULL,
+    query TEXT NOT NULL,
+    result TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (provider, query)
+)"""
+SELECT_RESULT = "SELECT result FROM search_cache WHERE provider = ? AND query = ? AND expires_at > ?"
+UPSERT_RESULT = """INSERT INTO search_cache (provider, query, result, expires_at) VALUES (?, ?, ?, ?)
+                   ON CONFLICT (provider, query) DO UPDATE SET
+                       result = excluded.result, expires_at = excluded.expires_at"""
+DELETE_EXPIRED = "DELETE FROM search_cache WHERE expires_at <= ?"
+
+
+def normalize_query(query):
+    """Cache key for a query: lowercased, whitespace collapsed, trailing punctuation dropped"""
+    return " ".join(str(query or "").lower().split()).rstrip("?!.")
+
+
+class SearchCache:
+    """Persistent TTL cache of search results shared by all providers"""
+
+    def __init__(self, path=SEARCH_CACHE_PATH, ttl=SEARCH_CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(SCHEMA)
+        self.purge()
+
+    def get(self, provider, query):
+        """Cached result, or None when missing or expired"""
+        with self._lock:
+            row = self._conn.execute(SELECT_RESULT, (provider, query, time.time())).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, provider, query, result):
+        with self._lock, self._conn:
+            self._conn.execute(UPSERT_RESULT, (provider, query, json.dumps(result), time.time() + self.ttl))
+
+    def purge(self):
+        """Drop expired entries; returns how many were removed"""
+        with self._lock, self._conn:
+            return self._conn.execute(DELETE_EXPIRED, (time.time(),)).rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _done_future(result):
+    future = Future()
+    future.set_result(result)
+    return future
+
+
+class CachedSearch:
+    def __init__(self, name, provider, cache=None, max_concurrency=2, timeout=SEARCH_TIMEOUT):
+        self.name = name
+        self.provider = provider
+        self.cache = cache
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix=f"search-{name}")
+        # One slot per worker, so nothing ever waits in the executor's queue
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.rejected = 0
+
+    def _fetch(self, query, key):
+        try:
+            result = self.provider(query)
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+            print(f"{self.name} search failed: {e}")
+            return None
+        if result is not None and self.cache is not None:
+            self.cache.set(self.name, key, result)
+        return result
+
+    def _finished(self, key, future):
+        self._slots.release()
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def submit(self, query, deadline=None):
+        """Future for the result of `query`; already done on a cache hit.
+
+        Waits until `deadline` (time.monotonic(); default now + timeout) for a
+        free slot, and resolves to None when none frees up in time.
+        """
+        key = normalize_query(query)
+        if not key:
+            return _done_future(None)
+        cached = self.cache.get(self.name, key) if self.cache is not None else None
+        with self._lock:
+            if cached is not None:
+                self.hits += 1
+                return _done_future(cached)
+            self.misses += 1
+            future = self._inflight.get(key)
+        if future is not None:
+            return future
+        if deadline is None:
+            deadline = time.monotonic() + self.timeout
+        if not self._slots.acquire(timeout=max(deadline - time.monotonic(), 0)):
+            with self._lock:
+                self.rejected += 1
+            print(f"{self.name} search skipped: all {self.name} calls busy")
+            return _done_future(None)
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                # Started by another caller while this one waited for a slot
+                self._slots.release()
+                return future
+            future = self._inflight[key] = self._executor.submit(self._fetch, query, key)
+        future.add_done_callback(lambda f, key=key: self._finished(key, f))
+        return future
+
+    def _wait(self, future, timeout):
+        try:
+            return future.result(timeout=max(timeout, 0))
+        except FutureTimeout:
+            with self._lock:
+                self.timeouts += 1
+            print(f"{self.name} search timed out")
+            return None
+
+    def search(self, query):
+        """Result for `query`, or None on timeout, error or when every slot stays busy"""
+        deadline = time.monotonic() + self.timeout
+        return self._wait(self.submit(query, deadline), deadline - time.monotonic())
+
+    def search_all(self, queries):
+        """Results for several queries run concurrently, sharing one timeout"""
+        deadline = time.monotonic() + self.timeout
+        futures = [self.submit(q, deadline) for q in queries]
+        return [self._wait(f, deadline - time.monotonic()) for f in futures]
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "errors": self.errors,
+                    "timeouts": self.timeouts, "rejected": self.rejected, "in_flight": len(self._inflight)}
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+
+_search_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_search_cache():
+    global _search_cache
+    with _cache_lock:
+        if _search_cache is None:
+            try:
+                _search_cache = SearchCache()
+            except sqlite3.Error as e:
+                print(f"Search cache unavailable: {e}")
+                return None
+        return _search_cache
@@ -0,0 +1,115 @@
+"""Query-aware compression of retrieved chunks before generation.
+
+Retrieved chunks are split into sentences, every sentence is scored against
+the question in a single embedding pass, and only the best sentences are kept
+(up to a character budget) so the executor prompt carries the relevant part of
+each chunk instead of the first 1000 characters.
+"""
+
+import os
+import re
+
+import numpy as np
+
+from tools.vector_store import get_embeddings
+
+# Total characters of retrieved context handed to the executor prompt
+CONTEXT_CHAR_BUDGET = int(os.getenv("CONTEXT_CHAR_BUDGET", "1200"))
+# Sentences scoring below this cosine similarity are never kept
+MIN_SENTENCE_SCORE = float(os.getenv("CONTEXT_MIN_SENTENCE_SCORE", "0.1"))
+# Sentences this similar to an already selected one are treated as duplicates
+DUPLICATE_THRESHOLD = 0.92
+
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+|\n{2,}")
+_MIN_SENTENCE_CHARS = 25
+
+
+def split_sentences(text):
+    """Split a chunk into trimmed sentences, dropping fragments too short to help."""
+    sentences = []
+    for part in _SENTENCE_SPLIT.split(text or ""):
+        sentence = " ".join(part.split())
+        if len(sentence) >= _MIN_SENTENCE_CHARS:
+            sentences.append(sentence)
+    return sentences
+
+
+def select_sentences(query_vec, sentence_vecs, lengths, budget=CONTEXT_CHAR_BUDGET,
+                     min_score=MIN_SENTENCE_SCORE, duplicate_threshold=DUPLICATE_THRESHOLD):
+    """Return indices of the sentences to keep.
+
+    Vectors must be L2-normalized. Sentences are taken greedily by similarity
+    to the query until the character budget is spent, skipping near-duplicates
+    of sentences that were already selected.
+    """
+    if len(sentence_vecs) == 0:
+        return []
+    scores = sentence_vecs @ query_vec
+    selected = []
+    used = 0
+    for idx in np.argsort(-scores, kind="stable"):
+        if scores[idx] < min_score:
+            break
+        if used + lengths[idx] > budget and selected:
+            continue
+        if selected and float(np.max(sentence_vecs[selected] @ sentence_vecs[idx])) >= duplicate_threshold:
+            continue
+        selected.append(int(idx))
+        used += lengths[idx]
+        if used >= budget:
+            break
+    return selected
+
+
+def _truncate(documents, budget):
+    per_doc = budget // max(len(documents), 1)
+    return "\n\n".join(doc.page_content[:per_doc] for doc in documents)
+
+
+def compress_documents(question, documents, budget=CONTEXT_CHAR_BUDGET):
+    """Build the context string for the executor from the retrieved documents.
+
+    Returns the selected sentences grouped per document in their original
+    order. Falls back to plain truncation when embeddings are unavailable.
+    """
+    sentences = []
+    owners = []
+    seen = set()
+    for doc_idx, doc in enumerate(documents):
+        for sentence in split_sentences(doc.page_content):
+            key = sentence.lower()
+            if key in seen:
+                continue
+            seen.add(key)
+            sentences.append(sentence)
+            owners.append(doc_idx)
+
+    if not sentences:
+        return _truncate(documents, budget)
+
+    try:
+        embeddings = get_embeddings()
+        vectors = np.asarray(embeddings.embed_documents([question] + sentences), dtype=np.float32)
+    except Exception as e:
+        print(f"Context compression unavailable, using truncated chunks: {e}")
+        return _truncate(documents, budget)
+
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    vectors = vectors / norms
+
+    lengths = [len(s) for s in sentences]
+    keep = select_sentences(vectors[0], vectors[1:], lengths, budget=budget)
+    if not keep:
+        # Nothing cleared the score floor; keep the single closest sentence
+        keep = [int(np.argmax(vectors[1:] @ vectors[0]))]
+    keep.sort()
+
+    groups = {}
+    for idx in keep:
+        groups.setdefault(owners[idx], []).append(sentences[idx])
+    compressed = "\n\n".join(" ".join(groups[doc_idx]) for doc_idx in sorted(groups))
+
+    original = sum(len(doc.page_content) for doc in documents)
+    print(f"Context compression: {original} -> {len(compressed)} chars ({len(keep)}/{len(sentences)} sentences)")
+    return compressed
@@ -0,0 +1,170 @@
+"""Rolling conversation memory.
+
+Older turns are folded into a running summary so prompts carry a short
+summary plus the most recent messages instead of an ever-growing transcript.
+Summaries are produced on a small background pool and picked up on a later
+turn, so the request that overflows the window never waits for the summarizer.
+
+Each session has at most one fold waiting: a fold scheduled while the
+session's previous one still runs starts when that one finishes (from its
+summary, without holding a worker meanwhile), and any further fold scheduled
+before then is merged into the waiting one. Finished jobs that nobody
+collects (idle or cleared sessions) are dropped after MEMORY_JOB_TTL seconds.
+"""
+
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from tools.llm_client import get_llm
+
+# Messages kept verbatim after a fold
+HISTORY_WINDOW = int(os.getenv("MEMORY_WINDOW", "6"))
+# History length that triggers a fold back down to HISTORY_WINDOW
+HISTORY_MAX = int(os.getenv("MEMORY_MAX", "12"))
+SUMMARY_MAX_CHARS = 1200
+MEMORY_WORKERS = int(os.getenv("MEMORY_WORKERS", "4"))
+# Seconds a finished, uncollected summary is kept
+MEMORY_JOB_TTL = float(os.getenv("MEMORY_JOB_TTL", "3600"))
+
+_executor = ThreadPoolExecutor(max_workers=MEMORY_WORKERS, thread_name_prefix="memory-summary")
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+
+class _FoldJob:
+    __slots__ = ("summary", "turns", "previous", "started", "created", "future")
+
+    def __init__(self, summary, turns, previous):
+        self.summary = summary
+        self.turns = turns
+        # Job of the same session still running when this one was scheduled
+        self.previous = previous
+        self.started = False
+        self.created = time.monotonic()
+        self.future = Future()
+
+
+def _format_turns(turns):
+    lines = []
+    for item in turns:
+        role = "Patient" if item.get('role') == 'user' else "Doctor"
+        lines.append(f"{role}: {item.get('content', '')}")
+    return "\n".join(lines)
+
+
+def _extractive_summary(previous_summary, turns):
+    """Summary used when no LLM is configured: keep what the patient said."""
+    notes = [item.get('content', '').strip() for item in turns if item.get('role') == 'user']
+    summary = " ".join(p for p in [previous_summary] + notes if p)
+    return summary[-SUMMARY_MAX_CHARS:]
+
+
+def summarize_turns(previous_summary, turns):
+    """Fold `turns` into `previous_summary` and return the new summary."""
+    llm = get_llm()
+    if not llm:
+        return _extractive_summary(previous_summary, turns)
+
+    prompt = f"""Update the running summary of a patient consultation.
+
+Current Summary:
+{previous_summary or "(none)"}
+
+New Conversation Turns:
+{_format_turns(turns)}
+
+Write the updated summary in at most 5 sentences. Keep symptoms, durations, medications, conditions and advice already given. Do not add anything that was not said."""
+
+    try:
+        response = llm.invoke(prompt)
+        summary = response.content.strip() if hasattr(response, 'content') else str(response).strip()
+    except Exception as e:
+        print(f"Memory: summarization failed, using extractive summary: {e}")
+        return _extractive_summary(previous_summary, turns)
+    return summary[:SUMMARY_MAX_CHARS] or _extractive_summary(previous_summary, turns)
+
+
+def _run_fold(job):
+    with _jobs_lock:
+        job.started = True
+        turns = list(job.turns)
+        previous, job.previous = job.previous, None
+    summary = job.summary
+    if previous is not None:
+        try:
+            summary = previous.future.result()
+        except Exception as e:
+            print(f"Memory: previous summary job failed: {e}")
+    try:
+        job.future.set_result(summarize_turns(summary, turns))
+    except Exception as e:
+        job.future.set_exception(e)
+
+
+def _evict_expired(now):
+    expired = [job_id for job_id, job in _jobs.items()
+               if job.future.done() and now - job.created > MEMORY_JOB_TTL]
+    for job_id in expired:
+        del _jobs[job_id]
+
+
+def schedule_fold(previous_summary, previous_job, turns):
+    """Queue a background fold and return its job id.
+
+    When `previous_job` has not started yet, `turns` are merged into it and
+    its id is returned instead.
+    """
+    with _jobs_lock:
+        _evict_expired(time.monotonic())
+        previous = _jobs.get(previous_job) if previous_job else None
+        if previous is not None and not previous.started:
+            previous.turns.extend(turns)
+            return previous_job
+        # The new job consumes the previous summary, so the session never collects it
+        _jobs.pop(previous_job, None)
+        job_id = uuid.uuid4().hex
+        job = _jobs[job_id] = _FoldJob(previous_summary, list(turns), previous)
+    if previous is None:
+        _executor.submit(_run_fold, job)
+    else:
+        # Runs right away when the previous fold is already done
+        previous.future.add_done_callback(lambda _: _executor.submit(_run_fold, job))
+    return job_id
+
+
+def collect_fold(job_id):
+    """Return the finished summary for `job_id`, or None while it is still running."""
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        if job is None or not job.future.done():
+            return None
+        _jobs.pop(job_id, None)
+    try:
+        return job.future.result()
+    except Exception as e:
+        print(f"Memory: summary job failed: {e}")
+        return None
+
+
+def discard_fold(job_id):
+    """Forget a session's fold (conversation cleared or deleted); a running one finishes unread."""
+    if job_id:
+        with _jobs_lock:
+            _jobs.pop(job_id, None)
+
+
+def render_history(state, last_n):
+    """Render the running summary plus the last `last_n` messages for a prompt."""
+    lines = []
+    summary = state.get("conversation_summary")
+    if summary:
+        lines.append(f"Summary of earlier conversation: {summary}")
+    for item in state.get("conversation_history", [])[-last_n:]:
+        if item.get('role') == 'user':
+            lines.append(f"Patient: {item.get('content', '')}")
+        elif item.get('role') == 'assistant':
+            lines.append(f"Doctor: {item.get('content', '')}")
+    return "\n".join(lines) + "\n" if lines else ""
@@ -0,0 +1,152 @@
+"""Named corpora, each indexed in its own vector store shard.
+
+Corpora are configured in a JSON file (CORPORA_CONFIG, default
+`./corpora.json`) as a list of entries:
+
+    [
+      {"name": "textbook", "sources": ["./data/medical_book.pdf"],
+       "persist_dir": "./medical_db/", "enabled": true, "weight": 1.0},
+      {"name": "drug_monographs", "sources": ["./data/drugs/*.pdf"],
+       "persist_dir": "./corpora/drug_monographs/", "weight": 1.2,
+       "hnsw": {"M": 32, "construction_ef": 200, "search_ef": 64}}
+    ]
+
+`hnsw` overrides the HNSW_M / HNSW_CONSTRUCTION_EF / HNSW_SEARCH_EF env
+defaults for that shard; pick values with scripts/hnsw_benchmark.py.
+
+Without a config file the single medical textbook corpus is used, so
+existing deployments keep working unchanged.
+"""
+
+import glob
+import json
+import os
+
+from tools.ingest import ingest_sources
+from tools.vector_store import (DEFAULT_PERSIST_DIR, HNSW_PARAMS, VECTOR_BACKEND, configure_hnsw, export_flat_index,
+                                get_bm25_index, get_flat_index, get_or_create_vectorstore)
+
+CORPORA_CONFIG = os.getenv("CORPORA_CONFIG", "./corpora.json")
+
+DEFAULT_CORPORA = [
+    {
+        "name": "textbook",
+        "sources": ["./data/medical_book.pdf"],
+        "persist_dir": DEFAULT_PERSIST_DIR,
+        "enabled": True,
+        "weight": 1.0,
+    }
+]
+
+_corpora = None
+
+
+def _normalize(entry):
+    name = entry["name"]
+    return {
+        "name": name,
+        "sources": list(entry.get("sources", [])),
+        "persist_dir": entry.get("persist_dir") or os.path.join("./corpora", name),
+        "enabled": bool(entry.get("enabled", True)),
+        "weight": float(entry.get("weight", 1.0)),
+        "hnsw": _hnsw_params(name, entry.get("hnsw")),
+    }
+
+
+def _hnsw_params(name, params):
+    params = dict(params or {})
+    unknown = set(params) - set(HNSW_PARAMS)
+    if unknown:
+        raise ValueError(f"corpus '{name}': unknown HNSW parameters {sorted(unknown)}, expected {HNSW_PARAMS}")
+    return {key: int(value) for key, value in params.items()}
+
+
+def load_corpora(path=None):
+    """Return all configured corpora (enabled or not)"""
+    global _corpora
+    if path is None and _corpora is not None:
+        return _corpora
+    config_path = path or CORPORA_CONFIG
+    if os.path.exists(config_path):
+        with open(config_path, "r", encoding="utf-8") as f:
+            corpora = [_normalize(entry) for entry in json.load(f)]
+    else:
+        corpora = [_normalize(entry) for entry in DEFAULT_CORPORA]
+    if path is None:
+        _corpora = corpora
+        for corpus in corpora:
+            configure_hnsw(corpus["persist_dir"], corpus["hnsw"])
+    return corpora
+
+
+def get_enabled_corpora():
+    return [corpus for corpus in load_corpora() if corpus["enabled"]]
+
+
+def get_corpus(name):
+    for corpus in load_corpora():
+        if corpus["name"] == name:
+            return corpus
+    return None
+
+
+def resolve_sources(corpus):
+    """Expand the corpus source patterns into existing file paths"""
+    paths = []
+    for pattern in corpus["sources"]:
+        paths.extend(sorted(glob.glob(pattern)))
+    return paths
+
+
+def source_dirs(corpus):
+    """Directories the corpus source patterns draw from (the part before any wildcard)"""
+    dirs = []
+    for pattern in corpus["sources"]:
+        parts = []
+        for part in os.path.normpath(pattern).split(os.sep)[:-1]:
+            if glob.has_magic(part):
+                break
+            parts.append(part)
+        dirs.append(os.sep.join(parts) or ".")
+    return dirs
+
+
+def initialize_corpora():
+    """Load every enabled corpus, ingesting its sources when its store is missing.
+
+    Returns the names of the corpora that are available for retrieval.
+    """
+    available = []
+    for corpus in get_enabled_corpora():
+        name, persist_dir = corpus["name"], corpus["persist_dir"]
+        if VECTOR_BACKEND == "flat" and get_flat_index(persist_dir) is not None:
+            # The flat index and the persisted BM25 index serve queries without opening Chroma
+            _load_bm25(name, persist_dir)
+            available.append(name)
+            continue
+
+        vectorstore = get_or_create_vectorstore(persist_dir=persist_dir)
+        if not vectorstore:
+            sources = resolve_sources(corpus)
+            if not sources:
+                print(f"Corpus '{name}': no vector database and no sources found")
+                continue
+            print(f"Corpus '{name}': creating vector database from {len(sources)} documents...")
+            ingest_sources(sources, persist_dir=persist_dir)
+            vectorstore = get_or_create_vectorstore(persist_dir=persist_dir)
+            if not vectorstore:
+                continue
+
+        if VECTOR_BACKEND == "flat" and get_flat_index(persist_dir) is None:
+            export_flat_index(vectorstore, persist_dir)
+        _load_bm25(name, persist_dir)
+        available.append(name)
+    return available
+
+
+def _load_bm25(name, persist_dir):
+    """Load (or build once) the BM25 index used by hybrid retrieval"""
+    try:
+        get_bm25_index(persist_dir)
+    except Exception as e:
+        print(f"Warning: BM25 index for corpus '{name}' unavailable, retrieval will be dense-only: {e}")
@@ -0,0 +1,104 @@
+"""Near-duplicate chunk elimination for ingestion.
+
+Textbooks repeat headers, footers and boilerplate definitions, and the
+splitter's overlap adds more repetition. Chunks are compared with MinHash
+signatures over word shingles, bucketed with LSH so each new chunk is only
+checked against likely matches. A near-duplicate is dropped and its location
+is recorded on the chunk that was kept.
+"""
+
+import os
+import re
+import zlib
+
+import numpy as np
+
+# Estimated Jaccard similarity above which two chunks count as duplicates
+DEDUP_THRESHOLD = float(os.getenv("INGEST_DEDUP_THRESHOLD", "0.85"))
+SHINGLE_SIZE = 5
+NUM_PERM = 64
+BANDS = 16
+_ROWS = NUM_PERM // BANDS
+_PRIME = np.uint64(4294967311)  # smallest prime above 2**32
+
+_rng = np.random.RandomState(1234)
+_A = _rng.randint(1, 2 ** 31 - 1, size=NUM_PERM).astype(np.uint64)
+_B = _rng.randint(0, 2 ** 31 - 1, size=NUM_PERM).astype(np.uint64)
+
+_WORD = re.compile(r"\w+")
+
+
+def shingle_hashes(text):
+    words = _WORD.findall((text or "").lower())
+    if len(words) < SHINGLE_SIZE:
+        shingles = [" ".join(words)] if words else []
+    else:
+        shingles = {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+    return np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64)
+
+
+def minhash_signature(text):
+    """MinHash signature of the text's shingles, or None for empty text"""
+    hashes = shingle_hashes(text)
+    if hashes.size == 0:
+        return None
+    return ((np.outer(_A, hashes) + _B[:, None]) % _PRIME).min(axis=1)
+
+
+class NearDuplicateFilter:
+    """Streaming near-duplicate detector.
+
+    `check` returns the id of an already seen chunk that `doc` duplicates
+    (after recording `doc`'s location on it), or None after registering `doc`
+    as a new representative.
+    """
+
+    def __init__(self, threshold=DEDUP_THRESHOLD):
+        self.threshold = threshold
+        self._buckets = {}
+        self._signatures = {}
+        self._metadatas = {}
+        self.merged = set()
+        self.seen = 0
+        self.dropped = 0
+
+    def check(self, cid, doc):
+        self.seen += 1
+        signature = minhash_signature(doc.page_content)
+        if signature is None:
+            return None
+
+        band_keys = [(band, signature[band * _ROWS:(band + 1) * _ROWS].tobytes()) for band in range(BANDS)]
+        candidates = set()
+        for key in band_keys:
+            candidates.update(self._buckets.get(key, ()))
+        for other in candidates:
+            if float(np.mean(self._signatures[other] == signature)) >= self.threshold:
+                self._merge(other, doc)
+                self.dropped += 1
+                return other
+
+        self._signatures[cid] = signature
+        self._metadatas[cid] = doc.metadata
+        for key in band_keys:
+            self._buckets.setdefault(key, []).append(cid)
+        return None
+
+    def _merge(self, keeper, doc):
+        """Record the dropped chunk's location on the kept chunk's metadata"""
+        metadata = self._metadatas[keeper]
+        location = f"{(doc.metadata or {}).get('source', '')}:{(doc.metadata or {}).get('page', '')}"
+        pages = [p for p in metadata.get("duplicate_pages", "").split("; ") if p]
+        if location not in pages:
+            pages.append(location)
+        metadata["duplicate_pages"] = "; ".join(pages)
+        metadata["duplicate_count"] = metadata.get("duplicate_count", 0) + 1
+        self.merged.add(keeper)
+
+    def merged_metadatas(self):
+        """[(chunk_id, metadata)] for kept chunks that absorbed duplicates"""
+        return [(cid, self._metadatas[cid]) for cid in sorted(self.merged)]
+
+    def report(self):
+        ratio = self.dropped / self.seen if self.seen else 0.0
+        return {"chunks": self.seen, "dropped": self.dropped, "reduction": round(ratio, 4)}
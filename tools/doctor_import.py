@@ -0,0 +1,202 @@
+"""Bulk doctor import from NDJSON or CSV.
+
+NDJSON lines use the same shape as `POST /api/admin/doctor`
+({"name", "email", "doctorProfile": {...}}); a line without `doctorProfile`
+is read like a CSV row. CSV files have `name` and `email` columns, and every
+other non-empty column goes into `doctorProfile` (`qualifications` and
+`languages` are split on ";" or "|", `yearsExperience` is parsed as a number).
+
+Rows are normalized with `normalize_profile`, embedded a batch at a time and
+upserted by email with one unordered bulk write per batch. `import_doctors`
+yields one result per input row, so callers can stream them back.
+"""
+
+import csv
+import json
+import os
+import re
+
+from tools.specialization_utils import normalize_profile
+
+DOCTOR_IMPORT_BATCH = int(os.getenv("DOCTOR_IMPORT_BATCH", "256"))
+# Model doctors are embedded with; must match the one app.py embeds symptoms with
+DOCTOR_EMBED_MODEL = "paraphrase-multilingual-MiniLM-L12-v2"
+# Length of DOCTOR_EMBED_MODEL's vectors; stored embeddings of any other length are stale
+DOCTOR_EMBED_DIM = int(os.getenv("DOCTOR_EMBED_DIM", "384"))
+LIST_FIELDS = {"qualifications", "languages"}
+TEXT_FIELDS = {"specialization", "bio", "clinic"}
+LIST_SEPARATOR = re.compile(r"\s*[;|]\s*")
+IDENTITY_FIELDS = {"name", "displayName", "email", "role", "doctorProfile"}
+
+
+def detect_format(filename=None, content_type=None):
+    """"csv" or "ndjson" from a file name or content type (NDJSON when unsure)"""
+    hint = f"{filename or ''} {content_type or ''}".lower()
+    return "csv" if "csv" in hint else "ndjson"
+
+
+def _profile_from_flat(record):
+    profile = {}
+    for key, value in record.items():
+        if key in IDENTITY_FIELDS or key is None or value in (None, ""):
+            continue
+        if key in LIST_FIELDS and isinstance(value, str):
+            value = [v for v in LIST_SEPARATOR.split(value.strip()) if v]
+        elif key == "yearsExperience" and isinstance(value, str):
+            try:
+                value = int(value) if value.strip().isdigit() else float(value)
+            except ValueError:
+                pass
+        profile[key] = value
+    return profile
+
+
+def read_rows(lines, fmt="ndjson"):
+    """Yield (line number, record or None, parse error or None) for each input row"""
+    if fmt == "csv":
+        reader = csv.DictReader(lines)
+        for record in reader:
+            yield reader.line_num, record, None
+        return
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield number, None, f"invalid JSON: {e}"
+            continue
+        if not isinstance(record, dict):
+            yield number, None, "expected a JSON object"
+            continue
+        yield number, record, None
+
+
+def _check_profile(profile):
+    if not isinstance(profile, dict):
+        raise ValueError("doctorProfile must be an object")
+    for key, value in profile.items():
+        if value is None:
+            continue
+        if key in LIST_FIELDS:
+            if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+                raise ValueError(f"doctorProfile.{key} must be a list of strings")
+        elif key in TEXT_FIELDS and not isinstance(value, str):
+            raise ValueError(f"doctorProfile.{key} must be a string")
+        elif key == "yearsExperience" and (isinstance(value, bool) or not isinstance(value, (int, float, str))):
+            raise ValueError("doctorProfile.yearsExperience must be a number")
+
+
+def build_doctor(record):
+    """(email, document fields) for an import record; raises ValueError when it is unusable"""
+    email = record.get("email")
+    if email is not None and not isinstance(email, str):
+        raise ValueError("email must be a string")
+    email = (email or "").strip()
+    if not email:
+        raise ValueError("email is required")
+    name = record.get("name") or record.get("displayName") or ""
+    if not isinstance(name, str):
+        raise ValueError("name must be a string")
+    profile = record.get("doctorProfile")
+    if profile is None:
+        profile = _profile_from_flat(record)
+    _check_profile(profile)
+    normalized = normalize_profile(profile)
+    doc = {
+        "name": name,
+        "role": "doctor",
+        "doctorProfile": normalized,
+    }
+    if normalized.get("bio"):
+        doc["bio"] = normalized.get("bio")
+    return email, doc
+
+
+def doctor_text(name, email, profile):
+    """Text embedded for a doctor (same fields as find_related_doctors)"""
+    parts = [
+        profile.get("specialization", ""),
+        " ".join(profile.get("qualifications", [])) if profile.get("qualifications") else "",
+        f"{profile.get('yearsExperience', '')} years experience" if profile.get("yearsExperience") else "",
+        profile.get("bio", ""),
+        profile.get("clinic", ""),
+        " ".join(profile.get("languages", [])) if profile.get("languages") else "",
+    ]
+    text = " ".join(p for p in parts if p).strip()
+    return text or name or email
+
+
+def _write_batch(storage, batch, embed_batch):
+    """Embed and upsert one batch of (line, email, doc); returns the row results"""
+    warning = None
+    if embed_batch is not None:
+        try:
+            vectors = embed_batch([doctor_text(doc["name"], email, doc["doctorProfile"]) for _, email, doc in batch])
+            for (_, _, doc), vector in zip(batch, vectors):
+                doc["embedding"] = [float(v) for v in vector]
+        except Exception as e:
+            # Same as the single-doctor endpoint: keep the profiles, report the missing embeddings
+            warning = f"embedding failed: {e}"
+    try:
+        outcomes = storage.bulk_upsert_doctors([(email, doc) for _, email, doc in batch])
+    except Exception as e:
+        outcomes = [(None, f"database upsert failed: {e}")] * len(batch)
+    results = []
+    for (line, email, _), (status, error) in zip(batch, outcomes):
+        result = {"line": line, "email": email, "status": status or "error"}
+        if error:
+            result["error"] = error
+        elif warning:
+            result["warning"] = warning
+        results.append(result)
+    return results
+
+
+def import_doctors(rows, storage, embed_batch=None, batch_size=DOCTOR_IMPORT_BATCH):
+    """Upsert doctors from `read_rows` output, yielding one result dict per row, in input order.
+
+    `embed_batch(texts)` returns one vector per text; without it doctors are
+    stored without embeddings. Statuses are "inserted", "updated" or "error".
+    """
+    batch, emails, held = [], set(), []
+
+    def flush():
+        written = iter(_write_batch(storage, batch, embed_batch)) if batch else iter(())
+        # Rejected rows wait with the batch so results come out in input order
+        for item in held:
+            yield next(written) if item is None else item
+
+    for line, record, error in rows:
+        if error is None:
+            try:
+                email, doc = build_doctor(record)
+            except (ValueError, TypeError, AttributeError) as e:
+                # A malformed row only fails itself, never the rest of the import
+                error = str(e)
+        if error is not None:
+            held.append({"line": line, "email": (record or {}).get("email"), "status": "error", "error": error})
+            continue
+        # A repeated email must land after the earlier row, not race it within one unordered write
+        if email in emails or len(batch) >= batch_size:
+            yield from flush()
+            batch, emails, held = [], set(), []
+        batch.append((line, email, doc))
+        emails.add(email)
+        held.append(None)
+    yield from flush()
+
+
+def summarize(results):
+    """Counts per status, plus the failed rows"""
+    summary = {"rows": 0, "inserted": 0, "updated": 0, "errors": 0, "warnings": 0, "failed": []}
+    for result in results:
+        summary["rows"] += 1
+        if result["status"] == "error":
+            summary["errors"] += 1
+            summary["failed"].append(result)
+        else:
+            summary[result["status"]] += 1
+            if result.get("warning"):
+                summary["warnings"] += 1
+    return summary
@@ -0,0 +1,159 @@
+"""In-memory doctor index with attribute filters.
+
+All doctor embeddings are held in one normalized matrix, next to precomputed
+boolean masks (bitmaps) per spoken language and per canonical specialization
+and an array of years of experience. A search first ANDs the masks for the
+requested filters and only then takes the similarity product over the rows
+that survive, so filtering shrinks the scored set instead of post-filtering it.
+
+The index is rebuilt from storage after DOCTOR_INDEX_TTL seconds, or right
+away after `invalidate_doctor_index()` (doctor upserts and imports call it).
+"""
+
+import os
+import re
+import threading
+import time
+
+import numpy as np
+
+from tools.doctor_import import DOCTOR_EMBED_DIM, doctor_text
+from tools.lang_utils import language_code
+from tools.specialization_utils import normalize_profile, specialization_key
+
+DOCTOR_INDEX_TTL = float(os.getenv("DOCTOR_INDEX_TTL", "300"))
+_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+
+
+def parse_years(value):
+    """Years of experience from 12, "12", "12+" or "12 years"; NaN when unknown"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = _NUMBER.search(str(value or ""))
+    return float(match.group()) if match else float("nan")
+
+
+class DoctorIndex:
+    def __init__(self, doctors, embeddings):
+        self.doctors = doctors
+        matrix = np.asarray(embeddings, dtype=np.float32).reshape(len(doctors), -1) if doctors else np.zeros((0, 0))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        self.embeddings = matrix / norms
+        n = len(doctors)
+        self.experience = np.array([parse_years(d.get("doctorProfile", {}).get("yearsExperience")) for d in doctors],
+                                   dtype=np.float32)
+        self.languages = {}
+        self.specializations = {}
+        for i, doc in enumerate(doctors):
+            profile = doc.get("doctorProfile", {}) or {}
+            for lang in profile.get("languages") or []:
+                code = language_code(lang)
+                if code:
+                    self.languages.setdefault(code, np.zeros(n, dtype=bool))[i] = True
+            spec = specialization_key(profile.get("specialization"))
+            if spec:
+                self.specializations.setdefault(spec, np.zeros(n, dtype=bool))[i] = True
+        self.built_at = time.time()
+
+    def __len__(self):
+        return len(self.doctors)
+
+    def candidates(self, language=None, min_experience=None, specializations=None):
+        """Row numbers of the doctors passing every given filter"""
+        mask = np.ones(len(self), dtype=bool)
+        if language:
+            mask &= self.languages.get(language_code(language), np.zeros(len(self), dtype=bool))
+        if min_experience is not None:
+            # NaN (unknown experience) compares False, so those doctors are excluded
+            mask &= self.experience >= min_experience
+        if specializations:
+            wanted = np.zeros(len(self), dtype=bool)
+            for spec in specializations:
+                wanted |= self.specializations.get(specialization_key(spec), False)
+            mask &= wanted
+        return np.flatnonzero(mask)
+
+    def similarities(self, query, rows):
+        """Cosine similarity of `query` with the given rows"""
+        q = np.asarray(query, dtype=np.float32)
+        norm = np.linalg.norm(q)
+        if norm == 0 or len(rows) == 0:
+            return np.zeros(len(rows), dtype=np.float32)
+        return self.embeddings[rows] @ (q / norm)
+
+    def facets(self):
+        """Doctor counts per language and specialization"""
+        return {
+            "doctors": len(self),
+            "languages": {code: int(m.sum()) for code, m in sorted(self.languages.items())},
+            "specializations": {spec: int(m.sum()) for spec, m in sorted(self.specializations.items())},
+        }
+
+
+def _embed_doctor(storage, doc, embed):
+    """Embed (and save) one doctor's profile text; None when embedding fails"""
+    try:
+        # Normalize and persist canonical specialization (if changed)
+        profile = doc.get("doctorProfile", {}) or {}
+        normalized = normalize_profile(profile)
+        if normalized.get("specialization") and normalized.get("specialization") != profile.get("specialization"):
+            storage.update_doctor(doc["_id"], {"doctorProfile": {**profile,
+                                                                 "specialization": normalized["specialization"]}})
+            doc["doctorProfile"] = {**profile, "specialization": normalized["specialization"]}
+        text = doctor_text(doc.get("name", ""), doc.get("email", ""),
+                           {**normalized, "bio": normalized.get("bio") or doc.get("bio", "")})
+        vector = np.asarray(embed(text)).tolist()
+        storage.update_doctor(doc["_id"], {"embedding": vector})
+        return vector
+    except Exception as e:
+        print(f"Error computing embedding for doctor {doc.get('name')}: {e}")
+        return None
+
+
+def build_doctor_index(storage, embed, dim=DOCTOR_EMBED_DIM):
+    """Index every doctor in storage, embedding (and saving) the ones without an embedding.
+
+    Stored embeddings whose length is not `dim` (e.g. written with another
+    model) are re-embedded; doctors still without a `dim`-long vector are left
+    out of the index.
+    """
+    doctors, embeddings = [], []
+    stale = skipped = 0
+    for doc in storage.list_doctors():
+        vector = doc.get("embedding")
+        if vector and len(vector) != dim:
+            stale += 1
+            vector = None
+        if not vector:
+            vector = _embed_doctor(storage, doc, embed)
+        if vector is None or len(vector) != dim:
+            skipped += 1
+            continue
+        doctors.append(doc)
+        embeddings.append(vector)
+    if stale or skipped:
+        print(f"Doctor index: {stale} stored embeddings were not {dim}-dim and were recomputed; "
+              f"skipped {skipped} doctors without a {dim}-dim embedding")
+    return DoctorIndex(doctors, embeddings)
+
+
+_doctor_index = None
+_index_lock = threading.Lock()
+
+
+def get_doctor_index(storage, embed):
+    """Shared index over the doctors in `storage` (None without storage)"""
+    global _doctor_index
+    if storage is None:
+        return None
+    with _index_lock:
+        if _doctor_index is None or time.time() - _doctor_index.built_at > DOCTOR_INDEX_TTL:
+            _doctor_index = build_doctor_index(storage, embed)
+        return _doctor_index
+
+
+def invalidate_doctor_index():
+    global _doctor_index
+    with _index_lock:
+        _doctor_index = None
@@ -0,0 +1,222 @@
+"""Exact-search vector index over a memory-mapped float32 matrix.
+
+For corpora of this size an exact matmul + argpartition top-k is as fast as
+HNSW, and the index opens instantly: vectors live in `vectors.npy` opened with
+`mmap_mode='r'`, chunk text and metadata in `chunks.jsonl` addressed through
+`offsets.npy`. Because everything is file-backed, forked workers share the
+same physical pages instead of each holding a private copy.
+
+Layout under `<persist_dir>/flat/`:
+    CURRENT       name of the live version directory
+    v<n>/vectors.npy   float32 (N, d), L2-normalized rows
+    v<n>/offsets.npy   int64 (N + 1,), byte offsets of each line in chunks.jsonl
+    v<n>/chunks.jsonl  one {"id", "text", "metadata"} object per line
+    v<n>/codes.npy, quantizer.npz   optional compressed codes (see tools.quantization)
+
+Every export writes a complete new version directory, codes included, and
+then replaces CURRENT in one rename, so a reader never sees files from two
+different exports. Indexes already open keep reading their own version.
+Stores exported before versioning (files directly under `flat/`) still open.
+"""
+
+import json
+import mmap
+import os
+import shutil
+import time
+
+import numpy as np
+from langchain_core.documents import Document
+
+from tools.quantization import (PCA_DIM, PQ_SUBSPACES, QUANTIZATION, RERANK_FACTOR, build_quantized,
+                                load_quantized)
+from tools.ranking import mmr_select
+
+FLAT_DIRNAME = "flat"
+CURRENT_FILENAME = "CURRENT"
+INDEX_FILES = ("vectors.npy", "offsets.npy", "chunks.jsonl")
+EXPORT_PAGE_SIZE = 1000
+
+
+def flat_dir(persist_dir):
+    """Directory of the live flat index version"""
+    root = os.path.join(persist_dir, FLAT_DIRNAME)
+    try:
+        with open(os.path.join(root, CURRENT_FILENAME), "r", encoding="utf-8") as f:
+            return os.path.join(root, f.read().strip())
+    except FileNotFoundError:
+        return root
+
+
+def _new_version_dir(persist_dir):
+    version = time.time_ns()
+    while True:
+        directory = os.path.join(persist_dir, FLAT_DIRNAME, f"v{version}")
+        try:
+            os.makedirs(directory)
+            return directory
+        except FileExistsError:  # coarse clocks
+            version += 1
+
+
+def _publish(persist_dir, directory):
+    """Make `directory` the live version, then drop versions older than the one it replaces"""
+    root = os.path.join(persist_dir, FLAT_DIRNAME)
+    previous = flat_dir(persist_dir)
+    tmp = os.path.join(root, f"{CURRENT_FILENAME}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(os.path.basename(directory))
+    os.replace(tmp, os.path.join(root, CURRENT_FILENAME))
+    # The replaced version may still be open in a running process; it goes with the next export
+    keep = {os.path.basename(directory), os.path.basename(previous)}
+    for name in os.listdir(root):
+        if name.startswith("v") and name not in keep and os.path.isdir(os.path.join(root, name)):
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+
+def flat_index_exists(persist_dir):
+    directory = flat_dir(persist_dir)
+    return all(os.path.exists(os.path.join(directory, name)) for name in INDEX_FILES)
+
+
+class FlatIndex:
+    def __init__(self, directory):
+        self.directory = directory
+        self.vectors = np.load(os.path.join(directory, "vectors.npy"), mmap_mode="r")
+        self.offsets = np.load(os.path.join(directory, "offsets.npy"), mmap_mode="r")
+        self._file = open(os.path.join(directory, "chunks.jsonl"), "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._chunks = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        self.compressor, self.codes = load_quantized(directory)
+
+    def __len__(self):
+        return int(self.vectors.shape[0])
+
+    def document(self, idx):
+        start, end = int(self.offsets[idx]), int(self.offsets[idx + 1])
+        record = json.loads(self._chunks[start:end])
+        return Document(id=record["id"], page_content=record["text"], metadata=record["metadata"] or {})
+
+    def top_k(self, query_vec, k):
+        """Return (indices, scores) of the `k` rows most similar to the query"""
+        n = len(self)
+        if n == 0 or k <= 0:
+            return np.array([], dtype=np.int64), np.array([], dtype=np.float32)
+        query_vec = np.asarray(query_vec, dtype=np.float32)
+        k = min(k, n)
+        if self.compressor is not None:
+            # Shortlist on compressed codes, then re-rank with the full-precision rows
+            candidates = self.compressor.shortlist(self.codes, query_vec, k * RERANK_FACTOR)
+            scores = np.asarray(self.vectors[candidates]) @ query_vec
+            order = np.argsort(-scores)[:k]
+            return candidates[order], scores[order]
+        scores = self.vectors @ query_vec
+        top = np.argpartition(-scores, k - 1)[:k] if k < n else np.arange(n)
+        top = top[np.argsort(-scores[top])]
+        return top, scores[top]
+
+    def search(self, query_vec, k=3, fetch_k=None, use_mmr=False, lambda_mult=0.5):
+        """[(Document, cosine relevance)] best first, optionally MMR re-ranked"""
+        n_candidates = fetch_k or (k * 4 if use_mmr else k)
+        top, scores = self.top_k(query_vec, n_candidates)
+        order = list(range(len(top)))
+        if use_mmr and len(top):
+            order = mmr_select(np.asarray(query_vec, dtype=np.float32), np.asarray(self.vectors[top]), k, lambda_mult)
+        return [(self.document(int(top[i])), float(scores[i])) for i in order[:k]]
+
+    def close(self):
+        if isinstance(self._chunks, mmap.mmap):
+            self._chunks.close()
+        self._file.close()
+
+
+class FlatRetriever:
+    """Minimal stand-in for `as_retriever()` backed by a FlatIndex"""
+
+    def __init__(self, index, embed_query, k=3):
+        self.index = index
+        self.embed_query = embed_query
+        self.k = k
+
+    def invoke(self, query):
+        return [doc for doc, _ in self.index.search(self.embed_query(query), self.k)]
+
+
+def write_flat_index(directory, records, count, dim):
+    """Write `count` records of (id, text, metadata, vector) to `directory`.
+
+    Vectors are written straight into a memory-mapped .npy, so the export
+    never holds the whole matrix in memory. `directory` should be one nobody
+    reads yet; `export_from_collection` writes into a fresh version.
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = {name: os.path.join(directory, name) for name in INDEX_FILES}
+    vectors = np.lib.format.open_memmap(paths["vectors.npy"], mode="w+", dtype=np.float32, shape=(count, dim))
+    offsets = np.zeros(count + 1, dtype=np.int64)
+
+    written = 0
+    with open(paths["chunks.jsonl"], "wb") as f:
+        for chunk_id, text, metadata, vector in records:
+            if written >= count:
+                break
+            vec = np.asarray(vector, dtype=np.float32)
+            norm = np.linalg.norm(vec)
+            vectors[written] = vec / norm if norm > 0 else vec
+            f.write(json.dumps({"id": chunk_id, "text": text, "metadata": metadata}).encode("utf-8") + b"\n")
+            written += 1
+            offsets[written] = f.tell()
+    vectors.flush()
+    del vectors
+    if written != count:
+        raise ValueError(f"expected {count} records, got {written}")
+    with open(paths["offsets.npy"], "wb") as f:
+        np.save(f, offsets)
+
+
+def export_from_collection(collection, persist_dir):
+    """Export a Chroma collection (ids, texts, metadata, embeddings) to a flat index"""
+    count = collection.count()
+    if count == 0:
+        return None
+    first = collection.get(limit=1, include=["embeddings"])
+    dim = len(first["embeddings"][0])
+
+    def records():
+        for offset in range(0, count, EXPORT_PAGE_SIZE):
+            page = collection.get(limit=EXPORT_PAGE_SIZE, offset=offset,
+                                  include=["documents", "metadatas", "embeddings"])
+            for row in zip(page["ids"], page["documents"], page["metadatas"], page["embeddings"]):
+                yield row
+
+    directory = _new_version_dir(persist_dir)
+    try:
+        write_flat_index(directory, records(), count, dim)
+        # Codes are built next to the rows they encode, before the version goes live
+        if QUANTIZATION != "none":
+            build_quantized(directory, np.load(os.path.join(directory, "vectors.npy"), mmap_mode="r"))
+    except BaseException:
+        shutil.rmtree(directory, ignore_errors=True)
+        raise
+    _publish(persist_dir, directory)
+    print(f"Exported {count} chunks to flat index at {directory}")
+    return FlatIndex(directory)
+
+
+def publish_quantized(persist_dir, mode, pca_dim=PCA_DIM, pq_subspaces=PQ_SUBSPACES):
+    """Publish a copy of the live flat index with `mode` codes as a new version"""
+    source = flat_dir(persist_dir)
+    directory = _new_version_dir(persist_dir)
+    try:
+        for name in INDEX_FILES:
+            # Index files are never modified in place, so versions can share them
+            try:
+                os.link(os.path.join(source, name), os.path.join(directory, name))
+            except OSError:
+                shutil.copy2(os.path.join(source, name), os.path.join(directory, name))
+        build_quantized(directory, np.load(os.path.join(directory, "vectors.npy"), mmap_mode="r"),
+                        mode, pca_dim, pq_subspaces)
+    except BaseException:
+        shutil.rmtree(directory, ignore_errors=True)
+        raise
+    _publish(persist_dir, directory)
+    return directory
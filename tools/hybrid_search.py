@@ -0,0 +1,136 @@
+"""Hybrid lexical + dense retrieval over the medical corpora.
+
+Within a corpus, the BM25 and Chroma legs run concurrently and their
+rankings are merged with reciprocal-rank fusion, so chunks that match rare
+exact terms (drug names, dosages) surface even when the dense embedding
+misses them. Across corpora, every enabled shard is queried in parallel and
+the results are merged by dense relevance times the corpus weight: RRF
+scores only reflect rank within a shard, while cosine relevance comes from
+the same embedding model everywhere and so compares across shards.
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from tools.corpora import get_enabled_corpora
+from tools.ranking import reciprocal_rank_fusion
+from tools.vector_store import DEFAULT_PERSIST_DIR, get_bm25_index, search_with_scores
+
+# Candidates pulled from each leg before fusion
+HYBRID_FETCH_K = int(os.getenv("RAG_HYBRID_FETCH_K", "10"))
+RRF_K = int(os.getenv("RAG_RRF_K", "60"))
+# Synthetic query run once at startup to load the model, index segments and pools
+WARMUP_QUERY = os.getenv("RAG_WARMUP_QUERY", "What are the symptoms and treatment of hypertension?")
+
+# Separate pools: shard tasks wait on leg tasks, so they must not share workers
+_leg_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="hybrid-leg")
+_shard_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="hybrid-shard")
+
+
+def _lexical_search(query, fetch_k, persist_dir):
+    index = get_bm25_index(persist_dir)
+    if index is None:
+        return []
+    return [(index.document(idx), score) for idx, score in index.search(query, fetch_k)]
+
+
+def hybrid_search(query, k=3, fetch_k=HYBRID_FETCH_K, use_mmr=False, lambda_mult=0.5,
+                  persist_dir=DEFAULT_PERSIST_DIR):
+    """Return [(Document, relevance, bm25_score)] for the top `k` fused chunks.
+
+    `relevance` is the dense cosine relevance and `bm25_score` the lexical
+    score; either is None when the chunk was only found by the other leg.
+    Each document's metadata carries its `rrf_score`. Returns None when no
+    vector store is available.
+    """
+    dense_future = _leg_executor.submit(search_with_scores, query, fetch_k, None, use_mmr, lambda_mult, persist_dir)
+    lexical_future = _leg_executor.submit(_lexical_search, query, fetch_k, persist_dir)
+
+    dense = dense_future.result()
+    if dense is None:
+        return None
+    try:
+        lexical = lexical_future.result()
+    except Exception as e:
+        print(f"RAG: BM25 leg failed, using dense results only: {e}")
+        lexical = []
+
+    docs = {}
+    relevance = {}
+    bm25 = {}
+    for doc, score in dense:
+        docs[doc.id] = doc
+        relevance[doc.id] = score
+    for doc, score in lexical:
+        docs.setdefault(doc.id, doc)
+        bm25[doc.id] = score
+
+    fused = reciprocal_rank_fusion(
+        [[doc.id for doc, _ in dense], [doc.id for doc, _ in lexical]],
+        k=RRF_K
+    )
+    results = []
+    for chunk_id, rrf_score in fused[:k]:
+        doc = docs[chunk_id]
+        doc.metadata["rrf_score"] = round(rrf_score, 5)
+        results.append((doc, relevance.get(chunk_id), bm25.get(chunk_id)))
+    return results
+
+
+def search_corpora(query, k=3, fetch_k=HYBRID_FETCH_K, use_mmr=False, lambda_mult=0.5, corpora=None):
+    """Fan the query out to every enabled corpus and merge the shards.
+
+    Shard results are merged by dense relevance scaled by the corpus weight.
+    A chunk found only by BM25 has no relevance of its own and takes the
+    lowest relevance among its shard's dense hits (0 when there are none).
+    Returns [(Document, relevance, bm25_score)] like `hybrid_search`, with the
+    corpus name in each document's metadata, or None when no shard is available.
+    """
+    corpora = corpora if corpora is not None else get_enabled_corpora()
+    futures = {
+        corpus["name"]: (corpus, _shard_executor.submit(
+            hybrid_search, query, k, fetch_k, use_mmr, lambda_mult, corpus["persist_dir"]
+        ))
+        for corpus in corpora
+    }
+
+    merged = []
+    any_available = False
+    for name, (corpus, future) in futures.items():
+        try:
+            results = future.result()
+        except Exception as e:
+            print(f"RAG: corpus '{name}' search failed: {e}")
+            continue
+        if results is None:
+            continue
+        any_available = True
+        dense_scores = [relevance for _, relevance, _ in results if relevance is not None]
+        floor = min(dense_scores) if dense_scores else 0.0
+        for doc, relevance, bm25_score in results:
+            doc.metadata["corpus"] = name
+            score = relevance if relevance is not None else floor
+            merged.append((corpus["weight"] * score, doc, relevance, bm25_score))
+
+    if not any_available:
+        return None
+    merged.sort(key=lambda x: x[0], reverse=True)
+    return [(doc, relevance, bm25_score) for _, doc, relevance, bm25_score in merged[:k]]
+
+
+def warm_up_retrieval(query=WARMUP_QUERY):
+    """Run a synthetic query through every shard so the first real turn is not a cold one.
+
+    Goes through the same path as a chat turn, so it opens and caches each
+    shard's vector store (or flat index) and BM25 index, runs the embedding
+    model once and makes Chroma load its HNSW segments (or the flat index its
+    pages). Returns the elapsed seconds, or None when no shard is available.
+    """
+    start = time.perf_counter()
+    results = search_corpora(query)
+    if results is None:
+        return None
+    elapsed = time.perf_counter() - start
+    print(f"Retrieval warmed up in {elapsed * 1000:.0f} ms")
+    return elapsed
@@ -0,0 +1,173 @@
+"""Incremental corpus ingestion.
+
+Only chunks whose content hash is not already in the store are embedded and
+chunks that disappeared from a changed document are deleted. Unchanged
+documents are skipped by file hash without being parsed. Sources are keyed by
+absolute path, so the same file is one source whatever the working directory
+or however it was named on the command line.
+"""
+
+import os
+import time
+
+from tools.manifest import file_hash, load_manifest, new_manifest, save_manifest
+from tools.pdf_loader import iter_pdf_chunks
+from tools.dedup import NearDuplicateFilter
+from tools.vector_store import (DEFAULT_PERSIST_DIR, INGEST_BATCH_SIZE, INGEST_DEDUP, VECTOR_BACKEND, add_chunks,
+                                chunk_id, export_flat_index, open_vectorstore, rebuild_bm25_index,
+                                update_chunk_metadatas)
+
+DELETE_BATCH_SIZE = 5000
+
+
+def manifest_from_collection(vectorstore):
+    """Reconstruct a manifest for a store indexed before manifests existed.
+
+    Sources get no file hash, so the next ingest re-chunks them and replaces
+    any chunks whose ids do not match the content-hash scheme.
+    """
+    manifest = new_manifest()
+    data = vectorstore._collection.get(include=["metadatas"])
+    for cid, metadata in zip(data["ids"], data["metadatas"]):
+        source = os.path.normpath((metadata or {}).get("source", "") or "unknown")
+        manifest["sources"].setdefault(source, {"sha1": None, "chunks": []})["chunks"].append(cid)
+    return manifest
+
+
+def _source_path(path):
+    return os.path.abspath(os.path.normpath(path))
+
+
+def _absolutize_sources(manifest):
+    """Re-key relative source paths (older manifests) whose file exists from here"""
+    sources = manifest["sources"]
+    for source in list(sources):
+        if not os.path.isabs(source) and os.path.exists(source):
+            absolute = _source_path(source)
+            if absolute not in sources:
+                sources[absolute] = sources.pop(source)
+
+
+def _under(path, directories):
+    """True when `path` lies inside one of the (absolute) `directories`"""
+    if not os.path.isabs(path):
+        return False
+    for directory in directories:
+        try:
+            if os.path.commonpath([path, directory]) == directory:
+                return True
+        except ValueError:  # different drives
+            continue
+    return False
+
+
+def _delete_chunks(vectorstore, ids):
+    ids = list(ids)
+    for start in range(0, len(ids), DELETE_BATCH_SIZE):
+        vectorstore._collection.delete(ids=ids[start:start + DELETE_BATCH_SIZE])
+
+
+def ingest_file(vectorstore, path, previous_ids, batch_size=INGEST_BATCH_SIZE, duplicates=None):
+    """Upsert the new chunks of one document and delete its stale ones.
+
+    Chunks that `duplicates` (a NearDuplicateFilter) recognizes as near-copies
+    of chunks seen earlier in the run are not stored. Returns
+    (chunk_ids, added, deleted).
+    """
+    previous_ids = set(previous_ids)
+    chunk_ids = []
+    seen = set()
+    batch = []
+    added = 0
+
+    for doc in iter_pdf_chunks(path):
+        cid = chunk_id(doc)
+        if cid in seen:
+            continue
+        seen.add(cid)
+        if duplicates and duplicates.check(cid, doc):
+            continue
+        chunk_ids.append(cid)
+        if cid in previous_ids:
+            continue
+        batch.append((cid, doc))
+        if len(batch) >= batch_size:
+            add_chunks(vectorstore, batch)
+            added += len(batch)
+            batch = []
+    if batch:
+        add_chunks(vectorstore, batch)
+        added += len(batch)
+
+    stale = previous_ids - set(chunk_ids)
+    if stale:
+        _delete_chunks(vectorstore, stale)
+    return chunk_ids, added, len(stale)
+
+
+def ingest_sources(paths, persist_dir=DEFAULT_PERSIST_DIR, prune=False, prune_dirs=None, force=False,
+                   batch_size=INGEST_BATCH_SIZE, dedup=INGEST_DEDUP):
+    """Bring the store at `persist_dir` in line with the documents in `paths`.
+
+    With `prune`, chunks of previously indexed documents that no longer exist
+    on disk are removed, but only for documents inside `prune_dirs` (default:
+    the directories of `paths`); sources elsewhere are never touched. With
+    `force`, unchanged documents are re-chunked (still without re-embedding
+    chunks that are already present). With `dedup`, near-duplicate chunks among the documents processed in this run
+    are collapsed into one.
+    """
+    started = time.perf_counter()
+    os.makedirs(persist_dir, exist_ok=True)
+    vectorstore = open_vectorstore(persist_dir)
+    manifest = load_manifest(persist_dir)
+    if manifest is None:
+        manifest = manifest_from_collection(vectorstore)
+    _absolutize_sources(manifest)
+
+    stats = {"added": 0, "deleted": 0, "unchanged": 0, "updated": 0, "removed_sources": 0}
+    duplicates = NearDuplicateFilter() if dedup else None
+    for raw_path in paths:
+        path = _source_path(raw_path)
+        digest = file_hash(path)
+        entry = manifest["sources"].get(path)
+        if entry and entry.get("sha1") == digest and not force:
+            stats["unchanged"] += 1
+            print(f"Unchanged: {path}")
+            continue
+
+        chunk_ids, added, deleted = ingest_file(
+            vectorstore, path, entry["chunks"] if entry else [], batch_size=batch_size, duplicates=duplicates
+        )
+        manifest["sources"][path] = {"sha1": digest, "chunks": chunk_ids}
+        save_manifest(persist_dir, manifest)
+        stats["added"] += added
+        stats["deleted"] += deleted
+        stats["updated"] += 1
+        print(f"Ingested {path}: {len(chunk_ids)} chunks, {added} embedded, {deleted} deleted")
+
+    if duplicates and duplicates.merged:
+        update_chunk_metadatas(vectorstore, duplicates.merged_metadatas())
+    if duplicates:
+        stats["dedup"] = duplicates.report()
+
+    if prune:
+        if prune_dirs is None:
+            prune_dirs = {os.path.dirname(p) for p in paths}
+        prune_dirs = [_source_path(d) for d in prune_dirs]
+        for source in list(manifest["sources"]):
+            if _under(source, prune_dirs) and not os.path.exists(source):
+                entry = manifest["sources"].pop(source)
+                _delete_chunks(vectorstore, entry["chunks"])
+                stats["deleted"] += len(entry["chunks"])
+                stats["removed_sources"] += 1
+                print(f"Removed {len(entry['chunks'])} chunks of missing source {source}")
+
+    if stats["added"] or stats["deleted"]:
+        rebuild_bm25_index(vectorstore, persist_dir)
+        if VECTOR_BACKEND == "flat":
+            export_flat_index(vectorstore, persist_dir)
+    save_manifest(persist_dir, manifest)
+
+    stats["seconds"] = round(time.perf_counter() - started, 2)
+    print(f"Ingestion finished: {stats}")
+    return stats
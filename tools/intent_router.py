@@ -0,0 +1,102 @@
+"""Embedding-based intent routing for the planner.
+
+Each intent is represented by the centroid of a handful of example questions,
+embedded once with the same model used for retrieval. A question is routed to
+the intent whose centroid is closest, provided it wins clearly enough.
+"""
+
+import os
+
+import numpy as np
+
+from tools.vector_store import embed_query, get_embeddings
+
+# Minimum cosine similarity between the question and the winning centroid
+ROUTER_MIN_SIMILARITY = float(os.getenv("ROUTER_MIN_SIMILARITY", "0.3"))
+# Minimum lead of the winning intent over the runner-up
+ROUTER_MIN_MARGIN = float(os.getenv("ROUTER_MIN_MARGIN", "0.04"))
+
+INTENT_EXAMPLES = {
+    "medical_rag": [
+        "What are the symptoms of pneumonia?",
+        "How is type 2 diabetes treated?",
+        "I have had a headache and fever for three days",
+        "What causes chest pain when breathing?",
+        "What is the normal dosage of paracetamol for adults?",
+        "My child has a rash and itching on the arms",
+        "What are the side effects of metformin?",
+        "How do you diagnose hypothyroidism?",
+        "Is back pain a sign of kidney disease?",
+        "What is the prognosis for hepatitis B?",
+    ],
+    "general_llm": [
+        "Hello, how are you?",
+        "Thank you for your help",
+        "Who are you and what can you do?",
+        "Can you explain that again more simply?",
+        "Good morning",
+        "What should I ask my doctor at my next visit?",
+        "How can I stay motivated to exercise?",
+        "Tips for sleeping better at night",
+        "Okay, thanks, that makes sense",
+        "Can you help me understand my options?",
+    ],
+    "current_events": [
+        "What is the latest news on the bird flu outbreak?",
+        "Are there new COVID variants this month?",
+        "What did the WHO announce this week?",
+        "Latest FDA drug approvals in 2025",
+        "Is there a measles outbreak near me right now?",
+        "Recent clinical trial results for Alzheimer's drugs",
+        "Current guidelines announced today for flu vaccines",
+        "What are the newest treatments approved this year for obesity?",
+    ],
+}
+
+# Workflow node each intent is routed to
+INTENT_TOOLS = {
+    "medical_rag": "retriever",
+    "general_llm": "llm_agent",
+    "current_events": "tavily",
+}
+
+_intent_names = None
+_intent_centroids = None
+
+
+def get_intent_centroids():
+    """Return (names, centroid matrix), computing them on first use"""
+    global _intent_names, _intent_centroids
+    if _intent_centroids is None:
+        embeddings = get_embeddings()
+        names = list(INTENT_EXAMPLES)
+        centroids = []
+        for name in names:
+            vecs = np.asarray(embeddings.embed_documents(INTENT_EXAMPLES[name]), dtype=np.float32)
+            centroid = vecs.mean(axis=0)
+            centroids.append(centroid / np.linalg.norm(centroid))
+        _intent_names = names
+        _intent_centroids = np.vstack(centroids)
+        print(f"Intent router ready with {len(names)} intents")
+    return _intent_names, _intent_centroids
+
+
+def classify_intent(question):
+    """Return (intent, similarity, margin) for the question.
+
+    `intent` is None when the router is unavailable or the best match is below
+    ROUTER_MIN_SIMILARITY or does not lead the runner-up by ROUTER_MIN_MARGIN.
+    """
+    try:
+        names, centroids = get_intent_centroids()
+        scores = centroids @ embed_query(question)
+    except Exception as e:
+        print(f"Intent router unavailable: {e}")
+        return None, 0.0, 0.0
+
+    order = np.argsort(-scores)
+    best = float(scores[order[0]])
+    margin = best - float(scores[order[1]]) if len(order) > 1 else best
+    if best < ROUTER_MIN_SIMILARITY or margin < ROUTER_MIN_MARGIN:
+        return None, best, margin
+    return names[order[0]], best, margin
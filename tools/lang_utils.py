@@ -37,3 +37,32 @@ def detect_language(text: str) -> str:
         return lang
     except Exception:
         return 'en'
+
+
+# Language names as written in doctor profiles -> ISO 639-1 codes (beyond SUPPORTED_LANGUAGES)
+LANGUAGE_NAMES = {
+    'bengali': 'bn',
+    'gujarati': 'gu',
+    'kannada': 'kn',
+    'malayalam': 'ml',
+    'marathi': 'mr',
+    'punjabi': 'pa',
+    'tamil': 'ta',
+    'telugu': 'te',
+    'urdu': 'ur',
+    'odia': 'or',
+}
+LANGUAGE_NAMES.update({name.lower(): code.split('-')[0] for code, name in SUPPORTED_LANGUAGES.items()})
+
+
+def language_code(value: str) -> str:
+    """Normalize a language name or code ('Hindi', 'hi', 'zh-CN') to a primary ISO code.
+
+    Unknown names are returned lowercased so they still match each other.
+    """
+    if not value:
+        return ''
+    v = value.strip().lower()
+    if v in LANGUAGE_NAMES:
+        return LANGUAGE_NAMES[v]
+    return v.split('-')[0]
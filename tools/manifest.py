@@ -0,0 +1,46 @@
+"""On-disk chunk manifest kept next to a vector store.
+
+Records, per source document, the file hash it was indexed from and the
+content-hash ids of its chunks, so ingestion can tell which chunks are new,
+unchanged or gone without touching the embeddings.
+"""
+
+import hashlib
+import json
+import os
+
+MANIFEST_FILENAME = "manifest.json"
+
+
+def manifest_path(persist_dir):
+    return os.path.join(persist_dir, MANIFEST_FILENAME)
+
+
+def load_manifest(persist_dir):
+    """Return the manifest dict, or None when the store has none yet"""
+    path = manifest_path(persist_dir)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(persist_dir, manifest):
+    manifest["count"] = sum(len(entry.get("chunks", [])) for entry in manifest.get("sources", {}).values())
+    path = manifest_path(persist_dir)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, path)
+
+
+def new_manifest():
+    return {"version": 1, "sources": {}, "count": 0}
+
+
+def file_hash(path, block_size=1 << 20):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
@@ -0,0 +1,195 @@
+"""Write-behind persistence for chat messages.
+
+`/api/chat` used to make four synchronous Mongo round trips per turn (an
+insert and a session upsert for each of the two messages). Messages are now
+queued in memory and a background thread writes each batch with one
+`insert_messages` call (an `insert_many` on Mongo), plus one
+`update_sessions` call that coalesces the `last_active`, `message_count`
+and `preview` updates of every session touched by the batch (a
+`bulk_write`). A batch is flushed when it reaches MESSAGE_BATCH_SIZE or
+MESSAGE_FLUSH_INTERVAL seconds after the oldest queued message, and the
+queue is drained at shutdown.
+
+Messages get their `_id` when queued, so readers can merge unflushed
+messages (`pending`) with what is already stored without duplicates.
+"""
+
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from bson import ObjectId
+
+from tools.storage import make_preview
+
+MESSAGE_BATCH_SIZE = int(os.getenv("MESSAGE_BATCH_SIZE", "50"))
+MESSAGE_FLUSH_INTERVAL = float(os.getenv("MESSAGE_FLUSH_INTERVAL", "0.5"))
+# Messages kept in memory while the DB is unreachable; the oldest are dropped beyond this
+MESSAGE_QUEUE_MAX = int(os.getenv("MESSAGE_QUEUE_MAX", "10000"))
+
+
+class MessageWriter:
+    def __init__(self, storage, batch_size=MESSAGE_BATCH_SIZE, flush_interval=MESSAGE_FLUSH_INTERVAL,
+                 max_queued=MESSAGE_QUEUE_MAX):
+        self.storage = storage
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queued = max_queued
+        self._queue = []
+        self._inflight = []
+        self._cond = threading.Condition()
+        self._closed = False
+        self._flushing = 0
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+        self.failures = 0
+        self.last_error = None
+        self._thread = threading.Thread(target=self._run, name="message-writer", daemon=True)
+        self._thread.start()
+
+    def enqueue(self, session_id, role, content, source=None):
+        """Queue a message and return its document (with `_id` and timestamp set)"""
+        doc = {
+            "_id": ObjectId(),
+            "session_id": session_id,
+            "role": role,
+            "content": content,
+            "source": source,
+            "timestamp": _now_ms(),
+        }
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("message writer is closed")
+            self._queue.append(doc)
+            if len(self._queue) > self.max_queued:
+                overflow = len(self._queue) - self.max_queued
+                del self._queue[:overflow]
+                self.dropped += overflow
+                print(f"Warning: message queue full, dropped {overflow} oldest unsaved messages")
+            if len(self._queue) >= self.batch_size:
+                self._cond.notify()
+        return doc
+
+    def pending(self, session_id):
+        """Messages of a session that are queued or being written, oldest first"""
+        with self._cond:
+            return [dict(doc) for doc in self._inflight + self._queue if doc["session_id"] == session_id]
+
+    def discard(self, session_id):
+        """Drop queued messages of a deleted session so they are not written afterwards"""
+        with self._cond:
+            self._queue = [doc for doc in self._queue if doc["session_id"] != session_id]
+
+    def depth(self):
+        with self._cond:
+            return len(self._queue) + len(self._inflight)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "queued": len(self._queue),
+                "inflight": len(self._inflight),
+                "written": self.written,
+                "batches": self.batches,
+                "dropped": self.dropped,
+                "failures": self.failures,
+                "last_error": self.last_error,
+            }
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if not self._queue and self._closed:
+                    return
+                # Give the batch time to fill, unless it is already full or we are draining
+                deadline = self._queue[0]["timestamp"].timestamp() + self.flush_interval
+                while len(self._queue) < self.batch_size and not self._closed and not self._flushing:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                self._inflight = self._queue[:self.batch_size]
+                del self._queue[:self.batch_size]
+                batch = self._inflight
+
+            ok = self._write(batch)
+            with self._cond:
+                self._inflight = []
+                if not ok:
+                    # Put the batch back in front and back off before retrying
+                    self._queue[:0] = batch
+                    closed = self._closed
+                else:
+                    closed = False
+                self._cond.notify_all()
+            if not ok:
+                if closed:
+                    return
+                time.sleep(self.flush_interval)
+
+    def _write(self, batch):
+        sessions = {}
+        for doc in batch:
+            entry = sessions.setdefault(doc["session_id"], {"first": doc["timestamp"], "last": doc["timestamp"],
+                                                            "count": 0, "preview": None})
+            entry["first"] = min(entry["first"], doc["timestamp"])
+            entry["last"] = max(entry["last"], doc["timestamp"])
+            entry["count"] += 1
+            if entry["preview"] is None and doc["role"] == "user" and doc.get("content"):
+                entry["preview"] = make_preview(doc["content"])
+        try:
+            # Backends skip ids that are already stored, so a retried batch is safe
+            self.storage.insert_messages(batch)
+        except Exception as e:
+            self.failures += 1
+            self.last_error = str(e)
+            print(f"Warning: failed to write {len(batch)} messages, will retry: {e}")
+            return False
+        try:
+            self.storage.update_sessions(sessions)
+        except Exception as e:
+            # Messages are saved; a missed last_active bump is not worth re-inserting them
+            self.failures += 1
+            self.last_error = str(e)
+            print(f"Warning: failed to update {len(sessions)} sessions: {e}")
+        self.written += len(batch)
+        self.batches += 1
+        return True
+
+    def flush(self, timeout=None):
+        """Block until everything queued so far is written (or `timeout` expires)"""
+        deadline = None if timeout is None else time.time() + timeout
+        with self._cond:
+            # Makes the writer skip the batching interval until we are done
+            self._flushing += 1
+            try:
+                while self._queue or self._inflight:
+                    self._cond.notify_all()
+                    remaining = None if deadline is None else deadline - time.time()
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self._cond.wait(remaining)
+            finally:
+                self._flushing -= 1
+        return True
+
+    def close(self, timeout=10.0):
+        """Drain the queue and stop the writer thread"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        left = self.depth()
+        if left:
+            print(f"Warning: {left} chat messages were not persisted before shutdown")
+        return left == 0
+
+
+def _now_ms():
+    # Both backends store milliseconds; truncating up front keeps queued and stored copies comparable
+    now = datetime.now(timezone.utc)
+    return now.replace(microsecond=now.microsecond // 1000 * 1000)
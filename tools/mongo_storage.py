@@ -0,0 +1,191 @@
+"""MongoDB implementation of the chat storage interface."""
+
+from bson import ObjectId
+from pymongo import MongoClient, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from tools.storage import DOCTOR_LIST_FIELDS, ChatStorage, make_preview
+
+HISTORY_FIELDS = {"_id": 1, "role": 1, "content": 1, "source": 1, "timestamp": 1}
+SESSION_FIELDS = {"_id": 0, "session_id": 1, "created_at": 1, "last_active": 1, "preview": 1, "message_count": 1}
+BACKFILL_BATCH = 500
+
+
+def session_update(session_id, first, last, count, preview=None):
+    """Upsert keeping the session document's denormalized listing fields current.
+
+    The preview (first user message) is only set once, so the session list
+    never has to look at the messages collection.
+    """
+    return UpdateOne(
+        {"session_id": session_id},
+        [{"$set": {
+            "session_id": session_id,
+            "created_at": {"$ifNull": ["$created_at", first]},
+            "last_active": {"$max": ["$last_active", last]},
+            "message_count": {"$add": [{"$ifNull": ["$message_count", 0]}, count]},
+            "preview": {"$ifNull": ["$preview", preview]},
+        }}],
+        upsert=True,
+    )
+
+
+def _message(doc):
+    doc["id"] = str(doc.pop("_id"))
+    return doc
+
+
+class MongoStorage(ChatStorage):
+    name = "mongo"
+
+    def __init__(self, uri, db_name="caremate"):
+        self.client = MongoClient(uri, serverSelectionTimeoutMS=5000, tz_aware=True)
+        self.client.admin.command('ping')
+        self.db = self.client[db_name]
+        self.sessions = self.db["sessions"]
+        self.messages = self.db["messages"]
+        self.users = self.db["users"]
+
+    def ensure_schema(self):
+        self.sessions.create_index([("last_active", -1)])
+        self.sessions.create_index("session_id")
+        self.messages.create_index([("session_id", 1), ("timestamp", 1)])
+        self.users.create_index("role")
+        self.users.create_index("email")
+        self._backfill_session_fields()
+
+    def _backfill_session_fields(self):
+        """Add preview/message_count to sessions created before they were denormalized"""
+        missing = [s["session_id"] for s in self.sessions.find({"message_count": {"$exists": False}},
+                                                               {"_id": 0, "session_id": 1})]
+        for start in range(0, len(missing), BACKFILL_BATCH):
+            ids = missing[start:start + BACKFILL_BATCH]
+            counts = {row["_id"]: row for row in self.messages.aggregate([
+                {"$match": {"session_id": {"$in": ids}}},
+                {"$group": {"_id": "$session_id", "count": {"$sum": 1},
+                            "first": {"$min": "$timestamp"}, "last": {"$max": "$timestamp"}}},
+            ])}
+            previews = {row["_id"]: row["content"] for row in self.messages.aggregate([
+                {"$match": {"session_id": {"$in": ids}, "role": "user"}},
+                {"$sort": {"timestamp": 1}},
+                {"$group": {"_id": "$session_id", "content": {"$first": "$content"}}},
+            ])}
+            ops = [
+                session_update(sid, counts[sid]["first"], counts[sid]["last"], counts[sid]["count"],
+                               make_preview(previews[sid]) if previews.get(sid) else None)
+                for sid in ids if sid in counts
+            ]
+            if ops:
+                self.sessions.bulk_write(ops, ordered=False)
+            empty = [sid for sid in ids if sid not in counts]
+            if empty:
+                self.sessions.update_many({"session_id": {"$in": empty}}, {"$set": {"message_count": 0}})
+        if missing:
+            print(f"Backfilled preview/message_count on {len(missing)} sessions")
+
+    def insert_messages(self, messages):
+        try:
+            self.messages.insert_many(messages, ordered=False)
+        except BulkWriteError as e:
+            # A retried batch may already be partly written; only duplicates are fine
+            errors = e.details.get("writeErrors") or []
+            if e.details.get("writeConcernErrors") or any(err.get("code") != 11000 for err in errors):
+                raise
+
+    def update_sessions(self, updates):
+        self.sessions.bulk_write([
+            session_update(session_id, **entry) for session_id, entry in updates.items()
+        ], ordered=False)
+
+    def find_messages(self, session_id, after=None, limit=None):
+        query = {"session_id": session_id}
+        if after is not None:
+            query["timestamp"] = {"$gt": after}
+        if limit and after is None:
+            messages = list(self.messages.find(query, HISTORY_FIELDS).sort("timestamp", -1).limit(limit))
+            messages.reverse()
+        else:
+            cursor = self.messages.find(query, HISTORY_FIELDS).sort("timestamp", 1)
+            messages = list(cursor.limit(limit) if limit else cursor)
+        return [_message(m) for m in messages]
+
+    def message_timestamp(self, session_id, message_id):
+        if not ObjectId.is_valid(message_id):
+            return None
+        doc = self.messages.find_one({"_id": ObjectId(message_id), "session_id": session_id}, {"timestamp": 1})
+        return doc["timestamp"] if doc else None
+
+    def list_sessions(self, before=None, limit=50, exclude=()):
+        query = {"last_active": {"$lt": before}} if before else {}
+        if exclude:
+            query["session_id"] = {"$nin": list(exclude)}
+        return list(self.sessions.find(query, SESSION_FIELDS).sort("last_active", -1).limit(limit))
+
+    def session_last_active(self, session_id):
+        doc = self.sessions.find_one({"session_id": session_id}, {"_id": 0, "last_active": 1})
+        return doc.get("last_active") if doc else None
+
+    def stale_sessions(self, before, limit=None):
+        return list(self.sessions.find({"last_active": {"$lt": before}}, SESSION_FIELDS)
+                    .sort("last_active", 1).limit(limit or 0))
+
+    def messages_for_sessions(self, session_ids):
+        grouped = {session_id: [] for session_id in session_ids}
+        cursor = self.messages.find({"session_id": {"$in": list(session_ids)}}, {**HISTORY_FIELDS, "session_id": 1})
+        for doc in cursor.sort([("session_id", 1), ("timestamp", 1)]):
+            grouped[doc.pop("session_id")].append(_message(doc))
+        return grouped
+
+    def delete_sessions(self, session_ids, inactive_before=None):
+        ids = list(session_ids)
+        if inactive_before is None:
+            self.messages.delete_many({"session_id": {"$in": ids}})
+            return self.sessions.delete_many({"session_id": {"$in": ids}}).deleted_count
+        self.messages.delete_many({"session_id": {"$in": ids}, "timestamp": {"$lt": inactive_before}})
+        return self.sessions.delete_many({"session_id": {"$in": ids},
+                                          "last_active": {"$lt": inactive_before}}).deleted_count
+
+    def list_doctors(self):
+        return list(self.users.find({"role": "doctor"}))
+
+    def update_doctor(self, doctor_id, fields):
+        self.users.update_one({"_id": doctor_id}, {"$set": fields})
+
+    def upsert_doctor(self, email, fields):
+        result = self.users.update_one({"email": email}, {"$set": {**fields, "email": email}}, upsert=True)
+        if result.upserted_id is not None:
+            return result.upserted_id
+        return self.users.find_one({"email": email}, {"_id": 1})["_id"]
+
+    def iter_doctors(self, fields=DOCTOR_LIST_FIELDS, missing_embedding=False, batch_size=1000):
+        projection = {field: 1 for field in fields if field != "has_embedding"}
+        if "has_embedding" in fields:
+            projection["has_embedding"] = {"$gt": [{"$size": {"$ifNull": ["$embedding", []]}}, 0]}
+        query = {"role": "doctor"}
+        if missing_embedding:
+            query["$or"] = [{"embedding": {"$exists": False}}, {"embedding": None}, {"embedding": []}]
+        return self.users.find(query, projection, batch_size=batch_size)
+
+    def bulk_update_doctors(self, updates):
+        ops = [UpdateOne({**(expected[0] if expected else {}), "_id": doctor_id}, {"$set": fields})
+               for doctor_id, fields, *expected in updates]
+        return self.users.bulk_write(ops, ordered=False).modified_count if ops else 0
+
+    def bulk_upsert_doctors(self, doctors):
+        ops = [UpdateOne({"email": email}, {"$set": {**fields, "email": email}}, upsert=True)
+               for email, fields in doctors]
+        if not ops:
+            return []
+        try:
+            details = self.users.bulk_write(ops, ordered=False).bulk_api_result
+        except BulkWriteError as e:
+            details = e.details
+        upserted = {u["index"] for u in details.get("upserted", [])}
+        errors = {err["index"]: err.get("errmsg", "write failed") for err in details.get("writeErrors", [])}
+        return [
+            (None, errors[i]) if i in errors else ("inserted" if i in upserted else "updated", None)
+            for i in range(len(ops))
+        ]
+
+    def close(self):
+        self.client.close()
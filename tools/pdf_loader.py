@@ -1,5 +1,26 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 from langchain_community.document_loaders import PyPDFLoader
+from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
+from pypdf import PdfReader
+
+# Pages parsed and split per worker task
+PAGES_PER_TASK = int(os.getenv("INGEST_PAGES_PER_TASK", "16"))
+
+# Per-process splitter (building the tiktoken encoder is not free)
+_text_splitter = None
+
+def get_text_splitter():
+    global _text_splitter
+    if _text_splitter is None:
+        _text_splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
+            chunk_size=512,
+            chunk_overlap=128,
+            separators=["\n\n", ". ", "\n", " "]
+        )
+    return _text_splitter
 
 def load_pdf(pdf_path):
     loader = PyPDFLoader(pdf_path)
@@ -8,12 +29,7 @@ def load_pdf(pdf_path):
     return docs
 
 def split_documents(docs):
-    text_splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
-        chunk_size=512,
-        chunk_overlap=128,
-        separators=["\n\n", ". ", "\n", " "]
-    )
-    splits = text_splitter.split_documents(docs)
+    splits = get_text_splitter().split_documents(docs)
     print(f"Split into {len(splits)} chunks")
     return splits
 
@@ -22,3 +38,42 @@ def process_pdf(pdf_path):
     docs = load_pdf(pdf_path)
     doc_splits = split_documents(docs)
     return doc_splits
+
+def _split_page_range(pdf_path, start, end):
+    """Worker task: parse pages [start, end) and return their chunks as plain tuples"""
+    reader = PdfReader(pdf_path)
+    pages = []
+    for page_number in range(start, end):
+        text = reader.pages[page_number].extract_text() or ""
+        if text.strip():
+            pages.append(Document(page_content=text, metadata={"source": pdf_path, "page": page_number}))
+    if not pages:
+        return []
+    return [(doc.page_content, doc.metadata) for doc in get_text_splitter().split_documents(pages)]
+
+def count_pages(pdf_path):
+    return len(PdfReader(pdf_path).pages)
+
+def iter_pdf_chunks(pdf_path, workers=None, pages_per_task=PAGES_PER_TASK):
+    """Yield chunks of a PDF as Documents, in page order, without loading it whole.
+
+    Page ranges are parsed and split in a process pool; at most two tasks per
+    worker are in flight so memory stays bounded regardless of book size.
+    """
+    total_pages = count_pages(pdf_path)
+    workers = workers or int(os.getenv("INGEST_WORKERS", "0")) or os.cpu_count() or 1
+    ranges = [(start, min(start + pages_per_task, total_pages))
+              for start in range(0, total_pages, pages_per_task)]
+    print(f"Parsing {total_pages} pages from {pdf_path} with {workers} workers")
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = []
+        next_range = 0
+        while next_range < len(ranges) or pending:
+            while next_range < len(ranges) and len(pending) < workers * 2:
+                start, end = ranges[next_range]
+                pending.append(pool.submit(_split_page_range, pdf_path, start, end))
+                next_range += 1
+            # Yield in submission order so chunk order matches page order
+            for text, metadata in pending.pop(0).result():
+                yield Document(page_content=text, metadata=metadata)
@@ -0,0 +1,184 @@
+"""Compressed vector codes for the flat index.
+
+Chunk vectors can be reduced with PCA and then stored as int8 scalar codes
+or product-quantization (PQ) codes. Compressed scores only pick a shortlist;
+the flat index re-ranks it with the full-precision rows, so quality loss is
+bounded by the shortlist size rather than the quantization error.
+
+Modes: "int8", "pq", "pca", "pca+int8", "pca+pq".
+"""
+
+import os
+
+import numpy as np
+
+QUANTIZATION = os.getenv("FLAT_QUANTIZATION", "none").lower()
+PCA_DIM = int(os.getenv("FLAT_PCA_DIM", "128"))
+PQ_SUBSPACES = int(os.getenv("FLAT_PQ_SUBSPACES", "16"))
+# Shortlist size for full-precision re-ranking, as a multiple of k
+RERANK_FACTOR = int(os.getenv("FLAT_RERANK_FACTOR", "10"))
+
+QUANTIZER_FILENAME = "quantizer.npz"
+CODES_FILENAME = "codes.npy"
+MODES = ("int8", "pq", "pca", "pca+int8", "pca+pq")
+
+PQ_CENTROIDS = 256
+FIT_SAMPLE = 20000
+KMEANS_ITERATIONS = 12
+BLOCK_ROWS = 65536
+
+
+def _kmeans(x, n_clusters, iterations=KMEANS_ITERATIONS, seed=0):
+    rng = np.random.RandomState(seed)
+    n_clusters = min(n_clusters, len(x))
+    centroids = x[rng.choice(len(x), n_clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assign = _nearest(x, centroids)
+        for c in range(n_clusters):
+            members = x[assign == c]
+            if len(members):
+                centroids[c] = members.mean(axis=0)
+    return centroids
+
+
+def _nearest(x, centroids):
+    distances = (centroids ** 2).sum(axis=1)[None, :] - 2.0 * x @ centroids.T
+    return distances.argmin(axis=1)
+
+
+class VectorCompressor:
+    """Optional PCA followed by int8 or PQ codes; scores approximate inner products"""
+
+    def __init__(self, mode=QUANTIZATION, pca_dim=PCA_DIM, pq_subspaces=PQ_SUBSPACES):
+        if mode not in MODES:
+            raise ValueError(f"unknown quantization mode '{mode}', expected one of {MODES}")
+        self.mode = mode
+        self.pca_dim = pca_dim if mode.startswith("pca") else None
+        self.pq_subspaces = pq_subspaces if mode.endswith("pq") else None
+        self.mean = self.components = None
+        self.minimum = self.scale = None
+        self.centroids = None
+
+    def _reduce(self, vectors):
+        if self.components is None:
+            return vectors
+        return (vectors - self.mean) @ self.components.T
+
+    def _reduce_query(self, query_vec):
+        # The mean offset adds the same constant to every row's score, so it is dropped
+        if self.components is None:
+            return query_vec
+        return self.components @ query_vec
+
+    def fit(self, vectors, seed=0):
+        rng = np.random.RandomState(seed)
+        sample = np.asarray(vectors[np.sort(rng.choice(len(vectors), min(FIT_SAMPLE, len(vectors)), replace=False))],
+                            dtype=np.float32)
+        if self.pca_dim:
+            self.mean = sample.mean(axis=0)
+            _, _, vt = np.linalg.svd(sample - self.mean, full_matrices=False)
+            self.components = vt[:self.pca_dim].astype(np.float32)
+        reduced = self._reduce(sample)
+
+        if self.mode.endswith("int8"):
+            self.minimum = reduced.min(axis=0)
+            self.scale = np.maximum(reduced.max(axis=0) - self.minimum, 1e-12) / 255.0
+        elif self.mode.endswith("pq"):
+            dim = reduced.shape[1]
+            if dim % self.pq_subspaces:
+                raise ValueError(f"dimension {dim} is not divisible by {self.pq_subspaces} PQ subspaces")
+            sub = dim // self.pq_subspaces
+            self.centroids = np.stack([
+                _kmeans(reduced[:, j * sub:(j + 1) * sub], PQ_CENTROIDS, seed=seed + j)
+                for j in range(self.pq_subspaces)
+            ]).astype(np.float32)
+        return self
+
+    def _encode_block(self, block):
+        reduced = self._reduce(np.asarray(block, dtype=np.float32))
+        if self.mode.endswith("int8"):
+            codes = np.rint((reduced - self.minimum) / self.scale) - 128
+            return np.clip(codes, -128, 127).astype(np.int8)
+        if self.mode.endswith("pq"):
+            sub = self.centroids.shape[2]
+            return np.stack([_nearest(reduced[:, j * sub:(j + 1) * sub], self.centroids[j])
+                             for j in range(self.pq_subspaces)], axis=1).astype(np.uint8)
+        return reduced.astype(np.float32)
+
+    def encode(self, vectors):
+        return np.concatenate([self._encode_block(vectors[start:start + BLOCK_ROWS])
+                               for start in range(0, len(vectors), BLOCK_ROWS)])
+
+    def scores(self, codes, query_vec):
+        q = self._reduce_query(np.asarray(query_vec, dtype=np.float32))
+        out = np.empty(len(codes), dtype=np.float32)
+        if self.mode.endswith("int8"):
+            weights = self.scale * q
+            bias = float((128.0 * self.scale + self.minimum) @ q)
+        elif self.mode.endswith("pq"):
+            sub = self.centroids.shape[2]
+            table = np.einsum("mkd,md->mk", self.centroids, q.reshape(self.pq_subspaces, sub))
+            columns = np.arange(self.pq_subspaces)
+        for start in range(0, len(codes), BLOCK_ROWS):
+            block = np.asarray(codes[start:start + BLOCK_ROWS])
+            if self.mode.endswith("int8"):
+                out[start:start + len(block)] = block.astype(np.float32) @ weights + bias
+            elif self.mode.endswith("pq"):
+                out[start:start + len(block)] = table[columns, block].sum(axis=1)
+            else:
+                out[start:start + len(block)] = block @ q
+        return out
+
+    def shortlist(self, codes, query_vec, n):
+        """Indices (ascending) of the `n` rows with the highest compressed scores"""
+        scores = self.scores(codes, query_vec)
+        if n >= len(scores):
+            return np.arange(len(scores))
+        return np.sort(np.argpartition(-scores, n - 1)[:n])
+
+    def save(self, path):
+        arrays = {name: value for name, value in (
+            ("mean", self.mean), ("components", self.components), ("minimum", self.minimum),
+            ("scale", self.scale), ("centroids", self.centroids)) if value is not None}
+        np.savez(path, mode=np.array(self.mode), **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            compressor = cls(mode=str(data["mode"]))
+            for name in ("mean", "components", "minimum", "scale", "centroids"):
+                if name in data:
+                    setattr(compressor, name, data[name])
+        compressor.pca_dim = compressor.components.shape[0] if compressor.components is not None else None
+        compressor.pq_subspaces = compressor.centroids.shape[0] if compressor.centroids is not None else None
+        return compressor
+
+
+def quantized_exists(directory):
+    return (os.path.exists(os.path.join(directory, QUANTIZER_FILENAME))
+            and os.path.exists(os.path.join(directory, CODES_FILENAME)))
+
+
+def build_quantized(directory, vectors, mode=QUANTIZATION, pca_dim=PCA_DIM, pq_subspaces=PQ_SUBSPACES):
+    """Fit a compressor on `vectors`, write it and its codes next to the flat index"""
+    compressor = VectorCompressor(mode, pca_dim, pq_subspaces).fit(vectors)
+    codes = compressor.encode(vectors)
+    codes_tmp = os.path.join(directory, f"{CODES_FILENAME}.tmp")
+    with open(codes_tmp, "wb") as f:
+        np.save(f, codes)
+    quantizer_tmp = os.path.join(directory, f"{QUANTIZER_FILENAME}.tmp")
+    with open(quantizer_tmp, "wb") as f:
+        compressor.save(f)
+    os.replace(codes_tmp, os.path.join(directory, CODES_FILENAME))
+    os.replace(quantizer_tmp, os.path.join(directory, QUANTIZER_FILENAME))
+    print(f"Quantized {len(codes)} vectors ({mode}): {codes.nbytes / 1e6:.1f} MB of codes")
+    return compressor, codes
+
+
+def load_quantized(directory):
+    """(compressor, mmapped codes) for a flat index directory, or (None, None)"""
+    if not quantized_exists(directory):
+        return None, None
+    compressor = VectorCompressor.load(os.path.join(directory, QUANTIZER_FILENAME))
+    codes = np.load(os.path.join(directory, CODES_FILENAME), mmap_mode="r")
+    return compressor, codes
@@ -0,0 +1,57 @@
+"""Re-ranking helpers shared by the retrieval paths."""
+
+import numpy as np
+
+
+def mmr_select(query_vec, candidate_vecs, k, lambda_mult=0.5):
+    """Maximal marginal relevance over L2-normalized vectors.
+
+    Returns the indices of up to `k` candidates, trading relevance to the query
+    against similarity to the candidates already picked. Each step is a single
+    matrix-vector product, so the cost is O(k * n) instead of O(k * n^2).
+    """
+    n = len(candidate_vecs)
+    if n == 0 or k <= 0:
+        return []
+    relevance = candidate_vecs @ query_vec
+    max_redundancy = np.full(n, -np.inf, dtype=np.float32)
+    available = np.ones(n, dtype=bool)
+    selected = []
+    for _ in range(min(k, n)):
+        if selected:
+            scores = lambda_mult * relevance - (1 - lambda_mult) * max_redundancy
+        else:
+            scores = relevance.astype(np.float32, copy=True)
+        scores[~available] = -np.inf
+        idx = int(np.argmax(scores))
+        selected.append(idx)
+        available[idx] = False
+        max_redundancy = np.maximum(max_redundancy, candidate_vecs @ candidate_vecs[idx])
+    return selected
+
+
+def score_summary(scores):
+    """Small distribution summary of retrieval scores for logging and state"""
+    if not scores:
+        return {"count": 0}
+    arr = np.asarray(scores, dtype=np.float32)
+    return {
+        "count": int(arr.size),
+        "max": round(float(arr.max()), 4),
+        "mean": round(float(arr.mean()), 4),
+        "min": round(float(arr.min()), 4),
+    }
+
+
+def reciprocal_rank_fusion(ranked_lists, k=60, weights=None):
+    """Fuse ranked id lists with reciprocal-rank fusion.
+
+    Returns [(id, fused_score)] best first. `k` damps the advantage of the
+    top ranks; `weights` optionally scales each list's contribution.
+    """
+    weights = weights or [1.0] * len(ranked_lists)
+    fused = {}
+    for ranked, weight in zip(ranked_lists, weights):
+        for rank, item_id in enumerate(ranked):
+            fused[item_id] = fused.get(item_id, 0.0) + weight / (k + rank + 1)
+    return sorted(fused.items(), key=lambda x: x[1], reverse=True)
@@ -0,0 +1,244 @@
+"""Session retention, archival and background deletes.
+
+Sessions whose `last_active` is older than SESSION_RETENTION_DAYS are swept
+out of the database every RETENTION_SWEEP_INTERVAL seconds, in batches of
+RETENTION_BATCH_SIZE. Unless ARCHIVE_DIR is empty, each batch is first
+written to a zstd-compressed NDJSON file (one session with its messages per
+line), which `restore_archive` can load back.
+
+User-triggered deletes go through the same worker: `delete()` only marks the
+session, and the background thread removes marked sessions in batches, so
+the request thread never waits on a `delete_many`.
+
+A sweeper is used rather than Mongo TTL indexes: a TTL on messages would
+expire sessions message by message, and nothing could be archived first.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+
+# Days of inactivity after which a session is removed; 0 keeps everything
+SESSION_RETENTION_DAYS = float(os.getenv("SESSION_RETENTION_DAYS", "0"))
+# Where expired sessions are archived; empty deletes without archiving
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "./chat_db/archive")
+RETENTION_SWEEP_INTERVAL = float(os.getenv("RETENTION_SWEEP_INTERVAL", "3600"))
+RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", "500"))
+ARCHIVE_LEVEL = int(os.getenv("ARCHIVE_ZSTD_LEVEL", "10"))
+# Recent archive paths kept for stats and scripts; older ones are only counted
+RECENT_ARCHIVES = 20
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _parse_time(value):
+    return datetime.fromisoformat(value) if value else None
+
+
+def _message_id(value):
+    """Archived ids are strings; Mongo stores them as ObjectIds"""
+    try:
+        from bson import ObjectId
+    except ImportError:
+        return value
+    return ObjectId(value) if ObjectId.is_valid(value) else value
+
+
+def write_archive(sessions, messages, archive_dir=ARCHIVE_DIR, level=ARCHIVE_LEVEL):
+    """Write sessions (with their messages) to a new .ndjson.zst file and return its path"""
+    import zstandard
+
+    os.makedirs(archive_dir, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+    path = os.path.join(archive_dir, f"sessions-{stamp}.ndjson.zst")
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as raw:
+        with zstandard.ZstdCompressor(level=level).stream_writer(raw) as out:
+            for record in sessions:
+                line = {**record, "messages": messages.get(record["session_id"], [])}
+                out.write(json.dumps(line, default=_json_default, ensure_ascii=False).encode("utf-8") + b"\n")
+        raw.flush()
+        os.fsync(raw.fileno())
+    # Only a complete archive gets its final name; the sweep deletes after this returns
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_archive(path):
+    """Yield the archived sessions of a .ndjson.zst file, timestamps parsed back to datetimes"""
+    import io
+
+    import zstandard
+
+    with open(path, "rb") as raw:
+        reader = io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(raw), encoding="utf-8")
+        for line in reader:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            for key in ("created_at", "last_active"):
+                record[key] = _parse_time(record.get(key))
+            for m in record["messages"]:
+                m["timestamp"] = _parse_time(m["timestamp"])
+            yield record
+
+
+def restore_archive(storage, path):
+    """Load an archive back into storage; returns the number of sessions restored"""
+    restored = 0
+    for record in read_archive(path):
+        messages = record["messages"]
+        if messages:
+            storage.insert_messages([
+                {"_id": _message_id(m["id"]), "session_id": record["session_id"], "role": m["role"],
+                 "content": m["content"], "source": m.get("source"), "timestamp": m["timestamp"]}
+                for m in messages
+            ])
+        timestamps = [m["timestamp"] for m in messages]
+        storage.update_sessions({record["session_id"]: {
+            "first": record.get("created_at") or min(timestamps),
+            "last": record.get("last_active") or max(timestamps),
+            "count": len(messages),
+            "preview": record.get("preview"),
+        }})
+        restored += 1
+    return restored
+
+
+class RetentionWorker:
+    def __init__(self, storage, writer=None, retention_days=SESSION_RETENTION_DAYS, archive_dir=ARCHIVE_DIR,
+                 interval=RETENTION_SWEEP_INTERVAL, batch_size=RETENTION_BATCH_SIZE, start=True):
+        self.storage = storage
+        # Message writer to drain before deleting, so queued messages cannot recreate a session
+        self.writer = writer
+        self.retention_days = retention_days
+        self.archive_dir = archive_dir
+        self.interval = interval
+        self.batch_size = batch_size
+        self._deleting = set()
+        self._cond = threading.Condition()
+        self._closed = False
+        self.deleted = 0
+        self.expired = 0
+        self.archived = 0
+        self.archives = deque(maxlen=RECENT_ARCHIVES)
+        self.archive_files = 0
+        self.failures = 0
+        self.last_error = None
+        self.last_sweep = None
+        self._thread = None
+        if start:
+            self._thread = threading.Thread(target=self._run, name="retention", daemon=True)
+            self._thread.start()
+
+    def delete(self, session_id):
+        """Mark a session for deletion; it is removed in the background"""
+        with self._cond:
+            self._deleting.add(session_id)
+            self._cond.notify()
+
+    def is_deleting(self, session_id):
+        with self._cond:
+            return session_id in self._deleting
+
+    def deleting(self):
+        with self._cond:
+            return set(self._deleting)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "deleting": len(self._deleting),
+                "deleted": self.deleted,
+                "expired": self.expired,
+                "archived": self.archived,
+                "archive_files": self.archive_files,
+                "last_archive": self.archives[-1] if self.archives else None,
+                "retention_days": self.retention_days,
+                "last_sweep": self.last_sweep.isoformat() if self.last_sweep else None,
+                "failures": self.failures,
+                "last_error": self.last_error,
+            }
+
+    def process_deletes(self):
+        """Delete every marked session, in batches; returns how many were deleted"""
+        with self._cond:
+            ids = list(self._deleting)
+        if not ids:
+            return 0
+        if self.writer is not None:
+            self.writer.flush(timeout=5)
+        for start in range(0, len(ids), self.batch_size):
+            batch = ids[start:start + self.batch_size]
+            self.storage.delete_sessions(batch)
+            with self._cond:
+                self._deleting.difference_update(batch)
+                self.deleted += len(batch)
+        return len(ids)
+
+    def sweep(self, now=None):
+        """Archive and delete sessions idle for longer than the retention period"""
+        if self.retention_days <= 0:
+            return 0
+        cutoff = (now or datetime.now(timezone.utc)) - timedelta(days=self.retention_days)
+        removed = 0
+        while True:
+            sessions = self.storage.stale_sessions(cutoff, self.batch_size)
+            if not sessions:
+                break
+            ids = [s["session_id"] for s in sessions]
+            if self.archive_dir:
+                path = write_archive(sessions, self.storage.messages_for_sessions(ids), self.archive_dir)
+                self.archived += len(ids)
+                self.archives.append(path)
+                self.archive_files += 1
+            # A session that got a new message since it was selected is kept
+            removed += self.storage.delete_sessions(ids, inactive_before=cutoff)
+            if len(sessions) < self.batch_size:
+                break
+        self.expired += removed
+        self.last_sweep = datetime.now(timezone.utc)
+        if removed:
+            self.storage.compact()
+            print(f"Retention sweep removed {removed} sessions idle for over {self.retention_days:g} days")
+        return removed
+
+    def _run(self):
+        next_sweep = time.time()
+        while True:
+            with self._cond:
+                while not self._deleting and not self._closed:
+                    remaining = next_sweep - time.time()
+                    if self.retention_days > 0 and remaining <= 0:
+                        break
+                    self._cond.wait(remaining if self.retention_days > 0 else None)
+                closed = self._closed
+            try:
+                self.process_deletes()
+                if not closed and self.retention_days > 0 and time.time() >= next_sweep:
+                    next_sweep = time.time() + self.interval
+                    self.sweep()
+            except Exception as e:
+                self.failures += 1
+                self.last_error = str(e)
+                print(f"Warning: retention job failed, will retry: {e}")
+                if not closed:
+                    with self._cond:
+                        self._cond.wait(min(self.interval, 30))
+            if closed:
+                return
+
+    def close(self, timeout=10.0):
+        """Finish marked deletes and stop the worker"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
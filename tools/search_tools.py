@@ -1,30 +1,82 @@
 import os
+import requests
 from dotenv import load_dotenv
-from langchain_community.utilities.wikipedia import WikipediaAPIWrapper
-from langchain_community.tools.tavily_search import TavilySearchResults
+
+from tools.cached_search import SEARCH_TIMEOUT, CachedSearch, get_search_cache
 
 load_dotenv()
 
+# Calls allowed in flight per provider
+WIKIPEDIA_CONCURRENCY = int(os.getenv("WIKIPEDIA_CONCURRENCY", "4"))
+TAVILY_CONCURRENCY = int(os.getenv("TAVILY_CONCURRENCY", "2"))
+
+WIKIPEDIA_API_URL = "https://en.wikipedia.org/w/api.php"
+TAVILY_API_URL = "https://api.tavily.com/search"
+# Wikimedia asks API clients to identify themselves
+USER_AGENT = "CareMate/1.0 (medical assistant chatbot)"
+WIKIPEDIA_TOP_K = 2
+WIKIPEDIA_CHARS_MAX = 2000
+TAVILY_MAX_RESULTS = 3
+
 # Global instances
-_wiki_wrapper = None
-_tavily_search = None
-
-def get_wikipedia_wrapper():
-    global _wiki_wrapper
-    if _wiki_wrapper is None:
-        _wiki_wrapper = WikipediaAPIWrapper(
-            top_k_results=2,
-            doc_content_chars_max=2000,
-            load_all_available_meta=True
-        )
-    return _wiki_wrapper
-
-def get_tavily_search():
-    global _tavily_search
-    if _tavily_search is None:
+_wikipedia_search = None
+_tavily_cached_search = None
+
+def wikipedia_pages(query, timeout=SEARCH_TIMEOUT):
+    """Intro text of the top Wikipedia pages for `query`, as "Page: ...\\nSummary: ..." blocks.
+
+    Same output as langchain's WikipediaAPIWrapper.run, but every HTTP call
+    carries `timeout`, so a hung request gives its worker back.
+    """
+    headers = {"User-Agent": USER_AGENT}
+    found = requests.get(WIKIPEDIA_API_URL, headers=headers, timeout=timeout, params={
+        "action": "query", "list": "search", "srsearch": query[:300], "srlimit": WIKIPEDIA_TOP_K,
+        "format": "json",
+    })
+    found.raise_for_status()
+    titles = [hit["title"] for hit in found.json().get("query", {}).get("search", [])]
+    if not titles:
+        return ""
+    pages = requests.get(WIKIPEDIA_API_URL, headers=headers, timeout=timeout, params={
+        "action": "query", "prop": "extracts", "exintro": 1, "explaintext": 1, "redirects": 1,
+        "titles": "|".join(titles), "format": "json",
+    })
+    pages.raise_for_status()
+    extracts = {page.get("title"): page.get("extract", "")
+                for page in pages.json().get("query", {}).get("pages", {}).values()}
+    blocks = [f"Page: {title}\nSummary: {extracts[title]}" for title in titles if extracts.get(title)]
+    return "\n\n".join(blocks)[:WIKIPEDIA_CHARS_MAX]
+
+def tavily_results(api_key, timeout=SEARCH_TIMEOUT):
+    def run(query):
+        response = requests.post(TAVILY_API_URL, timeout=timeout,
+                                 headers={"Authorization": f"Bearer {api_key}"},
+                                 json={"query": query, "max_results": TAVILY_MAX_RESULTS})
+        # Errors raise instead of returning a message, so they are never cached
+        response.raise_for_status()
+        return [{"title": r.get("title", ""), "url": r.get("url", ""), "content": r.get("content", "")}
+                for r in response.json().get("results", [])]
+    return run
+
+def get_wikipedia_search():
+    """Cached, rate-limited Wikipedia search returning page text"""
+    global _wikipedia_search
+    if _wikipedia_search is None:
+        _wikipedia_search = CachedSearch("wikipedia", wikipedia_pages, get_search_cache(),
+                                         max_concurrency=WIKIPEDIA_CONCURRENCY)
+    return _wikipedia_search
+
+def get_tavily_cached_search():
+    """Cached, rate-limited Tavily search returning a list of result dicts"""
+    global _tavily_cached_search
+    if _tavily_cached_search is None:
         api_key = os.getenv("TAVILY_API_KEY")
         if not api_key:
             print("TAVILY_API_KEY not found")
             return None
-        _tavily_search = TavilySearchResults(api_key=api_key, max_results=3)
-    return _tavily_search
+        _tavily_cached_search = CachedSearch("tavily", tavily_results(api_key), get_search_cache(),
+                                             max_concurrency=TAVILY_CONCURRENCY)
+    return _tavily_cached_search
+
+def search_stats():
+    return {s.name: s.stats() for s in (_wikipedia_search, _tavily_cached_search) if s is not None}
@@ -0,0 +1,89 @@
+"""Bounded in-process cache of each session's most recent messages.
+
+The chat route needs the last few messages of a session as context on every
+turn. They are kept here in a per-session ring buffer that is filled from the
+database once, on a cache miss, and appended to on every write, so the hot
+path never re-reads them and chat keeps its context when there is no DB.
+"""
+
+import os
+import threading
+from collections import OrderedDict, deque
+
+# Messages kept per session
+SESSION_BUFFER_SIZE = int(os.getenv("SESSION_BUFFER_SIZE", "20"))
+# Sessions kept in memory; the least recently used are evicted beyond this
+SESSION_CACHE_MAX = int(os.getenv("SESSION_CACHE_MAX", "1000"))
+
+
+class RecentMessages:
+    def __init__(self, buffer_size=SESSION_BUFFER_SIZE, max_sessions=SESSION_CACHE_MAX):
+        self.buffer_size = buffer_size
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _store(self, session_id, messages):
+        buffer = deque(messages, maxlen=self.buffer_size)
+        self._sessions[session_id] = buffer
+        self._sessions.move_to_end(session_id)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+        return buffer
+
+    def get(self, session_id, limit=None, loader=None):
+        """Last `limit` messages of a session, oldest first.
+
+        On a miss, `loader()` is called once (outside the lock) to fetch the
+        session's recent messages from storage; without a loader the session
+        starts empty.
+        """
+        with self._lock:
+            buffer = self._sessions.get(session_id)
+            if buffer is not None:
+                self.hits += 1
+                self._sessions.move_to_end(session_id)
+                messages = list(buffer)
+                return messages[-limit:] if limit else messages
+
+        self.misses += 1
+        loaded = list(loader() if loader else [])[-self.buffer_size:]
+        with self._lock:
+            # Another request may have filled it meanwhile; its copy is at least as new
+            buffer = self._sessions.get(session_id)
+            if buffer is None:
+                buffer = self._store(session_id, loaded)
+            messages = list(buffer)
+        return messages[-limit:] if limit else messages
+
+    def append(self, session_id, message):
+        """Record a new message if the session is cached (otherwise the next miss loads it)"""
+        with self._lock:
+            buffer = self._sessions.get(session_id)
+            if buffer is not None:
+                buffer.append(message)
+
+    def start(self, session_id, messages=()):
+        """Cache a session whose full recent history is known (e.g. a new one)"""
+        with self._lock:
+            self._store(session_id, messages)
+
+    def drop(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def stats(self):
+        with self._lock:
+            return {"sessions": len(self._sessions), "hits": self.hits, "misses": self.misses}
+
+
+_recent_messages = None
+
+
+def get_recent_messages_cache():
+    global _recent_messages
+    if _recent_messages is None:
+        _recent_messages = RecentMessages()
+    return _recent_messages
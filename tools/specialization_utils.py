@@ -1,25 +1,183 @@
-"""Utilities to canonicalize medical specializations.
+"""Specialization taxonomy: canonical names, aliases and symptom keywords.
 
-Keep a single source of truth for mapping common typos/variants to canonical names.
+Single source of truth for mapping typos/variants to canonical names. Every
+specialization has a display name (stored in `doctorProfile.specialization`)
+and a key (used for matching symptoms to specializations). Exact aliases are
+looked up directly; anything else goes through a trigram index over all
+aliases and is accepted when its edit distance to the best candidate is
+small, so typos like "cardiolgist" still canonicalize.
 """
 
-CANONICAL_MAP = {
-    # lowercase source -> canonical Titlecase
-    "pediadrist": "Pediatrician",
-    "pediatrist": "Pediatrician",
-    "pediatrician": "Pediatrician",
-    "cardiologist": "Cardiologist",
-    "cardiology": "Cardiologist",
-    "ent": "ENT",
-    "ear nose throat": "ENT",
-    "neurology": "Neurology",
-    "neuro": "Neurology",
-    "dermatologist": "Dermatologist",
-    "derm": "Dermatologist",
-    "orthopedist": "Orthopedist",
-    "orthopedic": "Orthopedist",
+import re
+from functools import lru_cache
+
+# key -> (canonical display name, aliases)
+SPECIALIZATIONS = {
+    "cardiologist": ("Cardiologist", ["cardiology", "cardiac", "heart specialist"]),
+    "pulmonologist": ("Pulmonologist", ["pulmonology", "chest physician", "respiratory medicine"]),
+    "dermatologist": ("Dermatologist", ["dermatology", "derm", "skin specialist"]),
+    "ent": ("ENT", ["ear nose throat", "otolaryngologist", "otolaryngology", "otorhinolaryngologist"]),
+    "neurologist": ("Neurologist", ["neurology", "neuro"]),
+    "pediatrician": ("Pediatrician", ["pediatrics", "paediatrician", "paediatrics", "pediatrist", "pediadrist",
+                                      "child specialist"]),
+    "orthopedist": ("Orthopedist", ["orthopedic", "orthopaedic", "orthopedics", "orthopaedics",
+                                    "orthopedic surgeon"]),
+    "gastroenterologist": ("Gastroenterologist", ["gastroenterology", "gastro"]),
+    "endocrinologist": ("Endocrinologist", ["endocrinology"]),
+    "psychiatrist": ("Psychiatrist", ["psychiatry"]),
+    "ophthalmologist": ("Ophthalmologist", ["ophthalmology", "eye specialist"]),
+    "urologist": ("Urologist", ["urology"]),
+    "nephrologist": ("Nephrologist", ["nephrology"]),
+    "obgyn": ("OB/GYN", ["ob gyn", "obstetrics and gynecology", "obstetrics and gynaecology", "gynecologist",
+                         "gynaecologist", "gynecology", "obstetrician"]),
+    "oncologist": ("Oncologist", ["oncology"]),
+    "infectious_disease": ("Infectious Disease Specialist", ["infectious disease", "infectious diseases"]),
+    "rheumatologist": ("Rheumatologist", ["rheumatology"]),
+    "allergist": ("Allergist", ["allergy", "immunologist", "allergy and immunology"]),
+    "physiotherapist": ("Physiotherapist", ["physiotherapy", "physio", "physical therapist"]),
+    "dentist": ("Dentist", ["dental surgeon", "dentistry"]),
+    "derm_cosmetic": ("Cosmetic Dermatologist", ["cosmetic dermatology", "aesthetic dermatology"]),
+    "general_physician": ("General Physician", ["general practitioner", "gp", "family medicine",
+                                                "internal medicine"]),
+}
+
+# Symptom -> specialization keywords mapping (keys as in SPECIALIZATIONS). This
+# list is intentionally broad and should be tuned to your region and dataset.
+SYMPTOM_KEYWORDS = {
+    "cardiologist": [
+        "chest pain", "shortness of breath", "palpitations", "heart attack", "angina", "tachycardia",
+        "high blood pressure", "hypertension", "palpitat"
+    ],
+    "pulmonologist": [
+        "cough", "shortness of breath", "wheeze", "wheezing", "bronchitis", "asthma", "tb", "tuberculosis",
+        "chronic obstructive", "copd", "pneumonia"
+    ],
+    "dermatologist": [
+        "rash", "itch", "itching", "redness", "eczema", "psoriasis", "skin", "acne", "blister", "hives"
+    ],
+    "ent": [
+        "ear", "hearing", "hearing loss", "ear pain", "tinnitus", "hoarseness", "sinus", "nasal", "throat",
+        "tonsillitis", "sinusitis"
+    ],
+    "neurologist": [
+        "headache", "seizure", "fits", "numbness", "weakness", "dizziness", "migraine", "stroke", "tremor"
+    ],
+    "pediatrician": [
+        "child", "kid", "baby", "fever in child", "pediatric", "infant", "newborn", "vaccination", "growth"
+    ],
+    "orthopedist": [
+        "joint pain", "back pain", "fracture", "sprain", "arthritis", "bone", "hip pain", "knee pain", "shoulder"
+    ],
+    "gastroenterologist": [
+        "abdominal pain", "diarrhea", "constipation", "vomiting", "nausea", "acid reflux", "heartburn", "ulcer"
+    ],
+    "endocrinologist": [
+        "diabetes", "thyroid", "weight gain", "weight loss", "hormone", "hypothyroid", "hyperthyroid"
+    ],
+    "psychiatrist": [
+        "depression", "anxiety", "insomnia", "mood", "psychosis", "therapy", "suicidal"
+    ],
+    "ophthalmologist": [
+        "eye", "vision", "blurry vision", "red eye", "cataract", "glaucoma", "ocular"
+    ],
+    "urologist": [
+        "urine", "urinary", "blood in urine", "dysuria", "kidney stone", "prostate", "frequency", "incontinence"
+    ],
+    "nephrologist": [
+        "kidney", "renal", "creatinine", "dialysis", "nephrotic", "proteinuria"
+    ],
+    "obgyn": [
+        "pregnancy", "period", "menstruation", "vaginal", "pelvic pain", "contraception", "gynecology", "obstetrics"
+    ],
+    "oncologist": [
+        "cancer", "chemotherapy", "tumor", "malignancy", "oncology", "mass"
+    ],
+    "infectious_disease": [
+        "fever", "infection", "sepsis", "antibiotic", "hiv", "tb", "covid", "viral"
+    ],
+    "rheumatologist": [
+        "joint pain", "autoimmune", "rheumatoid", "lupus", "scleroderma", "vasculitis"
+    ],
+    "allergist": [
+        "allergy", "allergic", "anaphylaxis", "hay fever", "rhinitis"
+    ],
+    "physiotherapist": [
+        "rehab", "physiotherapy", "mobility", "exercise therapy", "post-op rehab"
+    ],
+    "dentist": [
+        "toothache", "dental", "cavity", "gum", "oral", "tooth"
+    ],
+    "derm_cosmetic": [
+        "laser", "cosmetic", "fillers", "botox", "aesthetic"
+    ],
 }
 
+# Queries shorter than this are only matched exactly ("ent" must not become "dentist")
+MIN_FUZZY_LENGTH = 4
+
+
+def _normalize(text):
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", text.lower()).split())
+
+
+def _trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _edit_distance(a, b):
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, start=1):
+        current = [i]
+        for j, cb in enumerate(b, start=1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+# Precomputed lookup tables: normalized alias -> key, and trigram -> aliases containing it
+ALIASES = {}
+for _key, (_name, _aliases) in SPECIALIZATIONS.items():
+    for _alias in [_key.replace("_", " "), _name, *_aliases]:
+        ALIASES[_normalize(_alias)] = _key
+TRIGRAMS = {}
+for _alias in ALIASES:
+    for _gram in _trigrams(_alias):
+        TRIGRAMS.setdefault(_gram, set()).add(_alias)
+
+
+@lru_cache(maxsize=4096)
+def _match(normalized):
+    """Specialization key for normalized text, or None"""
+    if normalized in ALIASES:
+        return ALIASES[normalized]
+    if len(normalized) < MIN_FUZZY_LENGTH:
+        return None
+    grams = _trigrams(normalized)
+    shared = {}
+    for gram in grams:
+        for alias in TRIGRAMS.get(gram, ()):
+            shared[alias] = shared.get(alias, 0) + 1
+    # Only the few aliases sharing the most trigrams get the (quadratic) edit distance check
+    candidates = sorted(shared, key=lambda alias: -2 * shared[alias] / (len(grams) + len(_trigrams(alias))))[:5]
+    best = None
+    for alias in candidates:
+        # Typos rarely hit the first letter; requiring it avoids e.g. "xyz specialist" -> "eye specialist"
+        if alias[0] != normalized[0]:
+            continue
+        distance = _edit_distance(normalized, alias)
+        if distance <= max(1, len(alias) // 5) and (best is None or distance < best[0]):
+            best = (distance, alias)
+    return ALIASES[best[1]] if best else None
+
+
+def specialization_key(spec: str) -> str:
+    """Taxonomy key for a raw specialization; unknown ones return their normalized text."""
+    if not spec:
+        return ""
+    normalized = _normalize(spec)
+    return _match(normalized) or normalized
+
 
 def canonicalize_spec(spec: str) -> str:
     """Return the canonical specialization for a given raw spec string.
@@ -29,8 +187,14 @@ def canonicalize_spec(spec: str) -> str:
     """
     if not spec:
         return ""
-    s = spec.strip().lower()
-    return CANONICAL_MAP.get(s, spec.strip())
+    key = _match(_normalize(spec))
+    return SPECIALIZATIONS[key][0] if key else spec.strip()
+
+
+def implied_specializations(text: str) -> set:
+    """Keys of the specializations whose symptom keywords occur in the text"""
+    text_lc = (text or "").lower()
+    return {key for key, words in SYMPTOM_KEYWORDS.items() if any(w in text_lc for w in words)}
 
 
 def normalize_profile(profile: dict) -> dict:
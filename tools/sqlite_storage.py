@@ -0,0 +1,417 @@
+"""Embedded SQLite implementation of the chat storage interface.
+
+Reuses the `sessions`/`messages` schema of chat_db/medigenius_chats.db and
+extends it in place: sessions gain `preview` and `message_count`, messages a
+unique `message_id` (existing rows get one derived from their rowid), and a
+`doctors` table is added. The database runs in WAL mode so the request
+threads can read while the message writer commits, and every statement is a
+constant parameterized string, so sqlite3's statement cache keeps them
+prepared per connection.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+from tools.storage import DOCTOR_LIST_FIELDS, ChatStorage, make_preview
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS sessions (
+        session_id TEXT PRIMARY KEY,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        last_active TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )""",
+    """CREATE TABLE IF NOT EXISTS messages (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        session_id TEXT NOT NULL,
+        role TEXT NOT NULL,
+        content TEXT NOT NULL,
+        source TEXT,
+        timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (session_id) REFERENCES sessions (session_id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS doctors (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        email TEXT UNIQUE,
+        name TEXT,
+        role TEXT NOT NULL DEFAULT 'doctor',
+        profile TEXT,
+        bio TEXT,
+        embedding TEXT
+    )""",
+]
+# Columns added to the original schema: (table, column, type)
+ADDED_COLUMNS = [
+    ("sessions", "preview", "TEXT"),
+    ("sessions", "message_count", "INTEGER"),
+    ("messages", "message_id", "TEXT"),
+]
+INDEXES = [
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_messages_message_id ON messages (message_id)",
+    "CREATE INDEX IF NOT EXISTS idx_messages_session_ts ON messages (session_id, timestamp)",
+    "CREATE INDEX IF NOT EXISTS idx_sessions_last_active ON sessions (last_active)",
+]
+
+INSERT_MESSAGE = """INSERT OR IGNORE INTO messages (message_id, session_id, role, content, source, timestamp)
+                    VALUES (?, ?, ?, ?, ?, ?)"""
+UPSERT_SESSION = """INSERT INTO sessions (session_id, created_at, last_active, message_count, preview)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT (session_id) DO UPDATE SET
+                        last_active = max(coalesce(sessions.last_active, ''), excluded.last_active),
+                        message_count = coalesce(sessions.message_count, 0) + excluded.message_count,
+                        preview = coalesce(sessions.preview, excluded.preview)"""
+# A batch of session ids bound as one JSON array parameter, so the statement text stays constant
+SESSION_ID_LIST = "(SELECT value FROM json_each(?))"
+MESSAGE_COLUMNS = "message_id, role, content, source, timestamp"
+SESSION_COLUMNS = "session_id, created_at, last_active, preview, message_count"
+DOCTOR_COLUMNS = {"name": "name", "email": "email", "role": "role", "doctorProfile": "profile", "bio": "bio",
+                  "embedding": "embedding"}
+DOCTOR_FIELDS = {column: field for field, column in DOCTOR_COLUMNS.items()}
+JSON_COLUMNS = {"profile", "embedding"}
+HAS_EMBEDDING = "coalesce(json_array_length(embedding), 0) > 0 AS has_embedding"
+
+
+def to_db_time(value):
+    """UTC text timestamp with millisecond precision; sorts correctly as text"""
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+
+
+def from_db_time(value):
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _message(row):
+    return {
+        "id": row["message_id"],
+        "role": row["role"],
+        "content": row["content"],
+        "source": row["source"],
+        "timestamp": from_db_time(row["timestamp"]),
+    }
+
+
+def _session(row):
+    return {
+        "session_id": row["session_id"],
+        "created_at": from_db_time(row["created_at"]),
+        "last_active": from_db_time(row["last_active"]),
+        "preview": row["preview"],
+        "message_count": row["message_count"],
+    }
+
+
+def _doctor(row):
+    return {
+        "_id": row["id"],
+        "name": row["name"],
+        "email": row["email"],
+        "role": row["role"],
+        "doctorProfile": json.loads(row["profile"]) if row["profile"] else {},
+        "bio": row["bio"],
+        "embedding": json.loads(row["embedding"]) if row["embedding"] else None,
+    }
+
+
+def _projected_doctor(row):
+    doc = {"_id": row["id"]}
+    for column in row.keys():
+        value = row[column]
+        if column == "id":
+            continue
+        if column == "has_embedding":
+            doc[column] = bool(value)
+            continue
+        if column in JSON_COLUMNS:
+            value = json.loads(value) if value else ({} if column == "profile" else None)
+        doc[DOCTOR_FIELDS[column]] = value
+    return doc
+
+
+def _doctor_values(fields):
+    columns, values = [], []
+    for key, value in fields.items():
+        column = DOCTOR_COLUMNS.get(key)
+        if column is None:
+            raise ValueError(f"unsupported doctor field '{key}'")
+        columns.append(column)
+        values.append(json.dumps(value) if column in JSON_COLUMNS and value is not None else value)
+    return columns, values
+
+
+def _doctor_conditions(expected):
+    """WHERE terms requiring each field (or "doctorProfile.<key>") to still hold its value"""
+    conditions, values = [], []
+    for key, value in expected.items():
+        if key.startswith("doctorProfile."):
+            conditions.append("json_extract(profile, ?) IS ?")
+            values += [f"$.{key.split('.', 1)[1]}", value]
+        else:
+            columns, column_values = _doctor_values({key: value})
+            conditions.append(f"{columns[0]} IS ?")
+            values += column_values
+    return conditions, values
+
+
+class SQLiteStorage(ChatStorage):
+    name = "sqlite"
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    def _conn(self):
+        """One connection per thread (sqlite3 connections are not shared across threads)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # check_same_thread=False only so close() can close every thread's connection
+            conn = sqlite3.connect(self.path, timeout=30, cached_statements=256, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def ensure_schema(self):
+        conn = self._conn()
+        with conn:
+            for statement in SCHEMA:
+                conn.execute(statement)
+            for table, column, kind in ADDED_COLUMNS:
+                existing = {row["name"] for row in conn.execute(f"PRAGMA table_info({table})")}
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {kind}")
+            # Rows written before message ids existed get a stable 24-hex id from their rowid
+            conn.execute("UPDATE messages SET message_id = printf('%024x', id) WHERE message_id IS NULL")
+            for statement in INDEXES:
+                conn.execute(statement)
+        self._backfill_session_fields()
+
+    def _backfill_session_fields(self):
+        conn = self._conn()
+        rows = conn.execute(
+            """SELECT s.session_id,
+                      (SELECT COUNT(*) FROM messages m WHERE m.session_id = s.session_id) AS count,
+                      (SELECT content FROM messages m WHERE m.session_id = s.session_id AND m.role = 'user'
+                       ORDER BY m.timestamp, m.id LIMIT 1) AS first_user
+               FROM sessions s WHERE s.message_count IS NULL"""
+        ).fetchall()
+        if not rows:
+            return
+        with conn:
+            conn.executemany(
+                "UPDATE sessions SET message_count = ?, preview = coalesce(preview, ?) WHERE session_id = ?",
+                [(row["count"], make_preview(row["first_user"]) if row["first_user"] else None, row["session_id"])
+                 for row in rows]
+            )
+        print(f"Backfilled preview/message_count on {len(rows)} sessions")
+
+    def insert_messages(self, messages):
+        conn = self._conn()
+        with conn:
+            conn.executemany(INSERT_MESSAGE, [
+                (str(m["_id"]), m["session_id"], m["role"], m["content"], m.get("source"), to_db_time(m["timestamp"]))
+                for m in messages
+            ])
+
+    def update_sessions(self, updates):
+        conn = self._conn()
+        with conn:
+            conn.executemany(UPSERT_SESSION, [
+                (session_id, to_db_time(entry["first"]), to_db_time(entry["last"]), entry["count"], entry["preview"])
+                for session_id, entry in updates.items()
+            ])
+
+    def find_messages(self, session_id, after=None, limit=None):
+        conn = self._conn()
+        if after is not None:
+            rows = conn.execute(
+                f"SELECT {MESSAGE_COLUMNS} FROM messages WHERE session_id = ? AND timestamp > ? "
+                "ORDER BY timestamp, id LIMIT ?",
+                (session_id, to_db_time(after), limit or -1)
+            ).fetchall()
+        elif limit:
+            rows = conn.execute(
+                f"SELECT {MESSAGE_COLUMNS} FROM messages WHERE session_id = ? ORDER BY timestamp DESC, id DESC LIMIT ?",
+                (session_id, limit)
+            ).fetchall()
+            rows.reverse()
+        else:
+            rows = conn.execute(
+                f"SELECT {MESSAGE_COLUMNS} FROM messages WHERE session_id = ? ORDER BY timestamp, id",
+                (session_id,)
+            ).fetchall()
+        return [_message(row) for row in rows]
+
+    def message_timestamp(self, session_id, message_id):
+        row = self._conn().execute(
+            "SELECT timestamp FROM messages WHERE message_id = ? AND session_id = ?", (message_id, session_id)
+        ).fetchone()
+        return from_db_time(row["timestamp"]) if row else None
+
+    def list_sessions(self, before=None, limit=50, exclude=()):
+        conn = self._conn()
+        excluded = json.dumps(list(exclude))
+        if before is not None:
+            rows = conn.execute(
+                f"SELECT {SESSION_COLUMNS} FROM sessions WHERE last_active < ? "
+                f"AND session_id NOT IN {SESSION_ID_LIST} ORDER BY last_active DESC LIMIT ?",
+                (to_db_time(before), excluded, limit)
+            ).fetchall()
+        else:
+            rows = conn.execute(
+                f"SELECT {SESSION_COLUMNS} FROM sessions WHERE session_id NOT IN {SESSION_ID_LIST} "
+                "ORDER BY last_active DESC LIMIT ?", (excluded, limit)
+            ).fetchall()
+        return [_session(row) for row in rows]
+
+    def session_last_active(self, session_id):
+        row = self._conn().execute("SELECT last_active FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        return from_db_time(row["last_active"]) if row else None
+
+    def stale_sessions(self, before, limit=None):
+        rows = self._conn().execute(
+            f"SELECT {SESSION_COLUMNS} FROM sessions WHERE last_active < ? ORDER BY last_active LIMIT ?",
+            (to_db_time(before), limit or -1)
+        ).fetchall()
+        return [_session(row) for row in rows]
+
+    def messages_for_sessions(self, session_ids):
+        grouped = {session_id: [] for session_id in session_ids}
+        rows = self._conn().execute(
+            f"SELECT session_id, {MESSAGE_COLUMNS} FROM messages WHERE session_id IN {SESSION_ID_LIST} "
+            "ORDER BY session_id, timestamp, id",
+            (json.dumps(list(session_ids)),)
+        ).fetchall()
+        for row in rows:
+            grouped[row["session_id"]].append(_message(row))
+        return grouped
+
+    def delete_sessions(self, session_ids, inactive_before=None):
+        ids = json.dumps(list(session_ids))
+        conn = self._conn()
+        with conn:
+            if inactive_before is None:
+                conn.execute(f"DELETE FROM messages WHERE session_id IN {SESSION_ID_LIST}", (ids,))
+                return conn.execute(f"DELETE FROM sessions WHERE session_id IN {SESSION_ID_LIST}", (ids,)).rowcount
+            cutoff = to_db_time(inactive_before)
+            conn.execute(f"DELETE FROM messages WHERE session_id IN {SESSION_ID_LIST} AND timestamp < ?",
+                         (ids, cutoff))
+            return conn.execute(f"DELETE FROM sessions WHERE session_id IN {SESSION_ID_LIST} AND last_active < ?",
+                                (ids, cutoff)).rowcount
+
+    def compact(self):
+        conn = self._conn()
+        # Fold the WAL back into the main file and truncate it, then refresh planner statistics
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        conn.execute("PRAGMA optimize")
+
+    def list_doctors(self):
+        rows = self._conn().execute("SELECT * FROM doctors WHERE role = 'doctor'").fetchall()
+        return [_doctor(row) for row in rows]
+
+    def update_doctor(self, doctor_id, fields):
+        columns, values = _doctor_values(fields)
+        if not columns:
+            return
+        conn = self._conn()
+        with conn:
+            conn.execute(f"UPDATE doctors SET {', '.join(f'{c} = ?' for c in columns)} WHERE id = ?",
+                         values + [doctor_id])
+
+    def _upsert_doctor(self, conn, email, fields):
+        columns, values = _doctor_values({**fields, "email": email})
+        updates = ", ".join(f"{c} = excluded.{c}" for c in columns if c != "email")
+        conn.execute(
+            f"INSERT INTO doctors ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)}) "
+            f"ON CONFLICT (email) DO {'UPDATE SET ' + updates if updates else 'NOTHING'}",
+            values
+        )
+
+    def upsert_doctor(self, email, fields):
+        conn = self._conn()
+        with conn:
+            self._upsert_doctor(conn, email, fields)
+        return conn.execute("SELECT id FROM doctors WHERE email = ?", (email,)).fetchone()["id"]
+
+    def iter_doctors(self, fields=DOCTOR_LIST_FIELDS, missing_embedding=False, batch_size=1000):
+        columns = ["id"]
+        for field in fields:
+            if field == "has_embedding":
+                column = HAS_EMBEDDING
+            else:
+                # "doctorProfile.<key>" loads the profile column (a small JSON document)
+                column = DOCTOR_COLUMNS.get(field.split(".")[0])
+                if column is None:
+                    raise ValueError(f"unsupported doctor field '{field}'")
+            if column not in columns:
+                columns.append(column)
+        where = "role = 'doctor'"
+        if missing_embedding:
+            where += " AND coalesce(json_array_length(embedding), 0) = 0"
+        cursor = self._conn().execute(f"SELECT {', '.join(columns)} FROM doctors WHERE {where} ORDER BY id")
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            for row in rows:
+                yield _projected_doctor(row)
+
+    def bulk_update_doctors(self, updates):
+        conn = self._conn()
+        modified = 0
+        with conn:
+            for doctor_id, fields, *expected in updates:
+                profile_paths = {k.split(".", 1)[1]: v for k, v in fields.items() if k.startswith("doctorProfile.")}
+                columns, values = _doctor_values({k: v for k, v in fields.items()
+                                                  if not k.startswith("doctorProfile.")})
+                assignments = [f"{c} = ?" for c in columns]
+                if profile_paths:
+                    pairs = ", ".join("?, json(?)" for _ in profile_paths)
+                    assignments.append(f"profile = json_set(coalesce(profile, '{{}}'), {pairs})")
+                    for key, value in profile_paths.items():
+                        values += [f"$.{key}", json.dumps(value)]
+                if not assignments:
+                    continue
+                conditions, condition_values = _doctor_conditions(expected[0] if expected else {})
+                modified += conn.execute(
+                    f"UPDATE doctors SET {', '.join(assignments)} WHERE {' AND '.join(['id = ?'] + conditions)}",
+                    values + [doctor_id] + condition_values
+                ).rowcount
+        return modified
+
+    def bulk_upsert_doctors(self, doctors):
+        conn = self._conn()
+        existing = {row["email"] for row in conn.execute(
+            "SELECT email FROM doctors WHERE email IN (SELECT value FROM json_each(?))",
+            (json.dumps([email for email, _ in doctors]),)
+        )}
+        results = []
+        # One transaction for the whole batch; a bad row only fails itself
+        with conn:
+            for email, fields in doctors:
+                try:
+                    self._upsert_doctor(conn, email, fields)
+                except (sqlite3.Error, ValueError, TypeError) as e:
+                    results.append((None, str(e)))
+                    continue
+                results.append(("updated" if email in existing else "inserted", None))
+                existing.add(email)
+        return results
+
+    def close(self):
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
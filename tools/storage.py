@@ -0,0 +1,152 @@
+"""Persistence interface for chat sessions, messages and doctors.
+
+Backends:
+    "mongo"   MongoDB / Atlas (tools/mongo_storage.py)
+    "sqlite"  embedded SQLite in WAL mode (tools/sqlite_storage.py), for
+              single-node deployments, tests and offline benchmarks
+
+STORAGE_BACKEND selects one explicitly; when unset, Mongo is used if
+MONGO_URI is set and the app runs without persistence otherwise.
+
+Messages are dicts with `id` (str), `role`, `content`, `source` and a
+timezone-aware UTC `timestamp`. Doctors are dicts shaped like the Mongo
+`users` documents (`_id`, `name`, `email`, `role`, `doctorProfile`, `bio`,
+`embedding`).
+"""
+
+import os
+
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "").lower()
+SQLITE_PATH = os.getenv("SQLITE_PATH", "./chat_db/medigenius_chats.db")
+# Characters of the first user message shown in the session list
+PREVIEW_LENGTH = 50
+# Doctor fields admin listings load by default (no embeddings)
+DOCTOR_LIST_FIELDS = ("name", "email", "doctorProfile", "bio", "has_embedding")
+
+
+def make_preview(content, length=PREVIEW_LENGTH):
+    return content[:length] + "..." if len(content) > length else content
+
+
+class ChatStorage:
+    name = "base"
+
+    def ensure_schema(self):
+        """Create indexes/tables and backfill denormalized session fields"""
+
+    # ----- messages and sessions -----
+
+    def insert_messages(self, messages):
+        """Insert queued message dicts (with `_id` and `session_id`); ids already stored are skipped"""
+        raise NotImplementedError
+
+    def update_sessions(self, updates):
+        """Upsert sessions from {session_id: {"first", "last", "count", "preview"}}.
+
+        `last_active` only moves forward, `message_count` is incremented and
+        `preview` is only set while the session has none.
+        """
+        raise NotImplementedError
+
+    def find_messages(self, session_id, after=None, limit=None):
+        """Messages oldest first; newer than `after` (a timestamp) when given.
+
+        With `after`, at most the first `limit` newer messages; without it,
+        the last `limit` messages.
+        """
+        raise NotImplementedError
+
+    def message_timestamp(self, session_id, message_id):
+        """Timestamp of a stored message of the session, or None"""
+        raise NotImplementedError
+
+    def list_sessions(self, before=None, limit=50, exclude=()):
+        """Sessions most recently active first, with `last_active` older than `before`.
+
+        Sessions in `exclude` are filtered out by the query itself, so a page
+        still holds `limit` sessions when older ones exist.
+        """
+        raise NotImplementedError
+
+    def session_last_active(self, session_id):
+        raise NotImplementedError
+
+    def delete_session(self, session_id):
+        self.delete_sessions([session_id])
+
+    # ----- retention -----
+
+    def stale_sessions(self, before, limit=None):
+        """Sessions with `last_active` older than `before`, least recently active first (all when no limit)"""
+        raise NotImplementedError
+
+    def messages_for_sessions(self, session_ids):
+        """{session_id: [messages oldest first]} for a batch of sessions"""
+        raise NotImplementedError
+
+    def delete_sessions(self, session_ids, inactive_before=None):
+        """Delete a batch of sessions and all their messages; returns the number of sessions deleted.
+
+        With `inactive_before`, only sessions still idle since before then are
+        deleted, and only messages older than it, so a turn that arrives
+        during a sweep is never lost.
+        """
+        raise NotImplementedError
+
+    def compact(self):
+        """Give space freed by deletes back to the backend (best effort)"""
+
+    # ----- doctors -----
+
+    def list_doctors(self):
+        raise NotImplementedError
+
+    def update_doctor(self, doctor_id, fields):
+        """Set top-level fields on a doctor"""
+        raise NotImplementedError
+
+    def upsert_doctor(self, email, fields):
+        """Create or update the doctor with this email; returns its id"""
+        raise NotImplementedError
+
+    def iter_doctors(self, fields=DOCTOR_LIST_FIELDS, missing_embedding=False, batch_size=1000):
+        """Stream doctors (with `_id`) loading only `fields`.
+
+        Fields are top-level names, "doctorProfile.<key>", or "has_embedding"
+        (a flag computed by the backend, so embeddings are not transferred).
+        """
+        raise NotImplementedError
+
+    def bulk_update_doctors(self, updates):
+        """Apply a batch of (doctor_id, fields[, expected]); "doctorProfile.<key>" sets one profile field.
+
+        `expected` maps fields (same paths) to the values they must still
+        have; a doctor changed since it was read is left alone. Returns the
+        number of doctors modified.
+        """
+        raise NotImplementedError
+
+    def bulk_upsert_doctors(self, doctors):
+        """Upsert a batch of (email, fields); returns one (status, error) per entry.
+
+        Status is "inserted" or "updated", or None with an error message when
+        that entry failed; the other entries are still written.
+        """
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+def open_storage(backend=None):
+    """Connect the configured backend, or return None when persistence is off"""
+    backend = backend or STORAGE_BACKEND or ("mongo" if os.getenv("MONGO_URI") else "")
+    if backend == "mongo":
+        from tools.mongo_storage import MongoStorage
+        return MongoStorage(os.getenv("MONGO_URI"))
+    if backend == "sqlite":
+        from tools.sqlite_storage import SQLiteStorage
+        return SQLiteStorage(SQLITE_PATH)
+    if backend:
+        raise ValueError(f"unknown STORAGE_BACKEND '{backend}', expected 'mongo' or 'sqlite'")
+    return None
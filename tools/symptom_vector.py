@@ -0,0 +1,123 @@
+"""Per-session running symptom vector for doctor recommendations.
+
+Instead of re-encoding the last few messages on every turn, each session
+keeps a decayed weighted mean of its user-message embeddings:
+
+    v <- decay * v + e_new,   w <- decay * w + 1,   vector = v / w
+
+so a turn costs exactly one embedding. The doctor recommendations computed
+for a vector are cached with it and reused until the vector moves more than
+RECOMMENDATION_SHIFT (cosine distance) away, or the filters or the doctor
+index change.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from tools.session_cache import SESSION_CACHE_MAX
+
+# Weight kept by older messages at each new turn (0 = only the latest message counts)
+SYMPTOM_DECAY = float(os.getenv("SYMPTOM_DECAY", "0.7"))
+# Cosine distance the vector may drift before cached recommendations are recomputed
+RECOMMENDATION_SHIFT = float(os.getenv("RECOMMENDATION_SHIFT", "0.05"))
+
+
+def _unit(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class _SessionState:
+    __slots__ = ("total", "weight", "messages", "cached_vector", "cached_key", "cached_results")
+
+    def __init__(self):
+        self.total = None
+        self.weight = 0.0
+        self.messages = 0
+        self.cached_vector = None
+        self.cached_key = None
+        self.cached_results = None
+
+
+class SymptomVectors:
+    def __init__(self, decay=SYMPTOM_DECAY, shift=RECOMMENDATION_SHIFT, max_sessions=SESSION_CACHE_MAX):
+        self.decay = decay
+        self.shift = shift
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, session_id):
+        with self._lock:
+            return session_id in self._sessions
+
+    def _state(self, session_id):
+        state = self._sessions.get(session_id)
+        if state is None:
+            state = self._sessions[session_id] = _SessionState()
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        self._sessions.move_to_end(session_id)
+        return state
+
+    def add(self, session_id, *embeddings):
+        """Fold message embeddings (oldest first) into the session vector; returns the unit vector"""
+        with self._lock:
+            state = self._state(session_id)
+            for embedding in embeddings:
+                e = _unit(embedding)
+                state.total = e if state.total is None else self.decay * state.total + e
+                state.weight = self.decay * state.weight + 1.0
+                state.messages += 1
+            if state.total is None:
+                return None
+            return _unit(state.total / state.weight)
+
+    def vector(self, session_id):
+        with self._lock:
+            state = self._sessions.get(session_id)
+            if state is None or state.total is None:
+                return None
+            return _unit(state.total / state.weight)
+
+    def cached(self, session_id, vector, key=None):
+        """Recommendations cached for this session if `vector` has not shifted past the threshold"""
+        with self._lock:
+            state = self._sessions.get(session_id)
+            if (state is not None and state.cached_vector is not None and state.cached_key == key
+                    and 1.0 - float(np.dot(state.cached_vector, vector)) <= self.shift):
+                self.hits += 1
+                return state.cached_results
+            self.misses += 1
+            return None
+
+    def store(self, session_id, vector, results, key=None):
+        with self._lock:
+            state = self._state(session_id)
+            state.cached_vector = _unit(vector)
+            state.cached_key = key
+            state.cached_results = results
+
+    def drop(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def stats(self):
+        with self._lock:
+            return {"sessions": len(self._sessions), "hits": self.hits, "misses": self.misses}
+
+
+_symptom_vectors = None
+
+
+def get_symptom_vectors():
+    global _symptom_vectors
+    if _symptom_vectors is None:
+        _symptom_vectors = SymptomVectors()
+    return _symptom_vectors
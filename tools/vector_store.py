@@ -1,10 +1,39 @@
+import hashlib
 import os
+import time
+from functools import lru_cache
+
+import numpy as np
 from langchain_huggingface.embeddings import HuggingFaceEmbeddings
 from langchain_community.vectorstores import Chroma
+from langchain_core.documents import Document
+from tools.bm25_index import BM25Index, build_index, index_path
+from tools.dedup import NearDuplicateFilter
+from tools.flat_index import FlatIndex, FlatRetriever, export_from_collection, flat_dir, flat_index_exists
+from tools.manifest import load_manifest, new_manifest, save_manifest
+from tools.ranking import mmr_select
+
+# Chunks embedded and written per batch during ingestion
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "256"))
+# Drop near-duplicate chunks (repeated boilerplate) before embedding
+INGEST_DEDUP = os.getenv("INGEST_DEDUP", "true").lower() in ("1", "true", "yes")
+
+DEFAULT_PERSIST_DIR = './medical_db/'
+# "chroma" (HNSW) or "flat" (exact search over a memory-mapped matrix)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma").lower()
 
-# Global instances
+# HNSW graph parameters (unset = Chroma defaults). M and construction_ef are
+# fixed when a collection is created; search_ef can be changed later.
+HNSW_PARAMS = ("M", "construction_ef", "search_ef")
+DEFAULT_HNSW = {name: int(os.environ[f"HNSW_{name.upper()}"])
+                for name in HNSW_PARAMS if os.getenv(f"HNSW_{name.upper()}")}
+
+# Global instances (stores and lexical indexes are cached per persist directory)
 _embeddings = None
-_vectorstore = None
+_vectorstores = {}
+_bm25_indexes = {}
+_flat_indexes = {}
+_hnsw_params = {}
 
 def get_embeddings():
     global _embeddings
@@ -14,60 +43,288 @@ def get_embeddings():
         )
     return _embeddings
 
-def get_or_create_vectorstore(documents=None, persist_dir='./medical_db/'):
+def _key(persist_dir):
+    return os.path.normpath(persist_dir)
+
+def get_or_create_vectorstore(documents=None, persist_dir=DEFAULT_PERSIST_DIR):
     """Get existing vectorstore or create new one if needed"""
-    global _vectorstore
-    
-    if _vectorstore is not None:
-        return _vectorstore
-    
-    embeddings = get_embeddings()
-    
-    # Create directory if it doesn't exist
-    if not os.path.exists(persist_dir):
-        os.makedirs(persist_dir)
-    
-    # Check if database files exist
-    db_files_exist = False
-    if os.path.exists(persist_dir):
-        files = os.listdir(persist_dir)
-        # Check for Chroma database files
-        db_files_exist = any(f.endswith('.sqlite3') or f == 'chroma.sqlite3' or 
-                            f.startswith('index') for f in files)
-    
-    if db_files_exist:
+    vectorstore = _vectorstores.get(_key(persist_dir))
+    if vectorstore is not None:
+        return vectorstore
+
+    count = stored_chunk_count(persist_dir)
+    if count:
         print("✓ Loading existing vector database...")
-        _vectorstore = Chroma(
-            persist_directory=persist_dir,
-            embedding_function=embeddings,
-            collection_metadata={"hnsw:space": "cosine"}
-        )
-        # Verify the database has content
-        collection = _vectorstore._collection
-        if collection.count() == 0:
-            print("Vector database is empty, needs to be recreated")
-            _vectorstore = None
-            return None
-        print(f"Loaded {collection.count()} documents from vector database")
+        vectorstore = open_vectorstore(persist_dir)
+        if count < 0:
+            # No manifest (store predates it): ask the collection once
+            count = vectorstore._collection.count()
+            if count == 0:
+                print("Vector database is empty, needs to be recreated")
+                return None
+        print(f"Loaded {count} documents from vector database")
+        _vectorstores[_key(persist_dir)] = vectorstore
     elif documents:
-        print("Creating new vector database...")
-        _vectorstore = Chroma.from_documents(
-            documents=documents,
-            embedding=embeddings,
-            persist_directory=persist_dir,
-            collection_metadata={"hnsw:space": "cosine"}
-        )
-        _vectorstore.persist()
-        print(f"Created vector database with {len(documents)} documents")
+        return build_vectorstore(documents, persist_dir=persist_dir)
     else:
         print("No existing database and no documents provided")
         return None
-    
-    return _vectorstore
 
-def get_retriever(k=3):
+    return vectorstore
+
+def stored_chunk_count(persist_dir=DEFAULT_PERSIST_DIR):
+    """Chunk count from the store's manifest without opening Chroma.
+
+    Returns 0 when there is no store, and -1 when Chroma files exist but
+    there is no manifest to read the count from.
+    """
+    manifest = load_manifest(persist_dir)
+    if manifest is not None:
+        return int(manifest.get("count", 0))
+    if os.path.isfile(os.path.join(persist_dir, "chroma.sqlite3")):
+        return -1
+    return 0
+
+def build_vectorstore(chunks, persist_dir=DEFAULT_PERSIST_DIR, batch_size=INGEST_BATCH_SIZE, dedup=INGEST_DEDUP):
+    """Create the vector store and BM25 index from an iterable of chunks.
+
+    Chunks are consumed lazily, embedded in fixed-size batches and written to
+    the collection as they go, so memory stays bounded for large corpora.
+    With `dedup`, near-duplicate chunks are dropped before embedding.
+    """
+    print("Creating new vector database...")
+    vectorstore = open_vectorstore(persist_dir)
+    bm25 = BM25Index()
+    manifest = new_manifest()
+    duplicates = NearDuplicateFilter() if dedup else None
+    seen = set()
+    batch = []
+    total = 0
+    started = time.perf_counter()
+
+    def flush():
+        nonlocal total
+        if not batch:
+            return
+        add_chunks(vectorstore, batch)
+        for cid, doc in batch:
+            bm25.add(cid, doc.page_content, doc.metadata)
+        total += len(batch)
+        batch.clear()
+        elapsed = time.perf_counter() - started
+        print(f"Indexed {total} chunks in {elapsed:.1f}s ({total / max(elapsed, 1e-9):.1f} chunks/s)")
+
+    for doc in chunks:
+        cid = chunk_id(doc)
+        if cid in seen:
+            continue
+        seen.add(cid)
+        if duplicates and duplicates.check(cid, doc):
+            continue
+        batch.append((cid, doc))
+        source = manifest["sources"].setdefault(source_key(doc), {"sha1": None, "chunks": []})
+        source["chunks"].append(cid)
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+
+    if total == 0:
+        print("No chunks to index")
+        return None
+    if duplicates:
+        update_chunk_metadatas(vectorstore, duplicates.merged_metadatas())
+        print(f"Near-duplicate chunks removed: {duplicates.report()}")
+
+    # The lexical index is built from the same chunks at ingestion time
+    bm25.save(index_path(persist_dir))
+    save_manifest(persist_dir, manifest)
+    _vectorstores[_key(persist_dir)] = vectorstore
+    _bm25_indexes[_key(persist_dir)] = bm25
+    print(f"Created vector database and BM25 index with {total} chunks")
+    if VECTOR_BACKEND == "flat":
+        export_flat_index(vectorstore, persist_dir)
+    return vectorstore
+
+def hnsw_metadata(params=None):
+    """Chroma collection metadata for the given HNSW parameters"""
+    metadata = {"hnsw:space": "cosine"}
+    for name, value in (params or {}).items():
+        if name not in HNSW_PARAMS:
+            raise ValueError(f"unknown HNSW parameter '{name}', expected one of {HNSW_PARAMS}")
+        if value is not None:
+            metadata[f"hnsw:{name}"] = int(value)
+    return metadata
+
+def configure_hnsw(persist_dir, params=None):
+    """Set the HNSW parameters used for the store at `persist_dir` (on top of the env defaults)"""
+    _hnsw_params[_key(persist_dir)] = {**DEFAULT_HNSW, **(params or {})}
+
+def get_hnsw_params(persist_dir=DEFAULT_PERSIST_DIR):
+    return _hnsw_params.get(_key(persist_dir), DEFAULT_HNSW)
+
+def apply_search_ef(collection, search_ef):
+    """Change search_ef on an existing collection; returns False if Chroma refuses"""
+    if (collection.metadata or {}).get("hnsw:search_ef") == search_ef:
+        return True
+    try:
+        collection.modify(configuration={"hnsw": {"ef_search": search_ef}})
+        return True
+    except Exception:
+        pass
+    try:
+        collection.modify(metadata={**(collection.metadata or {}), "hnsw:search_ef": search_ef})
+        return True
+    except Exception as e:
+        print(f"Warning: could not set search_ef={search_ef} on collection: {e}")
+        return False
+
+def open_vectorstore(persist_dir=DEFAULT_PERSIST_DIR):
+    """Open (or create) the Chroma collection without any content checks"""
+    params = get_hnsw_params(persist_dir)
+    vectorstore = Chroma(
+        persist_directory=persist_dir,
+        embedding_function=get_embeddings(),
+        collection_metadata=hnsw_metadata(params)
+    )
+    # An existing collection keeps its construction parameters, only search_ef follows the config
+    if params.get("search_ef") is not None:
+        apply_search_ef(vectorstore._collection, params["search_ef"])
+    return vectorstore
+
+def add_chunks(vectorstore, batch):
+    """Embed and write a batch of (chunk_id, Document) pairs"""
+    vectorstore.add_texts(
+        texts=[doc.page_content for _, doc in batch],
+        metadatas=[doc.metadata for _, doc in batch],
+        ids=[cid for cid, _ in batch]
+    )
+
+def update_chunk_metadatas(vectorstore, items, batch_size=INGEST_BATCH_SIZE):
+    """Overwrite the metadata of already stored chunks from [(chunk_id, metadata)]"""
+    items = list(items)
+    for start in range(0, len(items), batch_size):
+        part = items[start:start + batch_size]
+        vectorstore._collection.update(ids=[cid for cid, _ in part], metadatas=[m for _, m in part])
+
+def source_key(doc):
+    return os.path.normpath((doc.metadata or {}).get("source", "") or "unknown")
+
+def chunk_id(doc):
+    """Stable content hash of a chunk (source, page, text) used as its id"""
+    key = f"{source_key(doc)}|{(doc.metadata or {}).get('page', '')}|{doc.page_content}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+def get_bm25_index(persist_dir=DEFAULT_PERSIST_DIR):
+    """Load the persisted BM25 index, building it from the collection if missing"""
+    index = _bm25_indexes.get(_key(persist_dir))
+    if index is not None:
+        return index
+
+    path = index_path(persist_dir)
+    if os.path.exists(path):
+        index = BM25Index.load(path)
+        _bm25_indexes[_key(persist_dir)] = index
+        print(f"Loaded BM25 index with {len(index)} chunks from {persist_dir}")
+        return index
+
+    vectorstore = get_or_create_vectorstore(persist_dir=persist_dir)
+    if not vectorstore:
+        return None
+    print("BM25 index missing, building it from the vector database...")
+    return rebuild_bm25_index(vectorstore, persist_dir)
+
+def rebuild_bm25_index(vectorstore, persist_dir=DEFAULT_PERSIST_DIR):
+    """Rebuild and persist the BM25 index from the chunks in the collection"""
+    data = vectorstore._collection.get(include=["documents", "metadatas"])
+    index = build_index(data["ids"], data["documents"], data["metadatas"])
+    index.save(index_path(persist_dir))
+    _bm25_indexes[_key(persist_dir)] = index
+    print(f"Created BM25 index with {len(index)} chunks in {persist_dir}")
+    return index
+
+def get_flat_index(persist_dir=DEFAULT_PERSIST_DIR):
+    """Open the memory-mapped flat index of a store, or None if it was never exported"""
+    index = _flat_indexes.get(_key(persist_dir))
+    if index is None and flat_index_exists(persist_dir):
+        index = FlatIndex(flat_dir(persist_dir))
+        _flat_indexes[_key(persist_dir)] = index
+        print(f"Opened flat index with {len(index)} chunks from {persist_dir}")
+    return index
+
+def export_flat_index(vectorstore, persist_dir=DEFAULT_PERSIST_DIR):
+    """(Re)export the collection to the flat index and swap it in.
+
+    The previous index is not closed: searches still running on it finish on
+    its own files, and it is released once nothing references it.
+    """
+    index = export_from_collection(vectorstore._collection, persist_dir)
+    _flat_indexes.pop(_key(persist_dir), None)
+    if index is not None:
+        _flat_indexes[_key(persist_dir)] = index
+    return index
+
+def get_retriever(k=3, persist_dir=DEFAULT_PERSIST_DIR):
     """Get retriever from existing vectorstore"""
-    vectorstore = get_or_create_vectorstore()
+    if VECTOR_BACKEND == "flat":
+        index = get_flat_index(persist_dir)
+        if index is not None:
+            return FlatRetriever(index, embed_query, k=k)
+    vectorstore = get_or_create_vectorstore(persist_dir=persist_dir)
     if vectorstore:
         return vectorstore.as_retriever(search_kwargs={'k': k})
     return None
+
+@lru_cache(maxsize=1024)
+def _embed_query_cached(text):
+    vec = np.asarray(get_embeddings().embed_query(text), dtype=np.float32)
+    norm = np.linalg.norm(vec)
+    if norm > 0:
+        vec = vec / norm
+    vec.setflags(write=False)
+    return vec
+
+def embed_query(text):
+    """Return the L2-normalized query embedding, cached across agents and turns"""
+    return _embed_query_cached(" ".join((text or "").split()))
+
+def search_with_scores(query, k=3, fetch_k=None, use_mmr=False, lambda_mult=0.5, persist_dir=DEFAULT_PERSIST_DIR):
+    """Similarity search returning [(Document, relevance)] best first.
+
+    Relevance is cosine similarity (1 - cosine distance). With `use_mmr`,
+    `fetch_k` candidates are fetched and re-ranked with MMR to drop
+    near-duplicate chunks. Returns None when no vector store is available.
+    """
+    if VECTOR_BACKEND == "flat":
+        index = get_flat_index(persist_dir)
+        if index is not None:
+            return index.search(embed_query(query), k, fetch_k, use_mmr, lambda_mult)
+
+    vectorstore = get_or_create_vectorstore(persist_dir=persist_dir)
+    if not vectorstore:
+        return None
+
+    query_vec = embed_query(query)
+    n_results = fetch_k or (k * 4 if use_mmr else k)
+    include = ["documents", "metadatas", "distances"]
+    if use_mmr:
+        include.append("embeddings")
+    result = vectorstore._collection.query(
+        query_embeddings=[query_vec.tolist()],
+        n_results=n_results,
+        include=include
+    )
+
+    texts = result["documents"][0]
+    metadatas = result["metadatas"][0]
+    scores = [1.0 - float(d) for d in result["distances"][0]]
+    order = list(range(len(texts)))
+    if use_mmr and texts:
+        vecs = np.asarray(result["embeddings"][0], dtype=np.float32)
+        norms = np.linalg.norm(vecs, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        order = mmr_select(query_vec, vecs / norms, k, lambda_mult)
+
+    return [
+        (Document(id=result["ids"][0][i], page_content=texts[i], metadata=dict(metadatas[i] or {})), scores[i])
+        for i in order[:k]
+    ]